@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Measure the per group overhead of the parallel scheduler.
+
+Runs the same groups of trivial tasks twice:
+  - per-group: a new process pool and manager process for every group, as the parallel scheduler used to do
+  - shared: one executor reused by every group of the run
+
+Usage: python benchmarks/benchmark_group_overhead.py [--groups 20] [--tasks 4]
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from scheduler.common.constants import *
+from scheduler.common.helper import Global
+from scheduler.taskdriver.task_driver_factory import TaskDriverFactory
+from scheduler.taskscheduler.task_executor import TaskExecutor
+
+
+def createDrivers(numTasks: int):
+    """
+    Create the drivers for one group of trivial tasks
+    """
+
+    drivers = []
+    for index in range(numTasks):
+        task = {
+            "Command": "true",
+            "Name": "Task %d" % index,
+            "Strategy": PARALLEL_STRATEGY,
+        }
+        drivers.append(TaskDriverFactory.createTaskDriver(task, WAITALL))
+    return drivers
+
+
+def runPerGroupPools(numGroups: int, numTasks: int, numProcess: int):
+    """
+    Start and stop a pool and a manager for every group
+    """
+
+    for _ in range(numGroups):
+        processPool = multiprocessing.Pool(numProcess)
+        processManager = multiprocessing.Manager()
+        processManager.Event()
+        processManager.list()
+
+        for driver in createDrivers(numTasks):
+            processPool.apply_async(driver, args=())
+
+        processPool.close()
+        processPool.join()
+        processManager.shutdown()
+
+
+def runSharedExecutor(numGroups: int, numTasks: int, numProcess: int):
+    """
+    Reuse one executor for all the groups
+    """
+
+    with TaskExecutor(numProcess) as executor:
+        for _ in range(numGroups):
+            executor.resetFailure()
+            finishedTasks = queue.Queue()
+
+            for driver in createDrivers(numTasks):
+                executor.submit(driver, finishedTasks.put)
+
+            for _ in range(numTasks):
+                finishedTasks.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--groups", type=int, default=20, help="number of groups to run")
+    parser.add_argument("--tasks", type=int, default=4, help="number of tasks in each group")
+    args = parser.parse_args()
+
+    numProcess = max(1, multiprocessing.cpu_count() // 2)
+
+    Global.LOG_DIR = tempfile.mkdtemp() + "/"
+    try:
+        for name, benchmark in [("per-group", runPerGroupPools), ("shared", runSharedExecutor)]:
+            startTime = time.time()
+            benchmark(args.groups, args.tasks, numProcess)
+            duration = time.time() - startTime
+            print(
+                "{:<10} total {:>7.3f} sec | per group {:>7.1f} ms".format(
+                    name, duration, duration * 1000 / args.groups
+                )
+            )
+    finally:
+        shutil.rmtree(Global.LOG_DIR)
+
+
+if __name__ == "__main__":
+    main()
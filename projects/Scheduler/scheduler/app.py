@@ -8,7 +8,19 @@ import threading
 from scheduler.common.helper import ConsoleLogger, Global
 from scheduler.common.constants import *
 from scheduler.taskscheduler.task_scheduler_factory import TaskSchedulerFactory
+from scheduler.taskscheduler.dag_task_scheduler import DagScheduler
+from scheduler.taskscheduler.task_executor import TaskExecutor
+from scheduler.taskscheduler.remote_executor import RemoteExecutor
 from scheduler.common.metrics import Metrics
+from scheduler.common.history import DurationHistory
+from scheduler.common.result_cache import ResultCache
+from scheduler.common.results import ResultsFile, ResultsReporter
+from scheduler.common.log_streamer import LogStreamer
+from scheduler.common.failure_log import FailureLog
+from scheduler.common.run_monitor import RunMonitor
+from scheduler.common.trace_recorder import TraceRecorder
+from scheduler.common.sharding import Shard
+from scheduler.common.exceptions import InvalidShardError
 from scheduler.configuration import Configuration
 
 
@@ -29,8 +41,42 @@ def parseArguments():
     choiceDescription = """
         config: Defines the task config yaml file
         
-        tasks: A list of tasks or regex of tasks you want to run.
-    """
+        tasks: A list of task names, commands or regex of commands you want to run.
+
+        tags: Run only the tasks with one of these tags, e.g. "unit,lint".
+
+        jobs: Maximum number of task slots used at once, overrides maxParallel of the config.
+
+        no-cache: Run every task even if the result cache of the config is enabled.
+
+        shard: Run only the part INDEX of the selected tasks split in COUNT parts of about the same Weight, e.g. 2/4.
+
+        shard-history: History file the shards are balanced on instead of the Weight of the tasks,
+                       every shard of the run must be given the same file.
+
+        results: File the results of the run are written to, results/shard-INDEX-of-COUNT.json by default for a shard.
+
+        junit: File the results of the run are written to as JUnit XML.
+
+        prometheus: File the results of the run are written to for the textfile collector of the node exporter.
+
+        merge: Combine the results files of the shards of a run into the results file and fail if a shard failed.
+
+        flaky: Show the tasks which most often passed only after a retry in the previous runs, and exit.
+
+        heartbeat: Seconds between two progress reports of the run, 60 by default.
+
+        trace: File the trace of the run is written to, .validate_trace.json by default.
+               Open it in ui.perfetto.dev or chrome://tracing.
+
+        stream-logs: Show the output of the parallel tasks on the console while they run.
+
+        listen: Run the tasks on the workers connecting to this address, tcp://HOST:PORT or unix://PATH.
+                Start the workers with: python -m scheduler.worker --coordinator <address>
+                A tcp address needs the secret of the workers in %s.
+
+        allow-remote-workers: With a tcp address, accept workers from other hosts instead of the loopback interface only.
+    """ % WORKER_TOKEN_VARIABLE
 
     argParser = argparse.ArgumentParser(
         formatter_class=argparse.RawTextHelpFormatter, epilog=choiceDescription
@@ -52,26 +98,151 @@ def parseArguments():
         help="run desired task sets, it can be regex",
     )
 
+    argParser.add_argument(
+        "--tags",
+        type=str,
+        default=None,
+        help="run only the tasks with one of these tags, separated by commas or spaces",
+    )
+
+    argParser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="maximum number of task slots used at once",
+    )
+
+    argParser.add_argument(
+        "--no-cache",
+        dest="useCache",
+        action="store_false",
+        help="do not replay cached results, run every task",
+    )
+
+    argParser.add_argument(
+        "--heartbeat",
+        type=float,
+        default=None,
+        help="seconds between two progress reports",
+    )
+
+    argParser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="file the trace of the run is written to",
+    )
+
+    argParser.add_argument(
+        "--stream-logs",
+        dest="streamLogs",
+        action="store_true",
+        help="show the output of the parallel tasks while they run",
+    )
+
+    argParser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        metavar="INDEX/COUNT",
+        help="run only one part of the selected tasks",
+    )
+
+    argParser.add_argument(
+        "--shard-history",
+        dest="shardHistory",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="history file shared by the shards to balance them on the task durations",
+    )
+
+    argParser.add_argument(
+        "--results",
+        type=str,
+        default=None,
+        help="file the results are written to",
+    )
+
+    argParser.add_argument(
+        "--junit",
+        type=str,
+        default=None,
+        help="file the results are written to as JUnit XML",
+    )
+
+    argParser.add_argument(
+        "--prometheus",
+        type=str,
+        default=None,
+        help="file the results are written to as Prometheus metrics",
+    )
+
+    argParser.add_argument(
+        "--merge",
+        type=str,
+        nargs="+",
+        default=None,
+        metavar="RESULTS",
+        help="merge the results files of the shards of a run",
+    )
+
+    argParser.add_argument(
+        "--flaky",
+        action="store_true",
+        default=False,
+        help="show the flakiest tasks of the previous runs and exit",
+    )
+
+    argParser.add_argument(
+        "--listen",
+        type=str,
+        default=None,
+        metavar="ADDRESS",
+        help="coordinate workers connecting to this address instead of running the tasks locally",
+    )
+
+    argParser.add_argument(
+        "--allow-remote-workers",
+        dest="allowRemoteWorkers",
+        action="store_true",
+        default=False,
+        help="accept workers from other hosts on a tcp address",
+    )
+
     return argParser.parse_args()
 
 
-def runTasks(tasks: dict, strategy: str, mode: str, metrics: Metrics):
+def runTasks(
+    tasks: dict,
+    strategy: str,
+    mode: str,
+    metrics: Metrics,
+    executor: TaskExecutor,
+    maxParallel: int = None,
+):
     """
     Creates tasks scheduler with given strategy
     """
 
     scheduler = TaskSchedulerFactory.createTaskScheduler(
-        strategy, mode, metrics)
+        strategy, mode, metrics, executor, maxParallel)
     result = scheduler(tasks)
 
     return result
 
 
-def execGroups(config: Configuration, metrics: Metrics) -> bool:
+def execGroups(config: Configuration, metrics: Metrics, executor: TaskExecutor = None) -> bool:
     """
-    Execute groups in the order defined in the yaml
+    Execute groups in the order defined in the yaml.
+    All groups share the given executor, a new one is used for this run if none is given.
     """
 
+    if executor is None:
+        with TaskExecutor(config.maxParallel) as executor:
+            return execGroups(config, metrics, executor)
+
     ConsoleLogger.logInfo("Starting pre-checkin validation...")
 
     # Use the environment variable VALIDATION_MODE as mode if set, else default to the mode specified in the config.
@@ -87,7 +258,8 @@ def execGroups(config: Configuration, metrics: Metrics) -> bool:
         mode = taskGroup["Mode"] if "Mode" in taskGroup else configMode
 
         result = runTasks(taskGroup["Tasks"],
-                          taskGroup["Strategy"], mode, metrics)
+                          taskGroup["Strategy"], mode, metrics, executor,
+                          taskGroup.get("MaxParallel"))
         executionPassed = executionPassed and result
 
         if result == False and mode != WAITALL:
@@ -101,7 +273,8 @@ def execGroups(config: Configuration, metrics: Metrics) -> bool:
 
         if "Mode" in taskGroup and taskGroup["Mode"] == RUNALWAYS:
             result = runTasks(
-                taskGroup["Tasks"], taskGroup["Strategy"], taskGroup["Mode"], metrics
+                taskGroup["Tasks"], taskGroup["Strategy"], taskGroup["Mode"], metrics, executor,
+                taskGroup.get("MaxParallel")
             )
             executionPassed = executionPassed and result
 
@@ -111,28 +284,93 @@ def execGroups(config: Configuration, metrics: Metrics) -> bool:
     return executionPassed
 
 
-def runAndMonitor(config: Configuration, metrics: Metrics):
+def execGraph(config: Configuration, metrics: Metrics, executor: TaskExecutor = None) -> bool:
+    """
+    Execute all tasks as one dependency graph, releasing each task as soon as its dependencies are done
+    """
+
+    if executor is None:
+        with TaskExecutor(config.maxParallel) as executor:
+            return execGraph(config, metrics, executor)
+
+    ConsoleLogger.logInfo("Starting pre-checkin validation...")
+
+    configMode = os.getenv("VALIDATION_MODE") or config.mode
+    ConsoleLogger.logInfo("Mode is: " + configMode)
+
+    scheduler = DagScheduler(configMode, metrics, executor)
+    executionPassed = scheduler(config.groups, config.groupOrder)
+
+    current_thread = threading.current_thread()
+    # executionPassed is True for success and False for failure
+    current_thread.executionPassed = executionPassed
+    return executionPassed
+
+
+def runAndMonitor(
+    config: Configuration,
+    metrics: Metrics,
+    executor: TaskExecutor,
+    resultsFiles: dict = None,
+    shard: Shard = None,
+    heartbeatSeconds: float = None,
+    traceFile: str = None,
+):
     """
     This function kicks off the run of all tasks and monitor whether the run has finished.
-    It is also regularly printing messages to tell that the tasks are still running.
+    It is also regularly printing the progress of the run, which keeps the console session alive.
+    The results are written to the files of resultsFiles, keyed by json, junit or prometheus,
+    while the tasks finish, and the trace of the run to traceFile if given.
     """
-    run_thread = threading.Thread(target=execGroups, args=(config, metrics))
+    target = execGraph if config.scheduling == DAG_SCHEDULING else execGroups
+
+    # The monitor is told by the schedulers when tasks start and finish, and by the run thread when it is over
+    #
+    tasks = [task for group in config.groupOrder for task in config.groups[group]["Tasks"]]
+    monitor = RunMonitor(
+        tasks,
+        metrics.expectedDurations(tasks),
+        executor.numProcess,
+        heartbeatSeconds or config.heartbeatSeconds or DEFAULT_HEARTBEAT_SECONDS,
+    )
+    Global.RUN_MONITOR = monitor
+
+    # Timeline of the run, the schedulers record when tasks are handed over and their results come back
+    #
+    trace = TraceRecorder() if traceFile else None
+    Global.TRACE = trace
+
+    # Results files kept up to date while the tasks finish
+    #
+    reporter = ResultsReporter(metrics, resultsFiles or {}, shard)
+    metrics.reporter = reporter
+
+    def runTarget():
+        try:
+            target(config, metrics, executor)
+        finally:
+            monitor.runFinished()
+            if trace:
+                trace.runFinished()
+
+    run_thread = threading.Thread(target=runTarget)
     run_thread.executionPassed = False
-    timer = 0
     run_thread.start()
-    while run_thread.is_alive():
-        # We print a message once every MONITORING_INTERVAL_IN_SECONDS to keep the console session alive.
-        if timer > 0:
-            ConsoleLogger.logInfo(
-                "The tasks are still running. It has been running for about {0} hours.".format(
-                    timer / NUM_SECONDS_PER_HOUR
-                )
-            )
-        run_thread.join(STREAMING_REACTIVE_SECONDS)
-        timer = timer + STREAMING_REACTIVE_SECONDS
-        
+    monitor.wait()
+    run_thread.join()
+    Global.RUN_MONITOR = None
+    Global.TRACE = None
+
     metrics.printTaskSummary()
 
+    if trace:
+        trace.write(traceFile)
+        ConsoleLogger.logInfo("Trace written to " + traceFile)
+
+    metrics.reporter = None
+    for path in reporter.finish(run_thread.executionPassed):
+        ConsoleLogger.logInfo("Results written to " + path)
+
     if not run_thread.executionPassed:
         failAndExit()
     ConsoleLogger.logSuccess("Pre-checkin validation passed.")
@@ -159,10 +397,233 @@ def setupGlobalVariables():
         shutil.rmtree(Global.LOG_DIR)
     os.makedirs(Global.LOG_DIR)
 
+    # Durations of the previous runs, kept across runs
+    #
+    Global.HISTORY_FILE = Global.WORKING_DIR + "/.validate_history.db"
 
-def run(configfile: str, tasks: str = "all"):
+    # Timeline of the last run
+    #
+    Global.TRACE_FILE = Global.WORKING_DIR + "/.validate_trace.json"
+
+    # Parsed config files, parsed again only when they change
+    #
+    Global.CONFIG_CACHE_DIR = Global.WORKING_DIR + "/.validate_config_cache"
+
+
+def setupResultCache(config: Configuration, useCache: bool):
+    """
+    Create the cache of passing results if the config enables it
+    """
+
+    cacheConfig = config.cache
+
+    if not useCache or not cacheConfig.get("enabled", False):
+        Global.RESULT_CACHE = None
+        return None
+
+    Global.RESULT_CACHE = ResultCache(
+        cacheConfig.get("directory", Global.WORKING_DIR + "/.validate_cache"),
+        Global.WORKING_DIR,
+        cacheConfig.get("environment", []),
+        cacheConfig.get("maxSizeMB", DEFAULT_CACHE_MAX_SIZE_MB),
+        cacheConfig.get("maxAgeDays", DEFAULT_CACHE_MAX_AGE_DAYS),
+    )
+    return Global.RESULT_CACHE
+
+
+def setupFailureLog(config: Configuration):
+    """
+    Set how the logs of the failed tasks are reported
+    """
+
+    failureLogConfig = config.failureLog
+
+    Global.FAILURE_LOG = FailureLog(
+        failureLogConfig.get("tailLines", DEFAULT_FAILURE_LOG_TAIL_LINES),
+        failureLogConfig.get("tailBytes", DEFAULT_FAILURE_LOG_TAIL_BYTES),
+        failureLogConfig.get("patterns"),
+        failureLogConfig.get("maxMatches", DEFAULT_FAILURE_LOG_MAX_MATCHES),
+        failureLogConfig.get("searchBytes", DEFAULT_FAILURE_LOG_SEARCH_BYTES),
+    )
+    return Global.FAILURE_LOG
+
+
+def setupResourceSampling(config: Configuration):
+    """
+    Set the interval between two samples of the resource usage of the tasks
+    """
+
+    if config.resourceSampleSeconds is None:
+        Global.RESOURCE_SAMPLE_SECONDS = DEFAULT_RESOURCE_SAMPLE_SECONDS
+    else:
+        Global.RESOURCE_SAMPLE_SECONDS = config.resourceSampleSeconds
+
+
+def setupTermination(config: Configuration):
+    """
+    Set the time the processes of a stopped task get to exit after SIGTERM
+    """
+
+    Global.TERM_WAIT_TIME_IN_MINUTES = config.termWaitTimeInMins
+
+
+def setupHedging(config: Configuration):
+    """
+    Set how many times its p95 duration an idempotent task runs before it gets a second copy
+    """
+
+    if config.hedgeMultiple is None:
+        Global.HEDGE_MULTIPLE = DEFAULT_HEDGE_MULTIPLE
+    else:
+        Global.HEDGE_MULTIPLE = config.hedgeMultiple
+
+
+def setupLogStreamer(config: Configuration, streamLogs: bool, listen: str = None):
+    """
+    Start streaming the output of the parallel tasks if asked on the command line or in the config
+    """
+
+    if not (streamLogs or config.streamLogs):
+        Global.LOG_STREAMER = None
+        return None
+
+    # The workers of a coordinator stream the output back themselves
+    #
+    if listen:
+        ConsoleLogger.logInfo("Log streaming is not used with --listen.")
+        Global.LOG_STREAMER = None
+        return None
+
+    Global.LOG_STREAMER = LogStreamer()
+    return Global.LOG_STREAMER
+
+
+def parseShard(shard: str):
+    """
+    Parse the INDEX/COUNT shard argument
+    """
+
+    try:
+        return Shard.parse(shard)
+    except InvalidShardError as error:
+        ConsoleLogger.logFailure(error)
+        raise
+
+
+def selectShard(config: Configuration, shard: Shard, shardHistory: str = None):
+    """
+    Keep only the tasks of the given shard in the config, balanced on the durations of shardHistory if given.
+    The history of the agent is never used, the other shards do not see it.
     """
-    Main function to run all the tasks defined
+
+    if shardHistory:
+        if not os.path.exists(shardHistory):
+            ConsoleLogger.logFailure("Shard history %s does not exist..." % shardHistory)
+            raise RuntimeError
+
+        history = DurationHistory(shardHistory)
+        try:
+            numTasks = shard.select(config.groups, config.groupOrder, Metrics(history))
+        finally:
+            history.close()
+    else:
+        numTasks = shard.select(config.groups, config.groupOrder)
+    ConsoleLogger.logInfo("Shard %s runs %d task(s)." % (shard, numTasks))
+
+    return shard
+
+
+def mergeResults(paths: list, resultsFile: str = None):
+    """
+    Combine the results files of the shards of a run and fail if the merged run did not pass
+    """
+
+    for path in paths:
+        if not os.path.exists(path):
+            ConsoleLogger.logFailure("Results file %s does not exist..." % path)
+            raise RuntimeError
+
+    merged = ResultsFile.merge(paths, resultsFile)
+
+    metrics = Metrics()
+    metrics.loadResults(merged["tasks"])
+    metrics.printTaskSummary()
+
+    if merged["missingShards"]:
+        ConsoleLogger.logFailure(
+            "Missing results of shard(s): " + ", ".join(map(str, merged["missingShards"]))
+        )
+
+    if merged["planMismatch"]:
+        ConsoleLogger.logFailure(
+            "The shards split the tasks differently, make sure they use the same config, --tasks and --shard-history."
+        )
+
+    if not merged["passed"]:
+        failAndExit()
+    ConsoleLogger.logSuccess("Pre-checkin validation passed.")
+
+
+def reportFlakyTasks(configfile: str):
+    """
+    Show the tasks which most often passed only after a retry, from the history of the config
+    """
+
+    if not os.path.exists(configfile):
+        ConsoleLogger.logFailure("YAML file does not exists...")
+        raise RuntimeError
+
+    setupGlobalVariables()
+    config = Configuration(configfile, "all")
+
+    history = DurationHistory(config.historyFile or Global.HISTORY_FILE)
+    try:
+        flakyTasks = history.flakyTasks()
+    finally:
+        history.close()
+
+    if not flakyTasks:
+        ConsoleLogger.logInfo("No task needed a retry to pass in the previous runs.")
+        return
+
+    ConsoleLogger.logInfo("Tasks which passed only after a retry, of their last %d runs:" % FLAKINESS_SAMPLE_SIZE)
+    for name, runs, flakyRuns in flakyTasks:
+        ConsoleLogger.logInfo("  %s: %d of %d run(s), %.0f%%" % (name, flakyRuns, runs, 100.0 * flakyRuns / runs))
+
+
+def run(
+    configfile: str,
+    tasks: str = "all",
+    jobs: int = None,
+    useCache: bool = True,
+    shard: str = None,
+    resultsFile: str = None,
+    listen: str = None,
+    streamLogs: bool = False,
+    heartbeatSeconds: float = None,
+    traceFile: str = None,
+    junitFile: str = None,
+    prometheusFile: str = None,
+    tags: str = None,
+    allowRemoteWorkers: bool = False,
+    shardHistory: str = None,
+):
+    """
+    Main function to run all the tasks defined.
+    jobs overrides the maxParallel setting of the config file,
+    useCache set to False runs every task even if the result cache is enabled.
+    shard given as INDEX/COUNT runs only that part of the selected tasks, the parts have about the
+    same Weight, or the same expected duration from the shardHistory file shared by the shards.
+    The results are written to resultsFile, by default to SHARD_RESULTS_FILE for a shard.
+    listen given as tcp://HOST:PORT or unix://PATH makes this process the coordinator of the
+    workers connecting to it, the tasks run on the workers. The workers must give the token of
+    WORKER_TOKEN_VARIABLE, and on tcp they can only connect from other hosts with allowRemoteWorkers.
+    streamLogs shows the output of the parallel tasks on the console while they run.
+    heartbeatSeconds overrides the interval between two progress reports of the config file.
+    traceFile overrides the file the trace of the run is written to.
+    junitFile and prometheusFile override the files the results are written to as JUnit XML
+    and as Prometheus metrics.
+    tags keeps only the selected tasks with one of these tags.
     """
 
     # Check if config file exists and is not none
@@ -176,15 +637,80 @@ def run(configfile: str, tasks: str = "all"):
 
     # Read configurations
     #
-    config = Configuration(configfile, tasks)
+    config = Configuration(configfile, tasks, tags)
+    if shard:
+        shard = parseShard(shard)
 
-    # Create metrics
+    # Create metrics, task durations are saved to the history to order the next runs
     #
-    metrics = Metrics()
+    history = DurationHistory(config.historyFile or Global.HISTORY_FILE)
+    metrics = Metrics(history)
 
-    # Run and monitor tasks
+    # Keep only the tasks of this shard, every shard computes the same split
     #
-    runAndMonitor(config, metrics)
+    resultsFile = resultsFile or config.resultsFile
+    if shard:
+        selectShard(config, shard, shardHistory)
+        if resultsFile is None:
+            resultsFile = os.path.join(
+                Global.WORKING_DIR,
+                SHARD_RESULTS_FILE.format(index=shard.index, count=shard.count),
+            )
+
+    # Cache of passing results, replayed for tasks whose inputs did not change
+    #
+    cache = setupResultCache(config, useCache)
+
+    # Report of the logs of the failed tasks
+    #
+    setupFailureLog(config)
+
+    # Resource usage of the process tree of each task, sampled while it runs
+    #
+    setupResourceSampling(config)
+
+    # Grace period of the tasks stopped on failfast or timeout
+    #
+    setupTermination(config)
+
+    # Second copies of the idempotent tasks running for much longer than usual
+    #
+    setupHedging(config)
+
+    # Output of the parallel tasks shown while they run
+    #
+    streamer = setupLogStreamer(config, streamLogs, listen)
+
+    # Run and monitor tasks, the worker processes are shared by all groups
+    #
+    try:
+        if listen:
+            executor = RemoteExecutor(
+                listen, jobs or config.maxParallel, os.environ.get(WORKER_TOKEN_VARIABLE), allowRemoteWorkers
+            )
+        else:
+            executor = TaskExecutor(jobs or config.maxParallel)
+
+        with executor:
+            runAndMonitor(
+                config,
+                metrics,
+                executor,
+                {
+                    "json": resultsFile,
+                    "junit": junitFile or config.junitFile,
+                    "prometheus": prometheusFile or config.prometheusFile,
+                },
+                shard,
+                heartbeatSeconds,
+                traceFile or config.traceFile or Global.TRACE_FILE,
+            )
+    finally:
+        history.close()
+        if streamer:
+            streamer.stop()
+        if cache:
+            cache.evict()
 
 
 if __name__ == "__main__":
@@ -195,6 +721,27 @@ if __name__ == "__main__":
 
         configfile = args.config
 
-        run(configfile=configfile, tasks=args.tasks)
+        if args.merge:
+            mergeResults(args.merge, args.results)
+        elif args.flaky:
+            reportFlakyTasks(configfile)
+        else:
+            run(
+                configfile=configfile,
+                tasks=args.tasks,
+                jobs=args.jobs,
+                useCache=args.useCache,
+                shard=args.shard,
+                resultsFile=args.results,
+                listen=args.listen,
+                streamLogs=args.streamLogs,
+                heartbeatSeconds=args.heartbeat,
+                traceFile=args.trace,
+                junitFile=args.junit,
+                prometheusFile=args.prometheus,
+                tags=args.tags,
+                allowRemoteWorkers=args.allowRemoteWorkers,
+                shardHistory=args.shardHistory,
+            )
     except:
         raise
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import pickle
+
+
+class ConfigCache(object):
+    """
+    Cache of parsed config files, so a large config is not parsed again while it does not change.
+
+    An entry is used as is while the modification time and size of the file are the ones it was
+    saved with. Otherwise the file is read and hashed: an entry with the same content hash is
+    still used, only a changed content is parsed again.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Keep the entries in directory, it is created on first save
+        """
+
+        self.directory = directory
+
+    def _entryPath(self, path: str):
+        """
+        File of the entry of a config file, one per absolute path
+        """
+
+        key = hashlib.sha1(os.path.realpath(path).encode()).hexdigest()
+        return os.path.join(self.directory, key + ".pickle")
+
+    def _read(self, entryPath: str):
+        """
+        Read an entry, None if it does not exist or cannot be read
+        """
+
+        try:
+            with open(entryPath, "rb") as reader:
+                return pickle.load(reader)
+        except Exception:
+            return None
+
+    def _save(self, entryPath: str, entry: dict):
+        """
+        Save an entry, a cache which cannot be written is only a slower start
+        """
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = "%s.%d.tmp" % (entryPath, os.getpid())
+            with open(temporary, "wb") as writer:
+                pickle.dump(entry, writer, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, entryPath)
+        except OSError:
+            pass
+
+    def load(self, path: str, parse):
+        """
+        Return the parsed content of the config file at path, parse is called with its
+        content only if it changed since it was cached
+        """
+
+        stat = os.stat(path)
+        entryPath = self._entryPath(path)
+        entry = self._read(entryPath)
+
+        if entry and (entry["mtime"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return entry["config"]
+
+        with open(path, "rb") as reader:
+            content = reader.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if not entry or entry["hash"] != digest:
+            entry = {"config": parse(content), "hash": digest}
+
+        entry["mtime"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        self._save(entryPath, entry)
+
+        return entry["config"]
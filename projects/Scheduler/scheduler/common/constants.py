@@ -10,6 +10,16 @@ SEQUENTIAL_STRATEGY = "sequential"
 
 PARALLEL_STRATEGY = "parallel"
 
+ASYNC_STRATEGY = "async"
+
+"""
+SCHEDULINGS WHICH SCHEDULER SUPPORTS
+"""
+# Run the groups one after another in the order they are defined.
+GROUP_SCHEDULING = "groups"
+# Release each task as soon as the tasks and groups it depends on are done.
+DAG_SCHEDULING = "dag"
+
 """
 MODES IN WHICH SCHEDULER WORKS
 """
@@ -25,8 +35,9 @@ RUNALWAYS = "runalways"
 """
 VALID STRATEGIES AND MODES
 """
-VALID_STRATEGIES = [SEQUENTIAL_STRATEGY, PARALLEL_STRATEGY]
+VALID_STRATEGIES = [SEQUENTIAL_STRATEGY, PARALLEL_STRATEGY, ASYNC_STRATEGY]
 VALID_MODES = [FAILFAST, WAITALL, WAITCURRENT, RUNALWAYS]
+VALID_SCHEDULINGS = [GROUP_SCHEDULING, DAG_SCHEDULING]
 
 """
 STATUS CONSTANTS
@@ -34,11 +45,141 @@ STATUS CONSTANTS
 STATUS_PASS = "Pass"
 STATUS_FAIL = "Fail"
 STATUS_SKIP = "Skip"
+STATUS_CACHED = "Cached"
+
+# Statuses of tasks which count as passed
+PASSING_STATUSES = [STATUS_PASS, STATUS_CACHED]
+
+"""
+ADMISSION CONSTANTS
+"""
+# Maximum number of tasks the async strategy runs at once when the group has no MaxParallel
+DEFAULT_ASYNC_MAX_PARALLEL = 256
+# Number of times a task which does not fit can be overtaken by smaller tasks before its resources are reserved
+MAX_TASK_BYPASSES = 3
 
 """
 TIMING CONSTANTS
 """
-STREAMING_REACTIVE_SECONDS = 3600
 NUM_SECONDS_PER_HOUR = 3600
+NUM_SECONDS_PER_DAY = 86400
 DEFAULT_TASK_TIMEOUT_IN_MINUTES = 5
 DEFAULT_WAIT_TIME_IN_MINUTES = 5
+# Interval between two progress reports of the run monitor
+DEFAULT_HEARTBEAT_SECONDS = 60
+# Number of running tasks listed in a progress report, the ones running for the longest time
+MONITOR_LONGEST_TASKS = 3
+# Interval between two samples of the resource usage of a running task, 0 to not sample
+DEFAULT_RESOURCE_SAMPLE_SECONDS = 1
+# Longest time between two checks whether the processes of a task exited
+PROCESS_POLL_MAX_DELAY_SECONDS = 0.05
+# Time the processes of a cancelled or timed out task get to exit after SIGTERM, before they get SIGKILL
+DEFAULT_TERM_WAIT_TIME_IN_MINUTES = 0.5
+# Time to wait for the processes to be gone after SIGKILL
+PROCESS_KILL_WAIT_SECONDS = 5
+
+"""
+HISTORY CONSTANTS
+"""
+# Number of previous passing runs used to estimate the duration of a task
+HISTORY_SAMPLE_SIZE = 10
+# Number of previous runs of a task its flakiness is computed on
+FLAKINESS_SAMPLE_SIZE = 50
+# Number of tasks listed in the flakiness report
+FLAKINESS_REPORT_SIZE = 20
+# Expected duration of a task when no task of the run has history
+DEFAULT_EXPECTED_DURATION_SECONDS = 60
+# Number of the last runs kept for each task, older runs are dropped when a run is recorded.
+# It must stay above the sample sizes of the history, flakiness and hedging
+HISTORY_RETENTION_SIZE = 200
+
+"""
+RETRY CONSTANTS
+"""
+# Seconds before the first retry of a failed task, doubled for each next retry
+DEFAULT_RETRY_DELAY_SECONDS = 5
+
+"""
+HEDGING CONSTANTS
+"""
+# A running idempotent task gets a second copy once it runs this many times its historical p95 duration, 0 to not hedge
+DEFAULT_HEDGE_MULTIPLE = 2
+# Percentile of the previous durations of a task a straggler is measured against
+HEDGE_PERCENTILE = 95
+# Number of previous passing runs needed before a task is hedged
+HEDGE_MIN_SAMPLES = 5
+# Number of previous passing runs the percentile is computed on
+HEDGE_SAMPLE_SIZE = 20
+# Number of the last cancelled tasks the local workers are told about
+CANCELLED_TASKS_SIZE = 64
+
+"""
+CACHE CONSTANTS
+"""
+DEFAULT_CACHE_MAX_SIZE_MB = 1024
+DEFAULT_CACHE_MAX_AGE_DAYS = 7
+CACHE_READ_CHUNK_SIZE = 1024 * 1024
+
+"""
+RESULTS CONSTANTS
+"""
+# Version of the results file layout, bumped when a field changes meaning
+RESULTS_FORMAT_VERSION = 1
+# Results file of a shard, relative to the working directory
+SHARD_RESULTS_FILE = "results/shard-{index}-of-{count}.json"
+# Share of the work of a task in the split of a run into shards when it has no Weight
+DEFAULT_SHARD_WEIGHT = 1
+# Shortest time between two writes of the results files while the run goes on
+RESULTS_WRITE_INTERVAL_SECONDS = 1
+
+"""
+DISTRIBUTED CONSTANTS
+"""
+# Interval between two heartbeats of a worker, it also streams the new log output of its tasks
+WORKER_HEARTBEAT_INTERVAL_SECONDS = 2
+# A worker which did not send anything for this long is considered lost
+WORKER_HEARTBEAT_TIMEOUT_SECONDS = 30
+# Number of times a task is rescheduled after losing its worker before it fails
+MAX_TASK_RESCHEDULES = 2
+# Maximum number of queued tasks of the coordinator when neither --jobs nor maxParallel are given
+DEFAULT_REMOTE_MAX_PARALLEL = 64
+# Time a worker keeps trying to reach the coordinator before giving up
+DEFAULT_WORKER_CONNECT_TIMEOUT_SECONDS = 60
+# Largest message accepted from the other end of a connection
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+# Size of the log chunks streamed from a worker
+LOG_CHUNK_SIZE = 64 * 1024
+# Time the coordinator keeps tasks queued while no worker is connected before failing them
+WORKER_WAIT_TIMEOUT_SECONDS = 300
+# Environment variable holding the secret a worker gives in its hello, required to listen on tcp
+WORKER_TOKEN_VARIABLE = "VALIDATE_WORKER_TOKEN"
+# Host the coordinator listens on when a tcp address has no host
+DEFAULT_LISTEN_HOST = "127.0.0.1"
+
+"""
+LOG STREAMING CONSTANTS
+"""
+# Lines of task output shown on the console per second, the others only go to the logfiles
+LOG_STREAM_MAX_LINES_PER_SECOND = 200
+# Longest line shown on the console, longer lines are cut
+LOG_STREAM_MAX_LINE_LENGTH = 1024
+# Bytes read from a task at once, the other tasks get their turn before the next read
+LOG_STREAM_READ_SIZE = 64 * 1024
+
+"""
+FAILURE LOG CONSTANTS
+"""
+# Last lines of the log of a failed task shown on the console
+DEFAULT_FAILURE_LOG_TAIL_LINES = 100
+# At most this many bytes from the end of the log are shown
+DEFAULT_FAILURE_LOG_TAIL_BYTES = 64 * 1024
+# Lines of the log matching these patterns are shown before the tail, case insensitive
+DEFAULT_FAILURE_LOG_PATTERNS = [r"\berror\b", r"\bfail(ed|ure)?\b", r"\bexception\b", r"Traceback"]
+# Number of matching lines shown, the last ones of the log
+DEFAULT_FAILURE_LOG_MAX_MATCHES = 20
+# The error patterns are searched in this many bytes at the end of the log, 0 to search the whole log
+DEFAULT_FAILURE_LOG_SEARCH_BYTES = 16 * 1024 * 1024
+# Longest log line shown on the console, longer lines are cut
+FAILURE_LOG_MAX_LINE_LENGTH = 1024
+# Size of the blocks read to count the lines of a log
+FAILURE_LOG_BLOCK_SIZE = 1024 * 1024
@@ -17,6 +17,19 @@ class InvalidStrategyError(Exception):
         return self.message
 
 
+class UnsupportedStrategyError(Exception):
+    """
+    Raise when the strategy of a group cannot be used with the scheduling of the run
+    """
+
+    def __init__(self, strategy: str, group: str, scheduling: str):
+        self.message = f"Configuration error: Strategy '{strategy}' of group '{group}' is not supported with scheduling '{scheduling}'."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
 class InvalidModeError(Exception):
     """
     Raise when mode defined is not valid
@@ -57,3 +70,148 @@ class InvalidGroupTypeError(Exception):
 
     def __str__(self):
         return self.message
+
+
+class InvalidSchedulingError(Exception):
+    """
+    Raise when scheduling defined is not valid
+    """
+
+    def __init__(self, scheduling: str):
+        self.message = f"Scheduling '{scheduling}' not found in valid schedulings. Valid values: {VALID_SCHEDULINGS}"
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class UnknownDependencyError(Exception):
+    """
+    Raise when a task or group depends on something that is not defined
+    """
+
+    def __init__(self, dependency: str, dependent: str):
+        self.message = f"Configuration error: '{dependent}' depends on '{dependency}' which is not defined."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class DependencyCycleError(Exception):
+    """
+    Raise when the task dependencies form a cycle
+    """
+
+    def __init__(self, names: list):
+        cycle = ",".join(names)
+        self.message = f"Configuration error: Dependency cycle detected between: {cycle}"
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidLimitError(Exception):
+    """
+    Raise when a concurrency limit is not a positive number
+    """
+
+    def __init__(self, parameter: str, value, owner: str):
+        self.message = f"Configuration error: '{parameter}' of '{owner}' must be a positive integer, got '{value}'."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidShardError(Exception):
+    """
+    Raise when the shard of a run is not given as INDEX/COUNT
+    """
+
+    def __init__(self, shard: str):
+        self.message = f"Invalid shard '{shard}', expected INDEX/COUNT with 1 <= INDEX <= COUNT, e.g. 2/4."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class ProtocolError(Exception):
+    """
+    Raise when the coordinator or a worker receives something which is not a valid message
+    """
+
+    def __init__(self, reason: str):
+        self.message = f"Protocol error: {reason}"
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class UnsafeListenAddressError(Exception):
+    """
+    Raise when the coordinator would accept workers it cannot trust on its address
+    """
+
+    def __init__(self, address: str, reason: str):
+        self.message = f"Cannot listen on '{address}': {reason}."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidPatternError(Exception):
+    """
+    Raise when a regular expression of the config cannot be compiled
+    """
+
+    def __init__(self, pattern: str, reason: str):
+        self.message = f"Configuration error: invalid pattern '{pattern}': {reason}."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidIntervalError(Exception):
+    """
+    Raise when an interval of the config is not a number of 0 or more, or more than 0 if it must be positive
+    """
+
+    def __init__(self, parameter: str, value, positive: bool = False):
+        bound = "more than 0" if positive else "0 or more"
+        self.message = f"Configuration error: '{parameter}' must be a number, {bound}, got '{value}'."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidMatrixError(Exception):
+    """
+    Raise when the Matrix of a task cannot be expanded
+    """
+
+    def __init__(self, task: str, reason: str):
+        self.message = f"Configuration error: invalid Matrix for task '{task}': {reason}."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class TaskCancelledError(Exception):
+    """
+    Raise when a running task is cancelled by the scheduler
+    """
+
+    def __init__(self, task: str):
+        self.message = f"Task '{task}' was cancelled."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
@@ -0,0 +1,152 @@
+import collections
+import mmap
+import os
+import re
+from ..common.constants import *
+
+
+class FailureLog(object):
+    """
+    Report of the log of a failed task which does not depend on the size of the log.
+
+    The log is memory mapped, the report only holds the last lines matching the error patterns
+    and the last lines of the log. The patterns are only searched near the end of the log,
+    the whole log is referenced by its path.
+    """
+
+    def __init__(
+        self,
+        tailLines: int = DEFAULT_FAILURE_LOG_TAIL_LINES,
+        tailBytes: int = DEFAULT_FAILURE_LOG_TAIL_BYTES,
+        patterns: list = None,
+        maxMatches: int = DEFAULT_FAILURE_LOG_MAX_MATCHES,
+        searchBytes: int = DEFAULT_FAILURE_LOG_SEARCH_BYTES,
+    ):
+        """
+        Initialize the report settings.
+        Patterns are regular expressions matched case insensitively, ^ and $ match at each line.
+        """
+
+        self.tailLines = tailLines
+        self.tailBytes = tailBytes
+        self.maxMatches = maxMatches
+        self.searchBytes = searchBytes
+
+        patterns = DEFAULT_FAILURE_LOG_PATTERNS if patterns is None else patterns
+        self.pattern = (
+            re.compile(
+                "|".join("(?:%s)" % pattern for pattern in patterns).encode(),
+                re.IGNORECASE | re.MULTILINE,
+            )
+            if patterns
+            else None
+        )
+
+    def _decode(self, line: bytes):
+        return line[:FAILURE_LOG_MAX_LINE_LENGTH].decode(errors="replace").rstrip()
+
+    def tail(self, content):
+        """
+        Last lines of the log, at most tailLines lines and tailBytes bytes
+        """
+
+        end = len(content)
+        if end and content[end - 1:end] == b"\n":
+            end -= 1
+
+        limit = max(0, end - self.tailBytes)
+        start = end
+        afterNewline = False
+
+        # Walk back one line at a time, a line cut by tailBytes is shown from the limit
+        #
+        for _ in range(self.tailLines):
+            newline = content.rfind(b"\n", limit, start)
+            if newline < 0:
+                start = limit
+                afterNewline = False
+                break
+            start = newline
+            afterNewline = True
+
+        if afterNewline:
+            start += 1
+
+        if start >= end and not afterNewline:
+            return []
+
+        return [self._decode(line) for line in content[start:end].split(b"\n")]
+
+    def searchStart(self, content):
+        """
+        Offset of the part of the log searched for the error patterns
+        """
+
+        return max(0, len(content) - self.searchBytes) if self.searchBytes else 0
+
+    def matches(self, content):
+        """
+        Last lines matching the error patterns within the last searchBytes of the log, with their line number.
+        Lines are numbered from the start of the searched part, the log before it is never read.
+        """
+
+        if not self.pattern:
+            return []
+
+        searchStart = self.searchStart(content)
+
+        found = collections.deque(maxlen=self.maxMatches)
+        for match in self.pattern.finditer(content, searchStart):
+            lineStart = max(content.rfind(b"\n", searchStart, match.start()) + 1, searchStart)
+            if found and lineStart <= found[-1][0]:
+                continue
+
+            lineEnd = content.find(b"\n", match.start())
+            found.append((lineStart, len(content) if lineEnd < 0 else lineEnd))
+
+        # Lines are counted block by block, moving forward from one matching line to the next
+        #
+        matches = []
+        lineNumber = 1
+        counted = searchStart
+        for lineStart, lineEnd in found:
+            for blockStart in range(counted, lineStart, FAILURE_LOG_BLOCK_SIZE):
+                blockEnd = min(blockStart + FAILURE_LOG_BLOCK_SIZE, lineStart)
+                lineNumber += content[blockStart:blockEnd].count(b"\n")
+            counted = lineStart
+
+            matches.append((lineNumber, self._decode(content[lineStart:lineEnd])))
+
+        return matches
+
+    def report(self, logfile: str):
+        """
+        Lines reporting the log of a failed task
+        """
+
+        if not os.path.isfile(logfile):
+            return []
+
+        size = os.path.getsize(logfile)
+        lines = ["Full log: %s (%d bytes)" % (logfile, size)]
+        if not size:
+            return lines
+
+        with open(logfile, "rb") as reader:
+            with mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                matches = self.matches(content)
+                searchStart = self.searchStart(content)
+                tail = self.tail(content)
+
+        if matches and searchStart:
+            lines.append(
+                "--- Last %d line(s) matching the error patterns, numbered from byte %d ---" % (len(matches), searchStart)
+            )
+        elif matches:
+            lines.append("--- Last %d line(s) matching the error patterns ---" % len(matches))
+        lines.extend("%7d: %s" % (lineNumber, line) for lineNumber, line in matches)
+
+        lines.append("--- Last %d line(s) ---" % len(tail))
+        lines.extend(tail)
+
+        return lines
@@ -23,6 +23,14 @@ class ConsoleLogger(object):
         sys.stdout.write(cls.NOCOLOR)
         sys.stdout.flush()
 
+    @classmethod
+    def logFailureLines(cls, lines: list):
+        """
+        Print many failure lines with a single write
+        """
+        sys.stdout.write(cls.RED + "".join(line + "\n" for line in lines) + cls.NOCOLOR)
+        sys.stdout.flush()
+
     @classmethod
     def logSuccess(cls, farg, *args):
         sys.stdout.write(cls.GREEN)
@@ -83,6 +91,17 @@ class Global(object):
     CURRENT_PATH = "./"
     WORKING_DIR = "./"
     LOG_DIR = "./.validate_log/"
+    HISTORY_FILE = "./.validate_history.db"
+    CONFIG_CACHE_DIR = None
+    RESULT_CACHE = None
+    LOG_STREAMER = None
+    FAILURE_LOG = None
+    RUN_MONITOR = None
+    TRACE = None
+    TRACE_FILE = "./.validate_trace.json"
+    RESOURCE_SAMPLE_SECONDS = 1
+    TERM_WAIT_TIME_IN_MINUTES = None
+    HEDGE_MULTIPLE = 2
     FLOAT_EPS = 1e-5
     """
     BUILD_ROOT = os.environ['BUILD_ROOT']
@@ -0,0 +1,175 @@
+import math
+import sqlite3
+import statistics
+import time
+from threading import Lock
+from ..common.constants import *
+
+
+class DurationHistory(object):
+    """
+    Local store of the task durations of the previous runs, keyed by task name and command.
+    Only the last HISTORY_RETENTION_SIZE runs of each task are kept.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the store, it is created if it does not exist
+        """
+
+        self.path = path
+
+        # The store is written by the scheduling thread and read by the main thread
+        #
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.historyLock = Lock()
+
+        with self.historyLock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS task_runs ("
+                "name TEXT NOT NULL, "
+                "command TEXT NOT NULL, "
+                "duration REAL NOT NULL, "
+                "status TEXT NOT NULL, "
+                "finished REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS task_runs_key ON task_runs (name, command, finished)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS task_attempts ("
+                "name TEXT NOT NULL, "
+                "command TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL, "
+                "status TEXT NOT NULL, "
+                "finished REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS task_attempts_key ON task_attempts (name, finished)"
+            )
+
+    def close(self):
+        """
+        Close the store
+        """
+
+        with self.historyLock:
+            self.connection.close()
+
+    def record(self, name: str, command: str, durationInSeconds: float, status: str):
+        """
+        Save the duration of a finished task
+        """
+
+        with self.historyLock, self.connection:
+            self.connection.execute(
+                "INSERT INTO task_runs (name, command, duration, status, finished) VALUES (?, ?, ?, ?, ?)",
+                (name, command, durationInSeconds, status, time.time()),
+            )
+            self.connection.execute(
+                "DELETE FROM task_runs WHERE name = ? AND command = ? AND rowid NOT IN ("
+                "SELECT rowid FROM task_runs WHERE name = ? AND command = ? ORDER BY finished DESC, rowid DESC LIMIT ?)",
+                (name, command, name, command, HISTORY_RETENTION_SIZE),
+            )
+
+    def recordAttempts(self, name: str, command: str, attempts: int, status: str):
+        """
+        Save the number of attempts a finished task took, and its final status
+        """
+
+        with self.historyLock, self.connection:
+            self.connection.execute(
+                "INSERT INTO task_attempts (name, command, attempts, status, finished) VALUES (?, ?, ?, ?, ?)",
+                (name, command, attempts, status, time.time()),
+            )
+            self.connection.execute(
+                "DELETE FROM task_attempts WHERE name = ? AND rowid NOT IN ("
+                "SELECT rowid FROM task_attempts WHERE name = ? ORDER BY finished DESC, rowid DESC LIMIT ?)",
+                (name, name, HISTORY_RETENTION_SIZE),
+            )
+
+    def flakiness(self, name: str, limit: int = FLAKINESS_SAMPLE_SIZE):
+        """
+        Number of the last runs of a task, and how many of them passed only after a retry
+        """
+
+        with self.historyLock:
+            rows = self.connection.execute(
+                "SELECT attempts, status FROM task_attempts WHERE name = ? ORDER BY finished DESC LIMIT ?",
+                (name, limit),
+            ).fetchall()
+
+        return len(rows), len([row for row in rows if row[0] > 1 and row[1] == STATUS_PASS])
+
+    def flakyTasks(self, limit: int = FLAKINESS_REPORT_SIZE):
+        """
+        The flakiest tasks, as (name, runs, flaky runs) ordered by the share of flaky runs
+        """
+
+        with self.historyLock:
+            names = [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT DISTINCT name FROM task_attempts WHERE attempts > 1"
+                ).fetchall()
+            ]
+
+        tasks = [(name,) + self.flakiness(name) for name in names]
+        tasks = [task for task in tasks if task[2]]
+        tasks.sort(key=lambda task: (-task[2] / task[1], task[0]))
+
+        return tasks[:limit]
+
+    def durations(self, name: str, command: str, limit: int = HISTORY_SAMPLE_SIZE):
+        """
+        Durations of the last passing runs of a task, the most recent first
+        """
+
+        with self.historyLock:
+            rows = self.connection.execute(
+                "SELECT duration FROM task_runs WHERE name = ? AND command = ? AND status = ? "
+                "ORDER BY finished DESC LIMIT ?",
+                (name, command, STATUS_PASS, limit),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def durationPercentile(self, name: str, command: str, percentile: float):
+        """
+        Duration under which the given percent of the last passing runs of a task finished,
+        None if it did not pass HEDGE_MIN_SAMPLES times yet
+        """
+
+        durations = sorted(self.durations(name, command, HEDGE_SAMPLE_SIZE))
+        if len(durations) < HEDGE_MIN_SAMPLES:
+            return None
+
+        # Nearest rank, so the percentile is one of the durations seen
+        #
+        rank = max(1, math.ceil(percentile / 100.0 * len(durations)))
+        return durations[rank - 1]
+
+    def expectedDuration(self, name: str, command: str):
+        """
+        Expected duration of a task, None if it never passed before
+        """
+
+        durations = self.durations(name, command)
+        if not durations:
+            return None
+
+        return statistics.median(durations)
+
+    def expectedDurations(self, tasks: list):
+        """
+        Expected duration of each of the given tasks.
+        Tasks without history are expected to take as long as the median of the tasks with history,
+        DEFAULT_EXPECTED_DURATION_SECONDS if none of them has history.
+        """
+
+        expected = [self.expectedDuration(task["Name"], task["Command"]) for task in tasks]
+
+        known = [duration for duration in expected if duration is not None]
+        default = statistics.median(known) if known else DEFAULT_EXPECTED_DURATION_SECONDS
+
+        return [default if duration is None else duration for duration in expected]
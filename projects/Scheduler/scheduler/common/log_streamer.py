@@ -0,0 +1,223 @@
+import os
+import selectors
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from ..common.constants import *
+
+
+class LogStream(object):
+    """
+    Output of one task, read from a named pipe the task writes to
+    """
+
+    def __init__(self, task: dict, path: str):
+        self.prefix = "[%d] %s | " % (task["id"], task["Name"])
+        self.path = path
+        self.logfile = task["logfile"]
+
+        # Opened for writing as well, so the pipe never reaches its end while the task
+        # is starting. The stream ends when the task is reported done.
+        #
+        self.reader = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        self.log = open(self.logfile, "wb")
+
+        self.partialLine = b""
+        self.hiddenLines = 0
+        self.closed = threading.Event()
+
+
+class LogStreamer(object):
+    """
+    Stream the output of the running tasks to their logfiles and to the console.
+
+    Every task writes to its own named pipe, a single thread waits on all of them with a selector.
+    Each line is written to the logfile of the task and shown on the console prefixed by the task.
+    A task writing faster than the streamer reads fills its pipe and waits, and at most
+    maxLinesPerSecond lines are shown on the console, the other lines are only counted.
+    """
+
+    def __init__(self, maxLinesPerSecond: int = LOG_STREAM_MAX_LINES_PER_SECOND):
+        """
+        Start the reader thread
+        """
+
+        self.maxLinesPerSecond = maxLinesPerSecond
+        self.tokens = float(maxLinesPerSecond)
+        self.lastRefill = time.monotonic()
+
+        self.directory = tempfile.mkdtemp(prefix="validate_streams_")
+        self.selector = selectors.DefaultSelector()
+        self.streams = {}
+
+        # Streams are added and removed by the reader thread only, the other threads
+        # queue their requests and wake it up
+        #
+        self.requests = []
+        self.requestsLock = threading.Lock()
+        self.wakeupReader, self.wakeupWriter = os.pipe()
+        os.set_blocking(self.wakeupWriter, False)
+        self.selector.register(self.wakeupReader, selectors.EVENT_READ)
+
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def open(self, task: dict):
+        """
+        Create the pipe the task writes its output to, set as LogFifo of the task
+        """
+
+        path = os.path.join(self.directory, "%d.fifo" % task["id"])
+        os.mkfifo(path)
+
+        stream = LogStream(task, path)
+        self.streams[task["id"]] = stream
+        task["LogFifo"] = path
+
+        self._request(("add", stream))
+
+    def close(self, task: dict):
+        """
+        Wait until the output of a finished task is written.
+        The task process is gone, so its whole output is in the pipe, later output of
+        processes it left behind is dropped.
+        """
+
+        stream = self.streams.pop(task.get("id"), None)
+        if stream is None:
+            return
+
+        task.pop("LogFifo", None)
+
+        self._request(("close", stream))
+        stream.closed.wait()
+
+    def stop(self):
+        """
+        Drop the remaining streams and stop the reader thread
+        """
+
+        self._request(("stop", None))
+        self.thread.join()
+        self.streams = {}
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _request(self, request: tuple):
+        with self.requestsLock:
+            self.requests.append(request)
+
+        try:
+            os.write(self.wakeupWriter, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _handleRequests(self):
+        os.read(self.wakeupReader, 4096)
+
+        with self.requestsLock:
+            requests, self.requests = self.requests, []
+
+        for action, stream in requests:
+            if action == "add":
+                self.selector.register(stream.reader, selectors.EVENT_READ, stream)
+            elif action == "close":
+                while self._read(stream):
+                    pass
+                self._end(stream)
+            elif action == "stop":
+                self.stopped = True
+
+    def _run(self):
+        """
+        Read the pipes which have output until the streamer is stopped
+        """
+
+        while not self.stopped:
+            for key, _ in self.selector.select(timeout=1):
+                if key.data is None:
+                    self._handleRequests()
+                else:
+                    self._read(key.data)
+
+        for key in list(self.selector.get_map().values()):
+            if key.data is not None:
+                self._end(key.data)
+
+        self.selector.close()
+        os.close(self.wakeupReader)
+        os.close(self.wakeupWriter)
+
+    def _read(self, stream: LogStream):
+        """
+        Read the available output of a task, return the number of bytes read
+        """
+
+        try:
+            data = os.read(stream.reader, LOG_STREAM_READ_SIZE)
+        except BlockingIOError:
+            return 0
+
+        stream.log.write(data)
+
+        lines = (stream.partialLine + data).split(b"\n")
+        stream.partialLine = lines.pop()
+
+        # A line without end is shown once it gets too long
+        #
+        if len(stream.partialLine) > LOG_STREAM_MAX_LINE_LENGTH:
+            lines.append(stream.partialLine)
+            stream.partialLine = b""
+
+        self._show(stream, lines)
+
+        return len(data)
+
+    def _show(self, stream: LogStream, lines: list):
+        """
+        Show lines of a task on the console, within the rate limit
+        """
+
+        now = time.monotonic()
+        self.tokens = min(
+            self.maxLinesPerSecond,
+            self.tokens + (now - self.lastRefill) * self.maxLinesPerSecond,
+        )
+        self.lastRefill = now
+
+        shown = lines[: int(self.tokens)]
+        self.tokens -= len(shown)
+        stream.hiddenLines += len(lines) - len(shown)
+
+        if shown:
+            sys.stdout.write(
+                "".join(
+                    stream.prefix + line[:LOG_STREAM_MAX_LINE_LENGTH].decode(errors="replace") + "\n"
+                    for line in shown
+                )
+            )
+            sys.stdout.flush()
+
+    def _end(self, stream: LogStream):
+        """
+        Finish the output of a task
+        """
+
+        if stream.partialLine:
+            self._show(stream, [stream.partialLine])
+
+        if stream.hiddenLines:
+            sys.stdout.write(
+                stream.prefix
+                + "%d line(s) not shown, see %s\n" % (stream.hiddenLines, stream.logfile)
+            )
+            sys.stdout.flush()
+
+        self.selector.unregister(stream.reader)
+        os.close(stream.reader)
+        stream.log.close()
+        os.unlink(stream.path)
+        stream.closed.set()
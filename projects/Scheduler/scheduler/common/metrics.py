@@ -1,5 +1,6 @@
 import collections
 from ..common.helper import ConsoleLogger
+from ..common.constants import *
 from threading import Lock
 
 
@@ -12,11 +13,24 @@ class Metrics(object):
     Class for storing metrics about tasks ran by the validation framework
     """
 
-    def __init__(self):
+    def __init__(self, history=None):
         """
-        Initialize the storage
+        Initialize the storage, durations are also saved to the history store if one is given
         """
         self.taskMetrics = collections.OrderedDict()
+        self.history = history
+
+        # Writes the results files while the run goes on, set by the run
+        #
+        self.reporter = None
+
+        # Seconds from the first failure until the processes of the cancelled tasks were gone
+        #
+        self.cancellationSeconds = None
+
+        # Failed attempts of the tasks which run again, keyed like the task metrics
+        #
+        self.taskAttempts = collections.defaultdict(list)
 
         # Lock to surround the ordered dictionary
         #
@@ -28,22 +42,117 @@ class Metrics(object):
         """
         return divmod(int(seconds), 60)
 
-    def addTaskMetrics(self, taskName, durationInSeconds, status, cleanupDuration=None):
+    def addTaskMetrics(
+        self,
+        taskName,
+        durationInSeconds,
+        status,
+        cleanupDuration=None,
+        task=None,
+        resources=None,
+        timedOut=False,
+    ):
         """
-        Record a task duration
+        Record a task duration, and the resource usage of its process tree if it was sampled.
+        The duration of a task which ran is saved to the history keyed by the Name and Command of the task,
+        and the results files of the reporter are brought up to date.
+        A task which passed after failed attempts is flaky.
         """
         self.metricsLock.acquire()
 
         self.taskMetrics[taskName] = {
             "taskDuration": durationInSeconds,
             "status": status,
+            "timedOut": timedOut,
         }
 
+        attempts = self.taskAttempts.pop(taskName, [])
+        flaky = bool(attempts) and status in PASSING_STATUSES
+        if attempts:
+            attempts.append({"taskDuration": durationInSeconds, "status": status, "timedOut": timedOut})
+            self.taskMetrics[taskName]["attempts"] = attempts
+            self.taskMetrics[taskName]["flaky"] = flaky
+
         if cleanupDuration is not None:
             self.taskMetrics[taskName]["taskCleanup"] = cleanupDuration
 
+        if task:
+            self.taskMetrics[taskName]["name"] = task["Name"]
+            self.taskMetrics[taskName]["group"] = task.get("Group")
+
+        if resources:
+            self.taskMetrics[taskName]["resources"] = resources
+
         self.metricsLock.release()
 
+        if self.history and task and status in (STATUS_PASS, STATUS_FAIL):
+            self.history.record(task["Name"], task["Command"], durationInSeconds, status)
+            self.history.recordAttempts(task["Name"], task["Command"], len(attempts) or 1, status)
+
+        if self.reporter:
+            self.reporter.update()
+
+    def addTaskAttempt(self, taskName, durationInSeconds, status, task=None, timedOut=False):
+        """
+        Record a failed attempt of a task which runs again,
+        it is added to the metrics of the task once its last attempt is recorded
+        """
+
+        with self.metricsLock:
+            self.taskAttempts[taskName].append(
+                {"taskDuration": durationInSeconds, "status": status, "timedOut": timedOut}
+            )
+
+        if self.history and task:
+            self.history.record(task["Name"], task["Command"], durationInSeconds, status)
+
+    def recordCancellation(self, seconds: float):
+        """
+        Record how long the running tasks took to stop after a failure, only the first time counts
+        """
+
+        with self.metricsLock:
+            if self.cancellationSeconds is None:
+                self.cancellationSeconds = seconds
+
+    def results(self):
+        """
+        Copy of the metrics of every finished task, in the order they finished
+        """
+
+        with self.metricsLock:
+            return [dict(info, task=taskName) for taskName, info in self.taskMetrics.items()]
+
+    def loadResults(self, results: list):
+        """
+        Add the metrics of tasks which ran elsewhere, as returned by results()
+        """
+
+        with self.metricsLock:
+            for info in results:
+                info = dict(info)
+                self.taskMetrics[info.pop("task")] = info
+
+    def durationPercentile(self, task: dict, percentile: float):
+        """
+        Percentile of the previous durations of a task, None without enough history
+        """
+
+        if not self.history:
+            return None
+
+        return self.history.durationPercentile(task["Name"], task["Command"], percentile)
+
+    def expectedDurations(self, tasks: list):
+        """
+        Expected duration of each of the given tasks, all the same if there is no history
+        """
+
+        if not self.history:
+            return [DEFAULT_EXPECTED_DURATION_SECONDS] * len(tasks)
+
+        return self.history.expectedDurations(tasks)
+
     def printTaskSummary(self):
         """
         Print the summary for each task ran
@@ -66,8 +175,79 @@ class Metrics(object):
 
         ConsoleLogger.logInfo("".center(70, "="))
 
+        cached = sum(
+            1 for info in self.taskMetrics.values() if info["status"] == STATUS_CACHED
+        )
+        if cached:
+            ConsoleLogger.logInfo("%d task(s) replayed from cache." % cached)
+
+        self._printFlakyTasks()
+
+        if self.cancellationSeconds is not None:
+            ConsoleLogger.logInfo(
+                "Running tasks stopped %.1f sec after the first failure." % self.cancellationSeconds
+            )
+
+        self._printResourceUsage()
+
         self.metricsLock.release()
 
+    def _printFlakyTasks(self):
+        """
+        Print the tasks which passed after a retry, with how flaky they were in the previous runs
+        """
+
+        flaky = [(task, info) for task, info in self.taskMetrics.items() if info.get("flaky")]
+        if not flaky:
+            return
+
+        ConsoleLogger.logInfo("%d task(s) passed after a retry:" % len(flaky))
+
+        for task, info in flaky:
+            line = "  %s: %d attempts" % (task, len(info["attempts"]))
+            if self.history and "name" in info:
+                runs, flakyRuns = self.history.flakiness(info["name"])
+                line += ", flaky in %d of its last %d run(s)" % (flakyRuns, runs)
+            ConsoleLogger.logInfo(line)
+
+    def _printResourceUsage(self):
+        """
+        Print the resource usage of the tasks whose process tree was sampled.
+        CPU % is the CPU time over the duration, it tells CPU bound tasks from the ones waiting on IO.
+        """
+
+        sampled = [
+            (task, info) for task, info in self.taskMetrics.items() if "resources" in info
+        ]
+        if not sampled:
+            return
+
+        ConsoleLogger.logInfo(" Resource Usage ".center(70, "="))
+        ConsoleLogger.logInfo(
+            "{:^20}| {:^7}| {:^7}| {:^5}| {:^8}| {:^6}| {:^5}".format(
+                "Task", "User s", "Sys s", "CPU %", "Peak RSS", "IO MB", "Procs"
+            )
+        )
+        ConsoleLogger.logInfo("".center(70, "="))
+
+        for task, info in sampled:
+            resources = info["resources"]
+            cpu = resources["cpuUser"] + resources["cpuSystem"]
+            duration = info["taskDuration"]
+            ConsoleLogger.logInfo(
+                "{:<20}| {:>7.1f}| {:>7.1f}| {:>5}| {:>5} MB| {:>6}| {:>5}".format(
+                    task[:20],
+                    resources["cpuUser"],
+                    resources["cpuSystem"],
+                    "%d" % (100 * cpu / duration) if duration > 0 else "-",
+                    resources["peakRssBytes"] // (1024 * 1024),
+                    (resources["readBytes"] + resources["writeBytes"]) // (1024 * 1024),
+                    resources["childProcesses"],
+                )
+            )
+
+        ConsoleLogger.logInfo("".center(70, "="))
+
     def _printTaskInfo(self, taskName, durationInSeconds, status):
         """
         Format and print the task metrics
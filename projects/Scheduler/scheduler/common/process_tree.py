@@ -0,0 +1,122 @@
+import os
+import signal
+import time
+import psutil
+from ..common.constants import *
+from ..common.helper import Global
+
+
+class ProcessTree(object):
+    """
+    Stop the processes of tasks.
+
+    Each task runs in its own session, so its shell and everything it starts share a process group.
+    The groups get SIGTERM, then SIGKILL once the grace period is over, which also reaches the processes
+    started after the tree was listed. Zombies count as gone, they only wait for their parent.
+    """
+
+    @classmethod
+    def graceSeconds(cls, task: dict = None):
+        """
+        Time the processes of the task, or of any task if none is given, get to exit after SIGTERM
+        """
+
+        termWait = Global.TERM_WAIT_TIME_IN_MINUTES
+        if task is not None:
+            termWait = task.get("TermWaitTimeInMins", termWait)
+        if termWait is None:
+            termWait = DEFAULT_TERM_WAIT_TIME_IN_MINUTES
+
+        return termWait * 60
+
+    @classmethod
+    def collect(cls, pid: int, includeRoot: bool = True):
+        """
+        The process pid and all its descendants
+        """
+
+        try:
+            root = psutil.Process(pid)
+            processes = root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+
+        return [root] + processes if includeRoot else processes
+
+    @classmethod
+    def terminate(cls, processes: list, graceSeconds: float, groups: list = ()):
+        """
+        Stop the processes, their process groups and the given groups,
+        SIGKILL the processes still alive after graceSeconds.
+        Return the number of seconds until they were all gone.
+        """
+
+        startTime = time.time()
+
+        cls._signal(processes, groups, signal.SIGTERM)
+        alive = cls._waitForExit(processes, graceSeconds)
+
+        if alive:
+            cls._signal(processes, groups, signal.SIGKILL)
+            cls._waitForExit(alive, PROCESS_KILL_WAIT_SECONDS)
+
+        return time.time() - startTime
+
+    @classmethod
+    def _signal(cls, processes: list, groups: list, signalNumber: int):
+        """
+        Send the signal to the given groups and to the process group of each process,
+        or to the process itself when it shares the group of the scheduler
+        """
+
+        if not hasattr(os, "killpg"):
+            for process in processes:
+                try:
+                    process.send_signal(signalNumber)
+                except psutil.Error:
+                    pass
+            return
+
+        ownGroup = os.getpgrp()
+        signalled = set()
+
+        for process in processes:
+            try:
+                group = os.getpgid(process.pid)
+                if group == ownGroup:
+                    process.send_signal(signalNumber)
+                elif group not in signalled:
+                    signalled.add(group)
+                    os.killpg(group, signalNumber)
+            except (OSError, psutil.Error):
+                pass
+
+        for group in set(groups) - signalled - {ownGroup}:
+            try:
+                os.killpg(group, signalNumber)
+            except OSError:
+                pass
+
+    @classmethod
+    def _waitForExit(cls, processes: list, timeout: float):
+        """
+        Wait up to timeout seconds for the processes to exit, return the ones still alive
+        """
+
+        deadline = time.time() + timeout
+        delay = 0.001
+
+        while True:
+            alive = [process for process in processes if cls._isAlive(process)]
+            if not alive or time.time() >= deadline:
+                return alive
+
+            delay = min(delay * 2, PROCESS_POLL_MAX_DELAY_SECONDS)
+            time.sleep(min(delay, max(0, deadline - time.time())))
+
+    @classmethod
+    def _isAlive(cls, process: psutil.Process):
+        try:
+            return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
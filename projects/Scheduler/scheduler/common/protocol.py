@@ -0,0 +1,144 @@
+import ipaddress
+import json
+import os
+import socket
+import struct
+from threading import Lock
+from ..common.constants import *
+from ..common.exceptions import ProtocolError
+
+
+class Connection(object):
+    """
+    Connection between the coordinator and a worker.
+    Messages are JSON objects sent with their length, so any number can be sent from several threads.
+    """
+
+    HEADER = struct.Struct("!I")
+
+    def __init__(self, sock: socket.socket):
+        self.socket = sock
+        self.sendLock = Lock()
+
+    @classmethod
+    def parseAddress(cls, address: str):
+        """
+        Return the family and the address of tcp://HOST:PORT or unix://PATH,
+        tcp://PORT is on the loopback interface
+        """
+
+        if address.startswith("unix://"):
+            return socket.AF_UNIX, address[len("unix://"):]
+
+        if address.startswith("tcp://"):
+            host, _, port = address[len("tcp://"):].rpartition(":")
+            if port.isdigit():
+                return socket.AF_INET, (host.strip("[]") or DEFAULT_LISTEN_HOST, int(port))
+
+        raise ValueError("Invalid address '%s', expected tcp://HOST:PORT or unix://PATH" % address)
+
+    @classmethod
+    def isLoopback(cls, host: str):
+        """
+        Whether only the local host can reach host
+        """
+
+        if host == "localhost":
+            return True
+
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    @classmethod
+    def listen(cls, address: str):
+        """
+        Create the listening socket of the coordinator
+        """
+
+        family, target = cls.parseAddress(address)
+
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.unlink(target)
+
+        server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(target)
+        server.listen()
+
+        return server
+
+    @classmethod
+    def connect(cls, address: str, timeout: float = None):
+        """
+        Connect a worker to the coordinator
+        """
+
+        family, target = cls.parseAddress(address)
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(None)
+
+        return cls(sock)
+
+    def send(self, message: dict):
+        """
+        Send a message, raise OSError if the connection is lost
+        """
+
+        data = json.dumps(message, default=str).encode()
+
+        with self.sendLock:
+            self.socket.sendall(self.HEADER.pack(len(data)) + data)
+
+    def receive(self):
+        """
+        Wait for the next message, None once the other end closed the connection
+        """
+
+        header = self._receiveExactly(self.HEADER.size)
+        if header is None:
+            return None
+
+        (size,) = self.HEADER.unpack(header)
+        if size > MAX_MESSAGE_SIZE:
+            raise ProtocolError("Message of %d bytes is too large" % size)
+
+        data = self._receiveExactly(size)
+        if data is None:
+            return None
+
+        try:
+            return json.loads(data.decode())
+        except ValueError as e:
+            raise ProtocolError(str(e))
+
+    def _receiveExactly(self, size: int):
+        chunks = []
+        while size:
+            chunk = self.socket.recv(min(size, LOG_CHUNK_SIZE * 2))
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b"".join(chunks)
+
+    def close(self):
+        """
+        Close the connection, a thread waiting in receive returns None
+        """
+
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
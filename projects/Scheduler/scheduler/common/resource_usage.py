@@ -0,0 +1,77 @@
+import psutil
+
+
+class ResourceSampler(object):
+    """
+    Sample the resource usage of the process tree of a task.
+
+    CPU time and IO bytes of a process include the children it already waited for, so the sum over
+    the processes alive at a sample is the usage of the whole tree so far. A last sample taken while
+    the shell of the task is a zombie, after its exit but before it is reaped, makes them exact.
+    Peak RSS and the number of child processes only see what was alive at one of the samples.
+    """
+
+    def __init__(self, pid: int):
+        """
+        Sample the process tree rooted at pid
+        """
+
+        self.pid = pid
+        self.cpuUser = 0.0
+        self.cpuSystem = 0.0
+        self.peakRss = 0
+        self.readBytes = 0
+        self.writeBytes = 0
+        self.seen = set()
+
+    def sample(self):
+        """
+        Take one sample of the process tree
+        """
+
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return
+
+        cpuUser = cpuSystem = 0.0
+        rss = readBytes = writeBytes = 0
+
+        for process in processes:
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    cpuUser += times.user + times.children_user
+                    cpuSystem += times.system + times.children_system
+                    rss += process.memory_info().rss
+                    self.seen.add((process.pid, process.create_time()))
+                    io = process.io_counters()
+                    readBytes += io.read_bytes
+                    writeBytes += io.write_bytes
+            except (psutil.Error, AttributeError):
+                # Processes may exit during the sample, and IO counters are not available everywhere
+                #
+                continue
+
+        # Usage only grows, a smaller sum means a process exited before its parent waited for it
+        #
+        self.cpuUser = max(self.cpuUser, cpuUser)
+        self.cpuSystem = max(self.cpuSystem, cpuSystem)
+        self.peakRss = max(self.peakRss, rss)
+        self.readBytes = max(self.readBytes, readBytes)
+        self.writeBytes = max(self.writeBytes, writeBytes)
+
+    def usage(self):
+        """
+        Resource usage of the process tree as sampled so far
+        """
+
+        return {
+            "cpuUser": round(self.cpuUser, 3),
+            "cpuSystem": round(self.cpuSystem, 3),
+            "peakRssBytes": self.peakRss,
+            "readBytes": self.readBytes,
+            "writeBytes": self.writeBytes,
+            "childProcesses": len([key for key in self.seen if key[0] != self.pid]),
+        }
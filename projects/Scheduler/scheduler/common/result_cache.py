@@ -0,0 +1,186 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from ..common.constants import *
+
+
+class ResultCache(object):
+    """
+    Content addressed cache of passing task results.
+
+    The key of a task is a hash of its Command, the content of the files matched by its
+    Inputs globs and the value of the selected environment variables. A passing result is
+    saved with its log under the key, and replayed the next time the key is the same.
+    """
+
+    LOG_FILE = "log"
+    META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        directory: str,
+        workingDir: str = "./",
+        environment: list = None,
+        maxSizeMB: int = DEFAULT_CACHE_MAX_SIZE_MB,
+        maxAgeDays: float = DEFAULT_CACHE_MAX_AGE_DAYS,
+    ):
+        """
+        Initialize the cache, entries are stored under directory
+        """
+
+        self.directory = directory
+        self.workingDir = workingDir
+        self.environment = environment or []
+        self.maxSizeMB = maxSizeMB
+        self.maxAgeDays = maxAgeDays
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def keyOf(self, task: dict):
+        """
+        Compute the cache key of a task
+        """
+
+        digest = hashlib.sha256()
+        digest.update(b"command\0" + task["Command"].encode() + b"\0")
+
+        for path in self._inputFiles(task.get("Inputs", [])):
+            digest.update(b"input\0" + os.path.relpath(path, self.workingDir).encode() + b"\0")
+            with open(path, "rb") as reader:
+                for chunk in iter(lambda: reader.read(CACHE_READ_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            digest.update(b"\0")
+
+        for name in sorted(set(self.environment + task.get("CacheEnvironment", []))):
+            value = os.environ.get(name)
+            digest.update(b"env\0" + name.encode() + b"\0")
+            digest.update(b"-" if value is None else b"=" + value.encode())
+            digest.update(b"\0")
+
+        return digest.hexdigest()
+
+    def _inputFiles(self, patterns: list):
+        """
+        Files matched by the input globs, relative globs are resolved against the working directory
+        """
+
+        files = set()
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(self.workingDir, pattern), recursive=True):
+                if os.path.isfile(path):
+                    files.add(os.path.normpath(path))
+
+        return sorted(files)
+
+    def _entryPath(self, key: str):
+        return os.path.join(self.directory, key)
+
+    def lookup(self, key: str):
+        """
+        Return the metadata of the passing result saved under key, None if there is none
+        """
+
+        entry = self._entryPath(key)
+
+        try:
+            with open(os.path.join(entry, self.META_FILE), "r") as reader:
+                meta = json.load(reader)
+
+            # Recently used entries are evicted last
+            #
+            os.utime(entry, None)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("status") != STATUS_PASS:
+            return None
+        meta["logfile"] = os.path.join(entry, self.LOG_FILE)
+
+        return meta
+
+    def replayLog(self, meta: dict, logfile: str):
+        """
+        Copy the saved log of a result to the task logfile
+        """
+
+        if os.path.isfile(meta["logfile"]):
+            shutil.copyfile(meta["logfile"], logfile)
+
+    def store(self, key: str, task: dict, logfile: str, durationInSeconds: float):
+        """
+        Save a passing result and its log under key
+        """
+
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+
+        try:
+            if os.path.isfile(logfile):
+                shutil.copyfile(logfile, os.path.join(staging, self.LOG_FILE))
+
+            with open(os.path.join(staging, self.META_FILE), "w") as writer:
+                json.dump(
+                    {
+                        "name": task["Name"],
+                        "command": task["Command"],
+                        "status": STATUS_PASS,
+                        "taskDuration": durationInSeconds,
+                        "stored": time.time(),
+                    },
+                    writer,
+                )
+
+            # Replace the entry at once so concurrent readers never see half of it
+            #
+            entry = self._entryPath(key)
+            if os.path.exists(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self):
+        """
+        Remove the entries older than maxAgeDays, then the least recently used ones
+        until the cache is smaller than maxSizeMB
+        """
+
+        now = time.time()
+        entries = []
+
+        for name in os.listdir(self.directory):
+            entry = self._entryPath(name)
+            if not os.path.isdir(entry):
+                continue
+
+            lastUsed = os.path.getmtime(entry)
+
+            # Staging directories are only removed once they are surely abandoned
+            #
+            if name.startswith(".tmp-"):
+                if now - lastUsed > NUM_SECONDS_PER_HOUR:
+                    shutil.rmtree(entry, ignore_errors=True)
+                continue
+
+            if now - lastUsed > self.maxAgeDays * NUM_SECONDS_PER_DAY:
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+
+            size = sum(
+                os.path.getsize(os.path.join(root, file))
+                for root, _, files in os.walk(entry)
+                for file in files
+            )
+            entries.append((lastUsed, size, entry))
+
+        totalSize = sum(size for _, size, _ in entries)
+        maxSize = self.maxSizeMB * 1024 * 1024
+
+        for _, size, entry in sorted(entries):
+            if totalSize <= maxSize:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            totalSize -= size
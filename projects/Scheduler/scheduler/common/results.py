@@ -0,0 +1,353 @@
+import collections
+import json
+import os
+import socket
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from ..common.constants import *
+
+
+class ResultsFile(object):
+    """
+    Machine readable results of a run, one file per shard.
+    The files of the shards of a run are merged into a single file with the same layout.
+    """
+
+    @classmethod
+    def write(cls, path: str, metrics, passed: bool, shard=None):
+        """
+        Save the results of the finished tasks to path, passed is None while the run goes on
+        """
+
+        results = {
+            "version": RESULTS_FORMAT_VERSION,
+            "passed": passed,
+            "shards": [
+                {
+                    "index": shard.index if shard else 1,
+                    "count": shard.count if shard else 1,
+                    "plan": shard.plan if shard else None,
+                    "host": socket.gethostname(),
+                    "passed": passed,
+                    "finished": None if passed is None else time.time(),
+                }
+            ],
+            "cancellationSeconds": metrics.cancellationSeconds,
+            "tasks": metrics.results(),
+        }
+
+        cls._save(path, results)
+        return results
+
+    @classmethod
+    def read(cls, path: str):
+        """
+        Load a results file
+        """
+
+        with open(path, "r") as reader:
+            return json.load(reader)
+
+    @classmethod
+    def merge(cls, paths: list, path: str = None):
+        """
+        Combine the results files of the shards of a run, saved to path if given.
+        The merged run passes only if every shard passed, no shard is missing
+        and all the shards split the tasks the same way.
+        """
+
+        shards = []
+        tasks = []
+        for shardPath in paths:
+            results = cls.read(shardPath)
+            shards.extend(results["shards"])
+            tasks.extend(results["tasks"])
+
+        shards.sort(key=lambda shard: shard["index"])
+
+        counts = set(shard["count"] for shard in shards)
+        indexes = [shard["index"] for shard in shards]
+        expected = list(range(1, max(counts) + 1)) if counts else []
+        planMismatch = len(set(shard.get("plan") for shard in shards)) > 1
+
+        merged = {
+            "version": RESULTS_FORMAT_VERSION,
+            "passed": bool(shards)
+            and len(counts) == 1
+            and indexes == expected
+            and not planMismatch
+            and all(shard["passed"] for shard in shards),
+            "shards": shards,
+            "missingShards": [index for index in expected if index not in indexes],
+            "planMismatch": planMismatch,
+            "tasks": tasks,
+        }
+
+        if path:
+            cls._save(path, merged)
+
+        return merged
+
+    @classmethod
+    def _save(cls, path: str, results: dict):
+        """
+        Write the file at once so a reader never sees half of it
+        """
+
+        _replaceFile(path, json.dumps(results, indent=2))
+
+
+class JUnitFile(object):
+    """
+    Results of a run as JUnit XML, one testsuite per group and one testcase per task
+    """
+
+    @classmethod
+    def write(cls, path: str, metrics, passed: bool, shard=None):
+        """
+        Save the results of the finished tasks to path
+        """
+
+        groups = collections.OrderedDict()
+        for info in metrics.results():
+            groups.setdefault(info.get("group") or "tasks", []).append(info)
+
+        root = ElementTree.Element("testsuites", name="scheduler")
+        if shard:
+            root.set("name", "scheduler shard %d/%d" % (shard.index, shard.count))
+
+        for group, results in groups.items():
+            suite = ElementTree.SubElement(root, "testsuite", name=group)
+            for info in results:
+                testcase = ElementTree.SubElement(
+                    suite,
+                    "testcase",
+                    classname=group,
+                    name=info.get("name") or info["task"],
+                    time="%.3f" % info["taskDuration"],
+                )
+                if info.get("timedOut"):
+                    ElementTree.SubElement(testcase, "failure", type="timeout", message="Timed out")
+                elif info["status"] == STATUS_FAIL:
+                    ElementTree.SubElement(testcase, "failure", type="failure", message="Failed")
+                elif info["status"] == STATUS_SKIP:
+                    ElementTree.SubElement(testcase, "skipped")
+                elif info["status"] == STATUS_CACHED:
+                    ElementTree.SubElement(testcase, "system-out").text = "Replayed from cache."
+
+                # Failed attempts before the last one, as Maven Surefire reports reruns
+                #
+                rerun = "flakyFailure" if info.get("flaky") else "rerunFailure"
+                for attempt in info.get("attempts", [])[:-1]:
+                    ElementTree.SubElement(
+                        testcase,
+                        rerun,
+                        type="timeout" if attempt["timedOut"] else "failure",
+                        message="Attempt failed after %.3f sec" % attempt["taskDuration"],
+                    )
+
+            cls._count(suite, results)
+
+        cls._count(root, metrics.results())
+
+        _replaceFile(path, ElementTree.tostring(root, encoding="unicode"))
+
+    @classmethod
+    def _count(cls, element, results: list):
+        """
+        Set the totals JUnit readers expect on a testsuite or on the testsuites
+        """
+
+        element.set("tests", str(len(results)))
+        element.set("failures", str(sum(1 for info in results if info["status"] == STATUS_FAIL)))
+        element.set("errors", "0")
+        element.set("skipped", str(sum(1 for info in results if info["status"] == STATUS_SKIP)))
+        element.set("time", "%.3f" % sum(info["taskDuration"] for info in results))
+
+
+class PrometheusFile(object):
+    """
+    Results of a run in the Prometheus text format, for the textfile collector of the node exporter
+    """
+
+    @classmethod
+    def write(cls, path: str, metrics, passed: bool, shard=None):
+        """
+        Save the results of the finished tasks to path
+        """
+
+        results = metrics.results()
+        lines = []
+
+        def metric(name: str, kind: str, description: str, samples: list):
+            lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, kind))
+            for labels, value in samples:
+                lines.append("%s%s %s" % (name, cls._labels(labels), value))
+
+        def taskLabels(info: dict, **extra):
+            return dict(task=info.get("name") or info["task"], group=info.get("group") or "", **extra)
+
+        metric(
+            "scheduler_task_duration_seconds",
+            "gauge",
+            "Duration of the task in the last run.",
+            [(taskLabels(info), "%.3f" % info["taskDuration"]) for info in results],
+        )
+        metric(
+            "scheduler_task_status",
+            "gauge",
+            "Status of the task in the last run, 1 for its status and 0 for the others.",
+            [
+                (taskLabels(info, status=status), int(info["status"] == status))
+                for info in results
+                for status in (STATUS_PASS, STATUS_FAIL, STATUS_SKIP, STATUS_CACHED)
+            ],
+        )
+        metric(
+            "scheduler_task_timed_out",
+            "gauge",
+            "Whether the task timed out in the last run.",
+            [(taskLabels(info), int(bool(info.get("timedOut")))) for info in results],
+        )
+
+        metric(
+            "scheduler_task_attempts",
+            "gauge",
+            "Number of times the task ran in the last run.",
+            [(taskLabels(info), len(info.get("attempts", [])) or 1) for info in results],
+        )
+        metric(
+            "scheduler_task_flaky",
+            "gauge",
+            "Whether the task passed only after a retry in the last run.",
+            [(taskLabels(info), int(bool(info.get("flaky")))) for info in results],
+        )
+
+        sampled = [info for info in results if "resources" in info]
+        if sampled:
+            metric(
+                "scheduler_task_cpu_seconds",
+                "gauge",
+                "CPU time of the process tree of the task in the last run.",
+                [
+                    (taskLabels(info, mode=mode), "%.3f" % info["resources"][key])
+                    for info in sampled
+                    for mode, key in (("user", "cpuUser"), ("system", "cpuSystem"))
+                ],
+            )
+            metric(
+                "scheduler_task_peak_rss_bytes",
+                "gauge",
+                "Peak resident memory of the process tree of the task in the last run.",
+                [(taskLabels(info), info["resources"]["peakRssBytes"]) for info in sampled],
+            )
+
+        shardLabels = {"shard": "%d/%d" % (shard.index, shard.count)} if shard else {}
+        metric(
+            "scheduler_run_finished",
+            "gauge",
+            "Whether the last run is over.",
+            [(shardLabels, int(passed is not None))],
+        )
+        if passed is not None:
+            metric(
+                "scheduler_run_passed",
+                "gauge",
+                "Whether the last run passed.",
+                [(shardLabels, int(passed))],
+            )
+        if metrics.cancellationSeconds is not None:
+            metric(
+                "scheduler_run_cancellation_seconds",
+                "gauge",
+                "Time from the first failure until the processes of the cancelled tasks were gone.",
+                [(shardLabels, "%.3f" % metrics.cancellationSeconds)],
+            )
+        metric(
+            "scheduler_run_last_update_timestamp_seconds",
+            "gauge",
+            "Time the results of the last run were written.",
+            [(shardLabels, "%.3f" % time.time())],
+        )
+
+        _replaceFile(path, "\n".join(lines) + "\n")
+
+    @classmethod
+    def _labels(cls, labels: dict):
+        """
+        Format the labels of a sample, the values are escaped as the text format requires
+        """
+
+        if not labels:
+            return ""
+
+        def escape(value: str):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        return "{%s}" % ",".join('%s="%s"' % (name, escape(value)) for name, value in labels.items())
+
+
+class ResultsReporter(object):
+    """
+    Keep the results files of a run up to date while its tasks finish,
+    so dashboards can follow a run before it is over
+    """
+
+    # Writer of each kind of results file
+    #
+    WRITERS = {"json": ResultsFile, "junit": JUnitFile, "prometheus": PrometheusFile}
+
+    def __init__(self, metrics, paths: dict, shard=None, intervalSeconds: float = RESULTS_WRITE_INTERVAL_SECONDS):
+        """
+        Write the results of metrics to the file of each kind in paths,
+        at most once every intervalSeconds until the run is over
+        """
+
+        self.metrics = metrics
+        self.paths = {kind: path for kind, path in paths.items() if path}
+        self.shard = shard
+        self.intervalSeconds = intervalSeconds
+        self.lastWrite = 0
+        self.lock = threading.Lock()
+
+    def update(self):
+        """
+        A task finished, write the results files unless they were written recently
+        """
+
+        with self.lock:
+            if time.time() - self.lastWrite < self.intervalSeconds:
+                return
+            self._write(None)
+
+    def finish(self, passed: bool):
+        """
+        The run is over, write the final results files
+        """
+
+        with self.lock:
+            self._write(passed)
+
+        return list(self.paths.values())
+
+    def _write(self, passed: bool):
+        for kind, path in self.paths.items():
+            self.WRITERS[kind].write(path, self.metrics, passed, self.shard)
+        self.lastWrite = time.time()
+
+
+def _replaceFile(path: str, content: str):
+    """
+    Write a file at once so a reader never sees half of it
+    """
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temporary = path + ".tmp"
+    with open(temporary, "w") as writer:
+        writer.write(content)
+    os.replace(temporary, path)
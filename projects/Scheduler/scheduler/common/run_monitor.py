@@ -0,0 +1,144 @@
+import threading
+import time
+from ..common.helper import ConsoleLogger
+from ..common.constants import *
+
+
+class RunMonitor(object):
+    """
+    Progress of a run, fed by the schedulers when tasks start and finish.
+
+    The schedulers only update counters. The monitor thread wakes up every heartbeat
+    to report the running, queued and finished tasks, the tasks running for the longest time
+    and the expected time until the end of the run, and right away once the run is done.
+    """
+
+    def __init__(self, tasks: list, expectedDurations: list, capacity: int, heartbeatSeconds: float = DEFAULT_HEARTBEAT_SECONDS):
+        """
+        Initialize the monitor with the selected tasks of the run, their expected durations
+        and the number of tasks which can run at once
+        """
+
+        self.total = len(tasks)
+        self.expected = {id(task): duration for task, duration in zip(tasks, expectedDurations)}
+        self.capacity = max(1, capacity)
+        self.heartbeatSeconds = heartbeatSeconds
+
+        self.startTime = time.time()
+        self.running = {}
+        self.finished = set()
+        self.failed = 0
+
+        self.monitorLock = threading.Lock()
+        self.done = threading.Event()
+
+    def taskStarted(self, task: dict):
+        """
+        Event sent by the schedulers when a task is handed over to run
+        """
+
+        with self.monitorLock:
+            self.running[id(task)] = (task, time.time())
+
+    def taskFinished(self, task: dict, status: str):
+        """
+        Event sent by the schedulers when a task is done, skipped or cancelled
+        """
+
+        with self.monitorLock:
+            self.running.pop(id(task), None)
+            self.finished.add(id(task))
+            if status == STATUS_FAIL:
+                self.failed += 1
+
+    def runFinished(self):
+        """
+        Event sent once the run is over, the monitor stops
+        """
+
+        self.done.set()
+
+    def wait(self):
+        """
+        Report the progress every heartbeat until the run is over
+        """
+
+        while not self.done.wait(self.heartbeatSeconds):
+            self.report()
+
+    def _expectedDuration(self, task: dict):
+        return self.expected.get(id(task), DEFAULT_EXPECTED_DURATION_SECONDS)
+
+    def estimate(self, now: float = None):
+        """
+        Expected time until the end of the run: the remaining work spread over the free slots,
+        but at least the remaining time of the longest running task
+        """
+
+        now = now or time.time()
+
+        with self.monitorLock:
+            remainingRunning = [
+                max(0, self._expectedDuration(task) - (now - started))
+                for task, started in self.running.values()
+            ]
+            queued = [
+                duration
+                for taskId, duration in self.expected.items()
+                if taskId not in self.finished and taskId not in self.running
+            ]
+
+        remaining = remainingRunning + queued
+        if not remaining:
+            return 0
+
+        parallelism = min(self.capacity, len(remaining))
+        return max(sum(remaining) / parallelism, max(remainingRunning, default=0))
+
+    def report(self):
+        """
+        Print the progress of the run
+        """
+
+        now = time.time()
+
+        with self.monitorLock:
+            running = sorted(self.running.values(), key=lambda entry: entry[1])
+            finished = len(self.finished)
+            failed = self.failed
+
+        queued = max(0, self.total - finished - len(running))
+
+        ConsoleLogger.logInfo(
+            "Progress after %s: %d running, %d queued, %d/%d finished (%d failed), about %s left."
+            % (
+                self._format(now - self.startTime),
+                len(running),
+                queued,
+                finished,
+                self.total,
+                failed,
+                self._format(self.estimate(now)),
+            )
+        )
+
+        if running:
+            ConsoleLogger.logInfo(
+                "Running for the longest time: "
+                + ", ".join(
+                    "[%d] %s (%s)" % (task["id"], task["Name"], self._format(now - started))
+                    for task, started in running[:MONITOR_LONGEST_TASKS]
+                )
+            )
+
+    def _format(self, seconds: float):
+        """
+        Format a duration as hours, minutes and seconds
+        """
+
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+
+        if hours:
+            return "%dh %02dm %02ds" % (hours, minutes, seconds)
+        return "%dm %02ds" % (minutes, seconds)
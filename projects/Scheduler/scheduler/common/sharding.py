@@ -0,0 +1,133 @@
+import hashlib
+import re
+from ..common.constants import *
+from ..common.exceptions import InvalidShardError
+
+
+class Shard(object):
+    """
+    One of COUNT independent invocations sharing the selected tasks of a run.
+
+    Tasks which have to run together stay in the same shard:
+      - the tasks of a sequential group, they rely on the order of the group,
+      - tasks linked by DependsOn, the dependency would be ignored otherwise.
+    These units are handed out heaviest first to the shard with the least work. A task weighs its
+    Weight in the config, so every invocation computes the same split from the config alone. The
+    durations of a history are only used when the invocations are given the same history file.
+    The plan of a shard is a fingerprint of the whole split, shards of one run must have the same plan.
+    """
+
+    def __init__(self, index: int, count: int):
+        """
+        Initialize the shard, index starts at 1
+        """
+
+        if count < 1 or not 1 <= index <= count:
+            raise InvalidShardError("%s/%s" % (index, count))
+
+        self.index = index
+        self.count = count
+        self.plan = None
+
+    def __str__(self):
+        return "%d/%d" % (self.index, self.count)
+
+    @classmethod
+    def parse(cls, shard: str):
+        """
+        Create the shard given as INDEX/COUNT
+        """
+
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", shard)
+        if not match:
+            raise InvalidShardError(shard)
+
+        return cls(int(match.group(1)), int(match.group(2)))
+
+    def _units(self, groups: dict, groupOrder: list):
+        """
+        Split the tasks into the units which have to run in the same shard, in the order of the yaml file
+        """
+
+        tasks = [task for group in groupOrder for task in groups[group]["Tasks"]]
+        parent = list(range(len(tasks)))
+
+        def find(position):
+            while parent[position] != position:
+                parent[position] = parent[parent[position]]
+                position = parent[position]
+            return position
+
+        def union(first, second):
+            first, second = find(first), find(second)
+            if first != second:
+                parent[max(first, second)] = min(first, second)
+
+        positionsByName = {}
+        for position, task in enumerate(tasks):
+            positionsByName.setdefault(task["Name"], []).append(position)
+
+        firstOfGroup = {}
+        for position, task in enumerate(tasks):
+            firstOfGroup.setdefault(task["Group"], position)
+
+            if groups[task["Group"]]["Strategy"] == SEQUENTIAL_STRATEGY:
+                union(position, firstOfGroup[task["Group"]])
+
+            for dependency in task.get("DependsOn", []):
+                for other in positionsByName.get(dependency, []):
+                    union(position, other)
+
+        units = {}
+        for position in range(len(tasks)):
+            units.setdefault(find(position), []).append(position)
+
+        return tasks, list(units.values())
+
+    def assign(self, groups: dict, groupOrder: list, metrics=None):
+        """
+        Return the index, starting at 1, of the shard running each selected task, by id of the task.
+        Tasks weigh their Weight, or their expected duration from metrics if given.
+        """
+
+        tasks, units = self._units(groups, groupOrder)
+        if metrics is None:
+            expected = [task.get("Weight", DEFAULT_SHARD_WEIGHT) for task in tasks]
+        else:
+            expected = metrics.expectedDurations(tasks)
+
+        weights = [sum(expected[position] for position in unit) for unit in units]
+
+        # Longest unit first, ties keep the order of the yaml file so every shard computes the same split
+        #
+        order = sorted(range(len(units)), key=lambda unit: (-weights[unit], units[unit][0]))
+
+        loads = [0.0] * self.count
+        shards = {}
+        for unit in order:
+            shard = min(range(self.count), key=lambda index: (loads[index], index))
+            loads[shard] += weights[unit]
+            for position in units[unit]:
+                shards[id(tasks[position])] = shard + 1
+
+        return shards
+
+    def select(self, groups: dict, groupOrder: list, metrics=None):
+        """
+        Keep only the tasks of this shard in the groups, groups keep their place even if they become empty
+        """
+
+        shards = self.assign(groups, groupOrder, metrics)
+
+        digest = hashlib.sha256()
+        for group in groupOrder:
+            for task in groups[group]["Tasks"]:
+                digest.update(("%s\0%s\0%d\n" % (group, task["Name"], shards[id(task)])).encode())
+        self.plan = digest.hexdigest()
+
+        for group in groupOrder:
+            groups[group]["Tasks"] = [
+                task for task in groups[group]["Tasks"] if shards[id(task)] == self.index
+            ]
+
+        return sum(len(groups[group]["Tasks"]) for group in groupOrder)
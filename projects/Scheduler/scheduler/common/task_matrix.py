@@ -0,0 +1,126 @@
+import itertools
+import re
+
+from ..common.exceptions import InvalidMatrixError
+
+
+class TaskMatrix(object):
+    """
+    Expand the tasks declaring a Matrix into one concrete task per combination of its values.
+
+    The values of an axis are a list, a single value, or an inclusive range of integers such as 1..64.
+    Decimal values must be quoted, YAML would read 3.10 as 3.1.
+    The {axis} placeholders in the Name, Command and DependsOn of the task are replaced by the values,
+    other braces are left as they are so shell syntax keeps working. The tasks are expanded lazily,
+    one at a time, so a selection only keeps the tasks it needs.
+    """
+
+    # An axis given as an inclusive range of integers
+    #
+    RANGE = re.compile(r"\s*(-?\d+)\s*\.\.\s*(-?\d+)\s*")
+
+    # An axis name, usable as a placeholder
+    #
+    AXIS = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+    @classmethod
+    def axes(cls, task: dict):
+        """
+        The axes of the matrix of the task with their values, in the order of the config.
+        Raise InvalidMatrixError if the matrix cannot be expanded.
+        """
+
+        matrix = task["Matrix"]
+        name = task.get("Name", "")
+
+        if not isinstance(matrix, dict) or not matrix:
+            raise InvalidMatrixError(name, "expected a mapping of axis names to values")
+
+        axes = []
+        for axis, values in matrix.items():
+            if not isinstance(axis, str) or not cls.AXIS.fullmatch(axis):
+                raise InvalidMatrixError(name, "axis name '%s' is not usable as a placeholder" % axis)
+
+            # The Name must tell the tasks apart, their logs and results are keyed by it
+            #
+            if "{%s}" % axis not in name:
+                raise InvalidMatrixError(name, "the Name does not use the placeholder {%s}" % axis)
+
+            axes.append((axis, cls._values(name, axis, values)))
+
+        return axes
+
+    @classmethod
+    def _values(cls, name: str, axis: str, values):
+        """
+        The values of an axis, as the strings put in place of its placeholder
+        """
+
+        if isinstance(values, str):
+            bounds = cls.RANGE.fullmatch(values)
+            if bounds:
+                first, last = int(bounds.group(1)), int(bounds.group(2))
+                if first > last:
+                    raise InvalidMatrixError(name, "empty range '%s' for axis '%s'" % (values, axis))
+                return range(first, last + 1)
+
+        if not isinstance(values, list):
+            values = [values]
+
+        if not values:
+            raise InvalidMatrixError(name, "no values for axis '%s'" % axis)
+
+        for value in values:
+            if isinstance(value, (dict, list)):
+                raise InvalidMatrixError(name, "value of axis '%s' is not a scalar" % axis)
+
+            # YAML reads 3.10 as the number 3.1, a version must be quoted to keep its text
+            #
+            if isinstance(value, float):
+                raise InvalidMatrixError(
+                    name, "value %r of axis '%s' is a number, quote it to use it as written" % (value, axis)
+                )
+
+        return values
+
+    @classmethod
+    def expand(cls, task: dict):
+        """
+        Generate the concrete tasks of a task, the task itself if it has no Matrix
+        """
+
+        if "Matrix" not in task:
+            yield task
+            return
+
+        axes = cls.axes(task)
+        names = [axis for axis, _ in axes]
+        placeholder = re.compile(r"\{(%s)\}" % "|".join(names))
+
+        for combination in itertools.product(*[values for _, values in axes]):
+            parameters = dict(zip(names, (str(value) for value in combination)))
+
+            def substitute(text):
+                return placeholder.sub(lambda match: parameters[match.group(1)], str(text))
+
+            concrete = {key: value for key, value in task.items() if key != "Matrix"}
+            concrete["Name"] = substitute(task["Name"])
+            if "Command" in task:
+                concrete["Command"] = substitute(task["Command"])
+
+            if "DependsOn" in task:
+                dependencies = task["DependsOn"]
+                if not isinstance(dependencies, list):
+                    dependencies = [dependencies]
+                concrete["DependsOn"] = [substitute(dependency) for dependency in dependencies]
+
+            yield concrete
+
+    @classmethod
+    def expandAll(cls, tasks: list):
+        """
+        Generate the concrete tasks of all the tasks, in the order of the config
+        """
+
+        for task in tasks:
+            yield from cls.expand(task)
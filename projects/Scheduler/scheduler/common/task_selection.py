@@ -0,0 +1,90 @@
+import re
+
+
+class TaskSelector(object):
+    """
+    Select the tasks of a run from the --tasks patterns and the --tags of the command line.
+
+    A pattern selects the task with that exact Name, and the tasks whose Command fully matches it.
+    Patterns are compiled once: they all go to a set of names, the ones without regular expression
+    characters to a set of commands and the others into a single alternation. With tags, only the
+    tasks with at least one of the tags are selected.
+    """
+
+    # Characters which make a pattern a regular expression rather than a literal
+    #
+    REGEX_CHARACTERS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+    def __init__(self, patterns: list, tags: list = None):
+        """
+        Compile the patterns, "all" selects every task.
+        Raise re.error, with the pattern as its pattern attribute, if a pattern cannot be compiled.
+        """
+
+        self.selectAll = not patterns or patterns[0] == "all"
+        self.names = set([] if self.selectAll else patterns)
+        self.literals = set()
+        self.regex = None
+        self.tags = set(tags or [])
+
+        regexes = []
+        for pattern in [] if self.selectAll else patterns:
+            if self.REGEX_CHARACTERS.search(pattern):
+                regexes.append(pattern)
+            else:
+                self.literals.add(pattern)
+
+        if regexes:
+            self.regex = self._compile(regexes)
+
+    def _compile(self, patterns: list):
+        """
+        Compile the patterns into one alternation, each pattern is checked on its own first
+        so the one which cannot be compiled is reported
+        """
+
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                e.pattern = pattern
+                raise
+
+        try:
+            return re.compile("|".join("(?:%s)" % pattern for pattern in patterns))
+        except re.error:
+            # Group names or back references which only make sense in their own pattern
+            #
+            return _Alternatives([re.compile(pattern) for pattern in patterns])
+
+    def matches(self, task: dict):
+        """
+        Check whether the task is selected
+        """
+
+        if self.tags and self.tags.isdisjoint(task.get("Tags", [])):
+            return False
+
+        if self.selectAll:
+            return True
+
+        if task["Name"] in self.names or task["Command"] in self.literals:
+            return True
+
+        return self.regex is not None and self.regex.fullmatch(task["Command"]) is not None
+
+
+class _Alternatives(object):
+    """
+    Patterns which cannot be joined into one regular expression, matched one after the other
+    """
+
+    def __init__(self, regexes: list):
+        self.regexes = regexes
+
+    def fullmatch(self, text: str):
+        for regex in self.regexes:
+            match = regex.fullmatch(text)
+            if match:
+                return match
+        return None
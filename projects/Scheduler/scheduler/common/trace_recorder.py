@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from ..common.results import _replaceFile
+
+
+class TraceRecorder(object):
+    """
+    Record the timeline of a run and write it as a Chrome trace event file,
+    which can be opened in Perfetto (ui.perfetto.dev) or chrome://tracing.
+
+    The trace shows:
+      - each group as a span, from its first task handed over to its last task recorded,
+      - each task on the slot it ran on, a slot being a worker process of a host:
+        setup (cache lookup), the command itself and cleanup (until the result is returned),
+      - the scheduler overhead of each task: the wait between being handed over and a slot
+        picking it up, and the handoff of the result back to the scheduler.
+    """
+
+    # Process ids of the trace for the tracks which are not slots
+    #
+    SCHEDULER_PID = 0
+    GROUPS_PID = 1
+
+    def __init__(self):
+        """
+        Start recording, the timestamps of the trace are relative to now
+        """
+
+        self.startTime = time.time()
+        self.endTime = None
+        self.handedOver = {}
+        self.tasks = []
+        self.lock = threading.Lock()
+
+    def taskQueued(self, task: dict):
+        """
+        A task is handed over to the executor
+        """
+
+        with self.lock:
+            self.handedOver[id(task)] = time.time()
+
+    def taskRecorded(self, task: dict, result: dict):
+        """
+        The result of a task was received by the scheduler
+        """
+
+        with self.lock:
+            handedOver = self.handedOver.pop(id(task), None)
+
+            # Tasks skipped by the scheduler never reached a slot
+            #
+            if handedOver is None or "timing" not in result:
+                return
+
+            self.tasks.append(
+                {
+                    "id": task["id"],
+                    "name": result["name"],
+                    "group": task.get("Group"),
+                    "status": result["status"],
+                    "handedOver": handedOver,
+                    "recorded": time.time(),
+                    "timing": result["timing"],
+                    "worker": result["worker"],
+                    "resources": result.get("resources"),
+                }
+            )
+
+    def runFinished(self):
+        """
+        The run is over
+        """
+
+        self.endTime = time.time()
+
+    def _timestamp(self, seconds: float):
+        """
+        Trace timestamp in microseconds since the start of the run
+        """
+
+        return round((seconds - self.startTime) * 1e6, 1)
+
+    def _span(self, name: str, pid: int, tid: int, start: float, end: float, args: dict = None):
+        event = {
+            "name": name,
+            "ph": "X",
+            "pid": pid,
+            "tid": tid,
+            "ts": self._timestamp(start),
+            "dur": round(max(end - start, 0) * 1e6, 1),
+        }
+        if args:
+            event["args"] = args
+        return event
+
+    def _asyncSpan(self, name: str, category: str, spanId: int, start: float, end: float):
+        """
+        Spans which may overlap, each gets its own row
+        """
+
+        common = {"name": name, "cat": category, "id": spanId, "pid": self.SCHEDULER_PID, "tid": 0}
+        return [
+            dict(common, ph="b", ts=self._timestamp(start)),
+            dict(common, ph="e", ts=self._timestamp(end)),
+        ]
+
+    def _metadata(self, kind: str, pid: int, args: dict, tid: int = 0):
+        return {"name": kind, "ph": "M", "pid": pid, "tid": tid, "args": args}
+
+    def _slotLanes(self):
+        """
+        Assign each task a lane of its slot.
+        The async strategy and remote workers run several tasks in one process, they get a lane each.
+        """
+
+        slots = {}
+        for task in sorted(self.tasks, key=lambda task: task["timing"]["slotStart"]):
+            key = (task["worker"]["host"], task["worker"]["pid"])
+            lanes = slots.setdefault(key, [])
+            for lane, laneEnd in enumerate(lanes):
+                if laneEnd <= task["timing"]["slotStart"]:
+                    break
+            else:
+                lane = len(lanes)
+                lanes.append(0)
+            lanes[lane] = task["timing"]["slotEnd"]
+            task["slot"] = key + (lane,)
+
+        return slots
+
+    def events(self):
+        """
+        Trace events of the run
+        """
+
+        with self.lock:
+            events = [
+                self._metadata("process_name", self.SCHEDULER_PID, {"name": "Scheduler"}),
+                self._metadata("process_sort_index", self.SCHEDULER_PID, {"sort_index": 0}),
+                self._metadata("process_name", self.GROUPS_PID, {"name": "Groups"}),
+                self._metadata("process_sort_index", self.GROUPS_PID, {"sort_index": 1}),
+                self._span("run", self.SCHEDULER_PID, 0, self.startTime, self.endTime or time.time()),
+            ]
+
+            # Groups, in the order their first task was handed over
+            #
+            groups = {}
+            for task in sorted(self.tasks, key=lambda task: task["handedOver"]):
+                start, end = groups.get(task["group"], (task["handedOver"], task["recorded"]))
+                groups[task["group"]] = (min(start, task["handedOver"]), max(end, task["recorded"]))
+
+            for tid, (group, (start, end)) in enumerate(groups.items()):
+                events.append(self._metadata("thread_name", self.GROUPS_PID, {"name": str(group)}, tid))
+                events.append(self._span(str(group), self.GROUPS_PID, tid, start, end))
+
+            # Slots, one trace process per host and one thread per lane of a worker process
+            #
+            slots = self._slotLanes()
+            hosts = sorted(set(host for host, _ in slots))
+            tids = {}
+            for host, pid in sorted(slots):
+                hostPid = 2 + hosts.index(host)
+                for lane in range(len(slots[(host, pid)])):
+                    tids[(host, pid, lane)] = (hostPid, len(tids))
+                    name = "pid %d" % pid if lane == 0 else "pid %d #%d" % (pid, lane + 1)
+                    events.append(self._metadata("thread_name", hostPid, {"name": name}, len(tids) - 1))
+
+            for index, host in enumerate(hosts):
+                events.append(self._metadata("process_name", 2 + index, {"name": "Slots on " + host}))
+                events.append(self._metadata("process_sort_index", 2 + index, {"sort_index": 2 + index}))
+
+            for task in self.tasks:
+                pid, tid = tids[task["slot"]]
+                timing = task["timing"]
+                args = {"status": task["status"], "group": task["group"]}
+                if task["resources"]:
+                    args["resources"] = task["resources"]
+
+                if "processStart" in timing:
+                    processEnd = timing.get("processEnd", timing["slotEnd"])
+                    events.append(self._span("setup", pid, tid, timing["slotStart"], timing["processStart"]))
+                    events.append(self._span(task["name"], pid, tid, timing["processStart"], processEnd, args))
+                    events.append(self._span("cleanup", pid, tid, processEnd, timing["slotEnd"]))
+                else:
+                    events.append(self._span(task["name"], pid, tid, timing["slotStart"], timing["slotEnd"], args))
+
+                events.extend(
+                    self._asyncSpan(
+                        "queue wait " + task["name"], "queue", task["id"], task["handedOver"], timing["slotStart"]
+                    )
+                )
+                events.extend(
+                    self._asyncSpan(
+                        "result handoff " + task["name"], "handoff", task["id"], timing["slotEnd"], task["recorded"]
+                    )
+                )
+
+        return events
+
+    def write(self, path: str):
+        """
+        Write the trace file, it is replaced at once so a viewer never reads half of it
+        """
+
+        _replaceFile(path, json.dumps({"traceEvents": self.events(), "displayTimeUnit": "ms"}))
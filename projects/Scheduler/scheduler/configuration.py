@@ -1,15 +1,25 @@
 import re
 import yaml
 
-from scheduler.common.helper import ConsoleLogger
+from scheduler.common.helper import ConsoleLogger, Global
+from scheduler.common.config_cache import ConfigCache
+from scheduler.common.task_selection import TaskSelector
+from scheduler.common.task_matrix import TaskMatrix
 from scheduler.common.constants import *
 from typing import List
 
 from scheduler.common.exceptions import (
     InvalidStrategyError,
+    UnsupportedStrategyError,
     InvalidModeError,
     MissingTaskParameterError,
     InvalidGroupTypeError,
+    InvalidSchedulingError,
+    UnknownDependencyError,
+    InvalidLimitError,
+    InvalidPatternError,
+    InvalidIntervalError,
+    InvalidMatrixError,
 )
 
 
@@ -18,21 +28,41 @@ class Configuration:
     Manages Configuration of the scheduler
     """
 
-    def __init__(self, configfile: str, desiredTasks: str):
+    def __init__(self, configfile: str, desiredTasks: str, desiredTags: str = None):
         """
-        Load the config parameters from config file
+        Load the config parameters from config file,
+        keep the tasks matching desiredTasks and having one of desiredTags if given
         """
 
-        with open(configfile, "r") as ymlfile:
-            config = self._yamlLoad(ymlfile)
+        if Global.CONFIG_CACHE_DIR:
+            config = ConfigCache(Global.CONFIG_CACHE_DIR).load(configfile, self._yamlLoad)
+        else:
+            with open(configfile, "r") as ymlfile:
+                config = self._yamlLoad(ymlfile)
 
         self.desiredTasks = desiredTasks.split()
+        self.desiredTags = re.split(r"[\s,]+", desiredTags.strip()) if desiredTags else []
         self.mode = config["mode"]
+        self.scheduling = config.get("scheduling", GROUP_SCHEDULING)
+        self.maxParallel = config.get("maxParallel")
+        self.historyFile = config.get("historyFile")
+        self.cache = config.get("cache") or {}
+        self.streamLogs = config.get("streamLogs", False)
+        self.failureLog = config.get("failureLog") or {}
+        self.heartbeatSeconds = config.get("heartbeatSeconds")
+        self.resourceSampleSeconds = config.get("resourceSampleSeconds")
+        self.termWaitTimeInMins = config.get("termWaitTimeInMins")
+        self.hedgeMultiple = config.get("hedgeMultiple")
+        self.traceFile = config.get("traceFile")
+        self.resultsFile = config.get("resultsFile")
+        self.junitFile = config.get("junitFile")
+        self.prometheusFile = config.get("prometheusFile")
         self.tasks = config["tasks"]
         self.groupOrder = []
         self.groups = {}
 
         self._parseGroups(config["groups"])
+        self.selector = self._compileSelection()
         self._parseTaskGroup(config["tasks"])
 
         self.validateConfig()
@@ -46,6 +76,15 @@ class Configuration:
         ConsoleLogger.logFailure(error)
         raise error
 
+    def _failAndExitOnUnsupportedStrategy(self, strategy: str, group: str):
+        """
+        Declare failure due to a strategy the scheduling cannot run and exit
+        """
+
+        error = UnsupportedStrategyError(strategy, group, self.scheduling)
+        ConsoleLogger.logFailure(error)
+        raise error
+
     def _failAndExitOnBadMode(self, mode: str):
         """
         Declare failure due to bad mode and exit
@@ -65,6 +104,86 @@ class Configuration:
         ConsoleLogger.logFailure(error)
         raise error
 
+    def _failAndExitOnBadScheduling(self, scheduling: str):
+        """
+        Declare failure due to bad scheduling and exit
+        """
+
+        error = InvalidSchedulingError(scheduling)
+
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _failAndExitOnUnknownDependency(self, dependency: str, dependent: str):
+        """
+        Declare failure due to a dependency on an undefined task or group and exit
+        """
+
+        error = UnknownDependencyError(dependency, dependent)
+
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _failAndExitOnBadLimit(self, parameter: str, value, owner: str):
+        """
+        Declare failure due to a bad concurrency limit and exit
+        """
+
+        error = InvalidLimitError(parameter, value, owner)
+
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _failAndExitOnBadInterval(self, parameter: str, value, positive: bool = False):
+        """
+        Declare failure due to a bad interval and exit
+        """
+
+        error = InvalidIntervalError(parameter, value, positive)
+
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _failAndExitOnBadMatrix(self, error: InvalidMatrixError):
+        """
+        Declare failure due to a Matrix which cannot be expanded and exit
+        """
+
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _failAndExitOnBadPattern(self, pattern: str, reason: str):
+        """
+        Declare failure due to a regular expression which cannot be compiled and exit
+        """
+
+        error = InvalidPatternError(pattern, reason)
+
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _validateLimit(self, parameter: str, value, owner: str):
+        """
+        Check that a concurrency limit is a positive integer
+        """
+
+        if value is None:
+            return
+
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            self._failAndExitOnBadLimit(parameter, value, owner)
+
+    def _validateInterval(self, parameter: str, value, positive: bool = False):
+        """
+        Check that an interval is a number of 0 or more, or more than 0 if it must be positive
+        """
+
+        if value is None:
+            return
+
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or (positive and value == 0):
+            self._failAndExitOnBadInterval(parameter, value, positive)
+
     def _failAndExitOnBadGroupType(self, task: dict):
         """
         Declare failure due to bad group type and exit
@@ -75,15 +194,22 @@ class Configuration:
         ConsoleLogger.logFailure(error)
         raise error
 
+    def _compileSelection(self):
+        """
+        Compile the desired tasks and tags once for all the tasks
+        """
+
+        try:
+            return TaskSelector(self.desiredTasks, self.desiredTags)
+        except re.error as e:
+            self._failAndExitOnBadPattern(e.pattern, str(e))
+
     def _inDesiredTasks(self, task: dict):
         """
         Check whether this task is in desired tasks set
         """
 
-        for i in self.desiredTasks:
-            if re.fullmatch(i, task["Command"]):
-                return True
-        return False
+        return self.selector.matches(task)
 
     def _parseGroups(self, groups: dict):
         """
@@ -109,28 +235,100 @@ class Configuration:
 
                 self.groups[groupName]["Mode"] = mode
 
+            if "DependsOn" in group:
+                self.groups[groupName]["DependsOn"] = self._toList(group["DependsOn"])
+
+            if "MaxParallel" in group:
+                self.groups[groupName]["MaxParallel"] = group["MaxParallel"]
+
+            for key in ["Retries", "RetryDelaySeconds"]:
+                if key in group:
+                    self.groups[groupName][key] = group[key]
+
             self.groupOrder.append(groupName)
 
+    def _expandTasks(self, tasks: list):
+        """
+        Generate the concrete tasks of the config, the tasks with a Matrix are expanded one at a time
+        """
+
+        try:
+            yield from TaskMatrix.expandAll(tasks)
+        except InvalidMatrixError as error:
+            self._failAndExitOnBadMatrix(error)
+
     def _parseTaskGroup(self, tasks: dict):
         """
         Assign each task to their validation group
         """
 
-        for task in tasks:
+        # The tasks are expanded and validated in a single pass, the dependencies are checked
+        # once the names of all the tasks are known
+        #
+        self.taskNames = set()
+        self.taskDependencies = []
+
+        for task in self._expandTasks(tasks):
+            self._validateTask(task)
+            self.taskNames.add(task["Name"])
             taskGroup = task["Group"]
 
-            if taskGroup not in self.groupOrder:
-                self._failAndExitOnBadGroupType(task)
+            if "DependsOn" in task:
+                task["DependsOn"] = self._toList(task["DependsOn"])
+                self.taskDependencies.extend((dependency, task["Name"]) for dependency in task["DependsOn"])
+
+            if "Tags" in task:
+                task["Tags"] = [str(tag) for tag in self._toList(task["Tags"])]
 
-            if self.desiredTasks[0] == "all" or self._inDesiredTasks(task):
+            # The retries of the group apply to the tasks which do not set their own
+            #
+            for key in ["Retries", "RetryDelaySeconds"]:
+                if key not in task and key in self.groups[taskGroup]:
+                    task[key] = self.groups[taskGroup][key]
+
+            if self._inDesiredTasks(task):
                 self.groups[taskGroup]["Tasks"].append(task)
 
+    def _toList(self, value):
+        """
+        Normalize a single name or a list of names into a list
+        """
+
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return value
+        return [value]
+
     def _yamlLoad(self, file: str):
         """
         Wrapper function for yaml load, loader fix is needed for new version (5.1+).
-        Check for the attribute to ensure backwards compatibility
+        The loader of libyaml is used when PyYAML was built with it, it is much faster on large configs
         """
-        return yaml.full_load(file)
+        return yaml.load(file, Loader=getattr(yaml, "CFullLoader", yaml.FullLoader))
+
+    def _validateTask(self, task: dict):
+        """
+        Check validity of the parameter values of a concrete task
+        """
+
+        if "Command" not in task:
+            self._failAndExitOnAbsentTaskParameter("Command")
+        if "Name" not in task:
+            self._failAndExitOnAbsentTaskParameter("Name")
+        if "Group" not in task:
+            self._failAndExitOnAbsentTaskParameter("Group")
+        if task["Group"] not in self.groupOrder:
+            self._failAndExitOnBadGroupType(task)
+        self._validateLimit("Slots", task.get("Slots"), task["Name"])
+        self._validateLimit("Cpus", task.get("Cpus"), task["Name"])
+        self._validateLimit("MemoryMB", task.get("MemoryMB"), task["Name"])
+        self._validateInterval("TermWaitTimeInMins", task.get("TermWaitTimeInMins"))
+        self._validateInterval("RetryDelaySeconds", task.get("RetryDelaySeconds"))
+        self._validateInterval("Weight", task.get("Weight"))
+        if not isinstance(task.get("Retries", 0), int):
+            self._failAndExitOnBadInterval("Retries", task["Retries"])
+        self._validateInterval("Retries", task.get("Retries"))
 
     def validateConfig(self):
         """
@@ -140,10 +338,35 @@ class Configuration:
         if self.mode not in VALID_MODES:
             self._failAndExitOnBadMode()
 
-        for task in self.tasks:
-            if "Command" not in task:
-                self._failAndExitOnAbsentTaskParameter("Command")
-            if "Name" not in task:
-                self._failAndExitOnAbsentTaskParameter("Name")
-            if task["Group"] not in self.groups.keys():
-                self._failAndExitOnBadGroupType(task)
+        if self.scheduling not in VALID_SCHEDULINGS:
+            self._failAndExitOnBadScheduling(self.scheduling)
+
+        self._validateLimit("maxParallel", self.maxParallel, "config")
+        self._validateInterval("heartbeatSeconds", self.heartbeatSeconds, positive=True)
+
+        self._validateInterval("resourceSampleSeconds", self.resourceSampleSeconds)
+        self._validateInterval("termWaitTimeInMins", self.termWaitTimeInMins)
+        self._validateInterval("hedgeMultiple", self.hedgeMultiple)
+
+        # The tasks themselves are validated while they are expanded
+        #
+        for dependency, dependent in self.taskDependencies:
+            if dependency not in self.taskNames:
+                self._failAndExitOnUnknownDependency(dependency, dependent)
+
+        for pattern in self.failureLog.get("patterns") or []:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                self._failAndExitOnBadPattern(pattern, str(e))
+
+        for groupName, group in self.groups.items():
+            self._validateLimit("MaxParallel", group.get("MaxParallel"), groupName)
+
+            # The dag scheduler runs every task in a worker, the tasks of an async group would lose their event loop
+            #
+            if self.scheduling == DAG_SCHEDULING and group["Strategy"] == ASYNC_STRATEGY:
+                self._failAndExitOnUnsupportedStrategy(group["Strategy"], groupName)
+            for dependency in group.get("DependsOn", []):
+                if dependency not in self.groups:
+                    self._failAndExitOnUnknownDependency(dependency, groupName)
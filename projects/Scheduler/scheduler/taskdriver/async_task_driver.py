@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import asyncio
+import time
+from ..common.helper import ConsoleLogger
+from ..common.constants import *
+from ..common.resource_usage import ResourceSampler
+from .task_driver import TaskDriver
+
+
+class AsyncTaskDriver(TaskDriver):
+    """
+    Task driver running its command as an asyncio subprocess,
+    so a single scheduler process can wait for many tasks at once
+    """
+
+    async def run(self):
+        """
+        Run the task, the counterpart of calling a TaskDriver.
+        If the coroutine is cancelled the process group of the task is stopped.
+        """
+
+        # Input files are hashed off the event loop
+        #
+        self._enterSlot()
+        await asyncio.sleep(self.retryDelay())
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self._replayCachedResult):
+            return self._leaveSlot()
+
+        try:
+            await self._startProcessAsync()
+            await self._waitForStatusAsync()
+            self._setPassed()
+
+        except asyncio.CancelledError:
+            if getattr(self, "process", None) is not None:
+                await loop.run_in_executor(None, self.terminateProcess)
+                await self.process.wait()
+            raise
+
+        except Exception as e:
+            self._setFailed(e)
+
+        self.task["result"]["taskDuration"] = self._duration
+
+        return self._leaveSlot()
+
+    async def _startProcessAsync(self):
+        """
+        Execute the corresponding command, the output goes to the task logfile
+        """
+
+        ConsoleLogger.logInfo("[%d]" % self.taskId,
+                              "Executing %s..." % self.name)
+
+        self._startTime = time.time()
+        self.task["result"]["timing"]["processStart"] = self._startTime
+
+        with open(self.logfile, "w") as log:
+            self.process = await asyncio.create_subprocess_shell(
+                self.cmd,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+
+    async def _waitForStatusAsync(self):
+        """
+        Wait for the spawned shell script to finished.
+        Raise if the shell script failed or timed out.
+        """
+        task_timeout = self.task.get(
+            "TimeoutInMinutes", DEFAULT_TASK_TIMEOUT_IN_MINUTES)
+        task_timeout = task_timeout * 60
+        timedOut = False
+        sampler = ResourceSampler(self.process.pid) if self.sampleSeconds else None
+        sampling = asyncio.ensure_future(self._sampleResources(sampler)) if sampler else None
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=task_timeout)
+        except asyncio.TimeoutError:
+            ConsoleLogger.logFailure(
+                f"Task {self.name} timed out after {task_timeout} seconds")
+            timedOut = True
+            self.task["result"]["timedOut"] = True
+            await asyncio.get_running_loop().run_in_executor(None, self.terminateProcess)
+            await self.process.wait()
+            await self.run_command_on_timeout_async()
+        finally:
+            if sampling:
+                sampling.cancel()
+
+        if sampler:
+            self.task["result"]["resources"] = sampler.usage()
+
+        status = self.process.returncode
+        endTime = time.time()
+        self.task["result"]["timing"]["processEnd"] = endTime
+
+        self._duration = endTime - self._startTime
+
+        if status != 0 or timedOut:
+            raise Exception(
+                'Failure(s) occurred in running command "%s"' % (self.cmd))
+
+    async def _sampleResources(self, sampler: ResourceSampler):
+        """
+        Sample the resource usage of the process tree until cancelled.
+        The event loop reaps the process as soon as it exits, so usage after the last sample is missed.
+        """
+
+        while True:
+            await asyncio.sleep(self.sampleSeconds)
+            sampler.sample()
+
+    async def run_command_on_timeout_async(self):
+        """
+        Run the RunCommandOnTimeout of the task without blocking the other tasks
+        """
+        if "RunCommandOnTimeout" not in self.task:
+            ConsoleLogger.logInfo(f"No RunCommandOnTimeout specified for task {self.task['Name']}")
+            return
+
+        run_command = self.task["RunCommandOnTimeout"]
+        ConsoleLogger.logInfo(f"Running command on timeout: {run_command}")
+        process = await asyncio.create_subprocess_shell(run_command)
+        result = await process.wait()
+
+        if result != 0:
+            ConsoleLogger.logFailure(f"Command {run_command} failed with exit code {result}")
+            return
+
+        ConsoleLogger.logInfo(f"Command {run_command} executed successfully")
@@ -9,6 +9,9 @@ import psutil
 from ..common.helper import ConsoleLogger
 from ..common.helper import Global
 from ..common.constants import *
+from ..common.resource_usage import ResourceSampler
+from ..common.process_tree import ProcessTree
+from ..common.exceptions import TaskCancelledError
 
 
 class TaskDriver:
@@ -16,6 +19,25 @@ class TaskDriver:
     Class for taskdrivers
     """
 
+    # Set in each worker process of the executor, shared by all the workers
+    # to know a task failed
+    #
+    failedTaskEvent = None
+
+    # Set in each worker process of the executor, the ids of the last tasks
+    # the scheduler cancelled
+    #
+    cancelledTasks = None
+
+    @classmethod
+    def initWorker(cls, failedTaskEvent, cancelledTasks=None):
+        """
+        Initialize a worker process of the executor
+        """
+
+        cls.failedTaskEvent = failedTaskEvent
+        cls.cancelledTasks = cancelledTasks
+
     def __init__(self, task: dict):
         self.task = task
         self.taskId = task["id"]
@@ -23,6 +45,11 @@ class TaskDriver:
         self.cmd = task["Command"]
         self.name = task["Name"]
         self.logfile = Global.LOG_DIR + task["Name"].replace(" ", "_") + "_log"
+
+        # The second copy of a straggler runs next to the first one, it gets its own log
+        #
+        if task.get("hedge"):
+            self.logfile = Global.LOG_DIR + task["Name"].replace(" ", "_") + "_hedge_log"
         task["logfile"] = self.logfile
         self.strategy = task["Strategy"]
         self.mode = task["Mode"]
@@ -32,68 +59,221 @@ class TaskDriver:
         task["result"]["status"] = STATUS_FAIL
         task["result"]["taskDuration"] = 0
         task["result"]["cleanupDuration"] = None
+        task["result"]["timedOut"] = False
 
         # Change working directory to Linux HE root
         #
         self.wdir = Global.WORKING_DIR
 
-        # Init sync variables for the parallel running
+        # Whether this task follows the failure signal of the workers
+        #
+        self.syncOnFailure = False
+
+        # Cache of passing results, only used for tasks which declare their Inputs
+        #
+        self.cache = Global.RESULT_CACHE if "Inputs" in task else None
+        self.cacheKey = None
+
+        # Interval between two samples of the resource usage of the process tree, 0 to not sample
+        #
+        self.sampleSeconds = Global.RESOURCE_SAMPLE_SECONDS
+
+        # Idempotent tasks may get a second copy, the copy which loses is cancelled while it runs
+        #
+        self.cancellable = bool(task.get("Idempotent"))
+
+        # Submission of the task this driver runs, which is what the scheduler cancels, set by the factory
+        #
+        self.dispatchId = None
+
+        # Time the processes of the task get to exit after SIGTERM when it is stopped
+        #
+        self.termWaitSeconds = ProcessTree.graceSeconds(task)
+
+        # Attempt of the task this driver runs, failed attempts are run again while Retries allows
         #
-        self.failedTaskEvent = None
-        self.failedTaskLog = None
+        self.attempt = task.get("attempt", 1)
+        task["result"]["attempt"] = self.attempt
+
+        self._duration = 0
 
     def __call__(self):
         """
         Make this class to be callable, which is used in multiprocessing module
         """
 
+        failedTaskEvent = TaskDriver.failedTaskEvent if self.syncOnFailure else None
+        self._enterSlot()
+
         if (
             self.mode == WAITALL
-            or not self.failedTaskEvent
-            or not self.failedTaskEvent.is_set()
-        ):
+            or not failedTaskEvent
+            or not failedTaskEvent.is_set()
+        ) and not self._cancelRequested():
+            time.sleep(self.retryDelay())
+
+            if self._replayCachedResult():
+                return self._leaveSlot()
+
             try:
                 self._startProcess()
                 self._waitForStatus()
+                self._setPassed()
 
-                self.task["result"]["message"] = "[%d] %s execution completed." % (
-                    self.taskId,
-                    self.name,
-                )
-                self.task["result"]["status"] = STATUS_PASS
+            except TaskCancelledError as e:
+                self._setCancelled(e)
 
             except Exception as e:
-                ConsoleLogger.logInfo(e)
+                self._setFailed(e)
 
-                endTime = time.time()
-                self._duration = endTime - self._startTime
-                self.task["result"]["message"] = str(e)
-
-                # Append the exception message and full stack trace into task logfile.
+                # Set failed task event to sync up with other processes,
+                # unless the task runs again
                 #
-                with open(self.logfile, "a") as log:
-                    exceptionType, exceptionValue, exceptionTraceback = sys.exc_info()
-                    traceback.print_exception(
-                        exceptionType, exceptionValue, exceptionTraceback, file=log
-                    )
-
-                # Set failed task event and log to sync up with other processes
-                #
-                if self.failedTaskEvent:
-                    self.failedTaskEvent.set()
-                    self.failedTaskLog.append(
-                        [self.logfile, self.taskId, self.name, str(e)]
-                    )
+                if failedTaskEvent and not self.willRetry():
+                    failedTaskEvent.set()
 
         else:
-            self.task["result"]["message"] = "[%d] %s skipped." % (
-                self.taskId,
-                self.name,
-            )
-            self.task["result"]["status"] = STATUS_SKIP
+            self.skip()
+            return self._leaveSlot()
 
         self.task["result"]["taskDuration"] = self._duration
 
+        return self._leaveSlot()
+
+    def retryDelay(self):
+        """
+        Seconds to wait before this attempt, RetryDelaySeconds before the first retry and doubled for each next one
+        """
+
+        if self.attempt <= 1:
+            return 0
+
+        delay = self.task.get("RetryDelaySeconds", DEFAULT_RETRY_DELAY_SECONDS)
+        return delay * 2 ** (self.attempt - 2)
+
+    def willRetry(self):
+        """
+        Whether the task runs again if this attempt fails
+        """
+
+        return self.attempt <= self.task.get("Retries", 0)
+
+    def _enterSlot(self):
+        """
+        Record where and when the task is picked up, for the trace of the run
+        """
+
+        self.task["result"]["worker"] = {"host": platform.node(), "pid": os.getpid()}
+        self.task["result"]["timing"] = {"slotStart": time.time()}
+
+    def _leaveSlot(self):
+        """
+        Record when the task gives its slot back, and return its result
+        """
+
+        self.task["result"]["timing"]["slotEnd"] = time.time()
+
+        return self.task["result"]
+
+    def _setPassed(self):
+        """
+        Mark the task as passed
+        """
+
+        self.task["result"]["message"] = "[%d] %s execution completed." % (
+            self.taskId,
+            self.name,
+        )
+        self.task["result"]["status"] = STATUS_PASS
+
+        self._saveCachedResult()
+
+    def _replayCachedResult(self):
+        """
+        Replay the saved result and log if the task passed before with the same inputs.
+        Return True if the task does not need to run.
+        """
+
+        if not self.cache:
+            return False
+
+        self.cacheKey = self.cache.keyOf(self.task)
+        meta = self.cache.lookup(self.cacheKey)
+        if meta is None:
+            return False
+
+        self.cache.replayLog(meta, self.logfile)
+
+        self.task["result"]["message"] = "[%d] %s replayed from cache." % (
+            self.taskId,
+            self.name,
+        )
+        self.task["result"]["status"] = STATUS_CACHED
+        self.task["result"]["taskDuration"] = 0
+
+        return True
+
+    def _saveCachedResult(self):
+        """
+        Save the result of a passing task to the cache
+        """
+
+        if self.cache and self.cacheKey:
+            self.cache.store(self.cacheKey, self.task, self.logfile, self._duration)
+
+    def _setFailed(self, e: Exception):
+        """
+        Mark the task as failed, called from the exception handler
+        """
+
+        ConsoleLogger.logInfo(e)
+
+        endTime = time.time()
+        self._duration = endTime - self._startTime
+        self.task["result"]["message"] = str(e)
+
+        # Append the exception message and full stack trace into task logfile.
+        #
+        with open(self._logTarget(), "a") as log:
+            exceptionType, exceptionValue, exceptionTraceback = sys.exc_info()
+            traceback.print_exception(
+                exceptionType, exceptionValue, exceptionTraceback, file=log
+            )
+
+    def _setCancelled(self, e: TaskCancelledError):
+        """
+        Mark the task as cancelled by the scheduler, it neither passed nor failed
+        """
+
+        self._duration = time.time() - self._startTime
+        self.task["result"]["message"] = str(e)
+        self.task["result"]["status"] = STATUS_SKIP
+
+    def _cancelRequested(self):
+        """
+        Whether the scheduler cancelled this task
+        """
+
+        cancelledTasks = TaskDriver.cancelledTasks
+        return (
+            self.cancellable
+            and cancelledTasks is not None
+            and self.dispatchId is not None
+            and self.dispatchId in cancelledTasks[:]
+        )
+
+    def skip(self):
+        """
+        Mark the task as skipped without running it
+        """
+
+        self.task["result"]["message"] = "[%d] %s skipped." % (
+            self.taskId,
+            self.name,
+        )
+        self.task["result"]["status"] = STATUS_SKIP
+        self.task["result"]["taskDuration"] = 0
+
         return self.task["result"]
 
     def _startProcess(self):
@@ -105,18 +285,29 @@ class TaskDriver:
                               "Executing %s..." % self.name)
 
         self._startTime = time.time()
+        self.task["result"]["timing"]["processStart"] = self._startTime
 
+        # The task runs in its own session, so it can be stopped with everything it started
+        #
         if self.strategy == SEQUENTIAL_STRATEGY:
-            self.process = psutil.Popen(self.cmd, shell=True)
+            self.process = psutil.Popen(self.cmd, shell=True, start_new_session=True)
         else:
-            with open(self.logfile, "w") as log:
+            with open(self._logTarget(), "w") as log:
                 self.process = psutil.Popen(
                     self.cmd,
                     shell=True,
                     stdout=log,
                     stderr=log,
+                    start_new_session=True,
                 )
 
+    def _logTarget(self):
+        """
+        File the output of the task goes to, the pipe of the log streamer if the output is streamed
+        """
+
+        return self.task.get("LogFifo") or self.logfile
+
     def _waitForStatus(self):
         """
         Wait for the spawned shell script to finished.
@@ -125,17 +316,32 @@ class TaskDriver:
         task_timeout = self.task.get(
             "TimeoutInMinutes", DEFAULT_TASK_TIMEOUT_IN_MINUTES)
         task_timeout = task_timeout * 60
+        sampler = ResourceSampler(self.process.pid) if self.sampleSeconds else None
         try:
-            self.process.wait(timeout=task_timeout)
+            self._waitForExit(task_timeout, sampler)
         except psutil.TimeoutExpired:
             ConsoleLogger.logFailure(
                 f"Task {self.name} timed out after {task_timeout} seconds")
-            self.kill_proc_tree(self.process.pid, recursive=True)
+            self.task["result"]["timedOut"] = True
+            self.terminateProcess()
+            self.process.wait()
             self.run_command_on_timeout()
-            
-            
+        except TaskCancelledError:
+            self.terminateProcess()
+            self.process.wait()
+            raise
+        except BaseException:
+            # The task is in its own session, it does not get the signals of the terminal
+            #
+            self.terminateProcess()
+            raise
+
+        if sampler:
+            self.task["result"]["resources"] = sampler.usage()
+
         status = self.process.returncode
         endTime = time.time()
+        self.task["result"]["timing"]["processEnd"] = endTime
 
         self._duration = endTime - self._startTime
 
@@ -143,6 +349,55 @@ class TaskDriver:
             raise Exception(
                 'Failure(s) occurred in running command "%s"' % (self.cmd))
             
+    def _waitForExit(self, timeout: float, sampler: ResourceSampler = None):
+        """
+        Wait for the process of the task to exit, sampling its resource usage on the way.
+        Raise psutil.TimeoutExpired if it is still running after timeout seconds,
+        TaskCancelledError if the scheduler cancels it.
+        """
+
+        if sampler is None and not self.cancellable:
+            self.process.wait(timeout=timeout)
+            return
+
+        now = time.time()
+        deadline = now + timeout
+        nextSample = now + self.sampleSeconds if sampler else deadline
+        delay = 0.0005
+
+        while not self._exited():
+            now = time.time()
+            if now >= deadline:
+                raise psutil.TimeoutExpired(timeout, self.process.pid)
+            if self._cancelRequested():
+                raise TaskCancelledError(self.name)
+            if now >= nextSample:
+                sampler.sample()
+                nextSample = now + self.sampleSeconds
+
+            # Same back off as waiting for a subprocess with a timeout
+            #
+            delay = min(delay * 2, PROCESS_POLL_MAX_DELAY_SECONDS)
+            time.sleep(max(0, min(delay, nextSample - now, deadline - now)))
+
+        # The exited shell is not reaped yet, so it still accounts for the whole tree
+        #
+        if sampler:
+            sampler.sample()
+        self.process.wait()
+
+    def _exited(self):
+        """
+        Whether the process of the task exited, it is left to be reaped where possible
+        """
+
+        if hasattr(os, "waitid"):
+            return os.waitid(
+                os.P_PID, self.process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT
+            ) is not None
+
+        return self.process.poll() is not None
+
     def run_command_on_timeout(self):
         if "RunCommandOnTimeout" not in self.task:
             ConsoleLogger.logInfo(f"No RunCommandOnTimeout specified for task {self.task['Name']}")
@@ -161,31 +416,25 @@ class TaskDriver:
         ConsoleLogger.logInfo(f"Command {run_command} executed successfully")
         
 
-    def kill_proc_tree(self, pid, include_parent=False, recursive=True):
+    def terminateProcess(self):
         """
-        Kill a process tree (including grandchildren) with signal sig (default is SIGTERM). 
-        If include_parent is True, include the parent process in the kill.
-        If recursive is True, kill the entire process tree rooted at pid, else kill just the children of pid.
+        Stop the process group of the task, SIGKILL once the grace period is over.
+        Return the number of seconds until all the processes were gone.
         """
-        assert pid != os.getpid(), "won't kill myself"
-        parent = psutil.Process(pid)
-        children = parent.children(recursive=recursive)
-        if include_parent:
-            children.append(parent)
-        print("children: ", children)
-        for p in children:
-            try:
-                if p.status() == psutil.STATUS_RUNNING or p.status() == psutil.STATUS_SLEEPING:
-                    print("killing process: ", p)
-                    p.kill()
-            except psutil.TimeoutExpired as e:
-                print("Error: ", e)
-                pass
 
-    def setSyncVariable(self, failedTaskEvent, failedTaskLog):
+        if getattr(self, "process", None) is None:
+            return 0
+
+        # The process group of the session is reached even if its shell exited,
+        # as long as the shell is not reaped its pid cannot be reused
+        #
+        groups = [self.process.pid] if self.process.returncode is None else []
+
+        return ProcessTree.terminate(ProcessTree.collect(self.process.pid), self.termWaitSeconds, groups)
+
+    def setSyncVariable(self):
         """
-        Set the sync variables for the task
+        Make the task follow the failure signal shared by the workers
         """
 
-        self.failedTaskEvent = failedTaskEvent
-        self.failedTaskLog = failedTaskLog
+        self.syncOnFailure = True
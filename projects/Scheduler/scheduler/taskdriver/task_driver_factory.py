@@ -1,4 +1,6 @@
 from .task_driver import TaskDriver
+from .async_task_driver import AsyncTaskDriver
+from ..common.constants import *
 
 
 class TaskDriverFactory(object):
@@ -8,19 +10,33 @@ class TaskDriverFactory(object):
 
     taskCounter = 0
 
+    # Each driver created is one submission of a task, the attempts of a task and the copies of
+    # a straggler share the id of the task but not their dispatch id
+    #
+    dispatchCounter = 0
+
     @staticmethod
     def createTaskDriver(task: dict, mode: str):
         """
         Create a task driver for the given task
         """
 
-        task["id"] = TaskDriverFactory.taskCounter
-        TaskDriverFactory.taskCounter += 1
+        # The attempts of a task which runs again and the second copy of a straggler keep its id
+        #
+        if "id" not in task or (task.get("attempt", 1) == 1 and not task.get("hedge")):
+            task["id"] = TaskDriverFactory.taskCounter
+            TaskDriverFactory.taskCounter += 1
 
         task["Mode"] = mode
 
         driver = None
 
-        driver = TaskDriver(task)
+        if task["Strategy"] == ASYNC_STRATEGY:
+            driver = AsyncTaskDriver(task)
+        else:
+            driver = TaskDriver(task)
+
+        driver.dispatchId = TaskDriverFactory.dispatchCounter
+        TaskDriverFactory.dispatchCounter += 1
 
         return driver
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+import collections
+import psutil
+
+from ..common.constants import *
+
+
+class AdmissionControl(object):
+    """
+    Keep track of the resources used by the running tasks and decide which task can start next.
+
+    A task uses:
+      - the number of slots given by its Slots weight, 1 by default, out of the slots of the
+        run and the MaxParallel slots of its group,
+      - the CPUs and memory given by Cpus and MemoryMB out of what the machine has,
+        tasks which do not declare them are only limited by their slots.
+
+    Tasks are packed first fit in their order. A task which does not fit can be overtaken by
+    smaller tasks at most MAX_TASK_BYPASSES times, then the resources are kept for it so large
+    tasks are not starved.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        groupLimits: dict = None,
+        cpus: int = None,
+        memoryMB: int = None,
+    ):
+        """
+        Initialize the resources available to the run and to each group.
+        The CPUs and memory default to the CPU count and the available memory of the machine.
+        """
+
+        self.capacity = capacity
+        self.groupLimits = {
+            group: limit for group, limit in (groupLimits or {}).items() if limit
+        }
+        self.cpus = cpus or psutil.cpu_count() or 1
+        self.memoryMB = memoryMB or psutil.virtual_memory().available // (1024 * 1024)
+
+        self.usedSlots = 0
+        self.usedCpus = 0
+        self.usedMemoryMB = 0
+        self.groupSlots = collections.Counter()
+
+        # Number of times each waiting task was overtaken, by id of the task
+        #
+        self.bypasses = {}
+
+    def slotsOf(self, task: dict):
+        """
+        Number of slots used by the task, a task never asks for more than its limits so it can always run alone
+        """
+
+        slots = min(int(task.get("Slots", 1)), self.capacity)
+
+        groupLimit = self.groupLimits.get(task.get("Group"))
+        if groupLimit:
+            slots = min(slots, groupLimit)
+
+        return max(1, slots)
+
+    def cpusOf(self, task: dict):
+        """
+        Number of CPUs used by the task, at most the CPUs of the machine
+        """
+
+        return min(int(task.get("Cpus", 0)), self.cpus)
+
+    def memoryOf(self, task: dict):
+        """
+        Memory in MB used by the task, at most the memory of the machine
+        """
+
+        return min(int(task.get("MemoryMB", 0)), self.memoryMB)
+
+    def _fitsGroup(self, task: dict):
+        """
+        Check whether the task fits in the free slots of its group
+        """
+
+        group = task.get("Group")
+        groupLimit = self.groupLimits.get(group)
+
+        return not groupLimit or self.groupSlots[group] + self.slotsOf(task) <= groupLimit
+
+    def _fitsRun(self, task: dict):
+        """
+        Check whether the task fits in the free slots, CPUs and memory of the run
+        """
+
+        return (
+            self.usedSlots + self.slotsOf(task) <= self.capacity
+            and self.usedCpus + self.cpusOf(task) <= self.cpus
+            and self.usedMemoryMB + self.memoryOf(task) <= self.memoryMB
+        )
+
+    def canAdmit(self, task: dict):
+        """
+        Check whether the task fits in the free resources
+        """
+
+        return self._fitsGroup(task) and self._fitsRun(task)
+
+    def pick(self, tasks: list):
+        """
+        Return the index of the first task which fits in the free resources, None if no task fits
+        or if the resources are kept for a task which was overtaken too often
+        """
+
+        blocked = None
+
+        for index, task in enumerate(tasks):
+            if self.canAdmit(task):
+                if blocked is not None:
+                    self.bypasses[id(blocked)] = self.bypasses.get(id(blocked), 0) + 1
+                return index
+
+            # Only the first task waiting for resources of the run keeps them,
+            # a task waiting for its group does not hold back the other groups
+            #
+            if blocked is None and self._fitsGroup(task):
+                blocked = task
+                if self.bypasses.get(id(blocked), 0) >= MAX_TASK_BYPASSES:
+                    return None
+
+        return None
+
+    def admit(self, task: dict):
+        """
+        Take the resources of a starting task
+        """
+
+        slots = self.slotsOf(task)
+        self.usedSlots += slots
+        self.usedCpus += self.cpusOf(task)
+        self.usedMemoryMB += self.memoryOf(task)
+        self.groupSlots[task.get("Group")] += slots
+        self.bypasses.pop(id(task), None)
+
+    def release(self, task: dict):
+        """
+        Give back the resources of a finished task
+        """
+
+        slots = self.slotsOf(task)
+        self.usedSlots -= slots
+        self.usedCpus -= self.cpusOf(task)
+        self.usedMemoryMB -= self.memoryOf(task)
+        self.groupSlots[task.get("Group")] -= slots
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+import asyncio
+import time
+
+from ..common.helper import ConsoleLogger
+from ..common.constants import *
+
+from ..taskscheduler.base_task_scheduler import BaseTaskScheduler
+from ..taskscheduler.admission_control import AdmissionControl
+from scheduler.taskdriver.task_driver_factory import TaskDriverFactory
+
+
+class AsyncScheduler(BaseTaskScheduler):
+    """
+    Schedule tasks concurrently from a single process with an asyncio event loop.
+    Unlike the parallel strategy no worker process is needed per running task,
+    so many more tasks can run at once.
+    """
+
+    def __call__(self, tasks: dict):
+        """
+        Running multiple tasks concurrently
+        """
+
+        self.failedTaskLog = []
+
+        success = asyncio.run(self._schedule(tasks))
+
+        if not success:
+            ConsoleLogger.logFailure("Logs from the failed task(s) are as follows:")
+            self._printFailedTaskLog()
+
+        return success
+
+    async def _schedule(self, tasks: dict):
+        """
+        Start the tasks as they fit in the free slots and wait for them
+        """
+
+        admission = AdmissionControl(self.maxParallel or DEFAULT_ASYNC_MAX_PARALLEL)
+        pendingTasks = self._longestFirst(tasks)
+        running = {}
+        halted = False
+        success = True
+        failedResult = None
+
+        while pendingTasks or running:
+            while pendingTasks and not halted:
+                index = admission.pick(pendingTasks)
+                if index is None:
+                    break
+
+                task = pendingTasks.pop(index)
+                task["Strategy"] = ASYNC_STRATEGY
+                driver = TaskDriverFactory.createTaskDriver(task, self.mode)
+                admission.admit(task)
+                self._taskStarted(task)
+                running[asyncio.ensure_future(driver.run())] = task
+
+            if not running:
+                break
+
+            finished, _ = await asyncio.wait(
+                running.keys(), return_when=asyncio.FIRST_COMPLETED
+            )
+
+            for future in finished:
+                task = running.pop(future)
+                admission.release(task)
+                result = future.result()
+
+                if not halted and self._retry(task, result):
+                    pendingTasks.insert(0, task)
+                    continue
+
+                self._recordResult(task, result)
+
+                if result["status"] == STATUS_FAIL:
+                    success = False
+                    failedResult = failedResult or result
+                    if self.mode != WAITALL:
+                        halted = True
+
+            # if failfast was set, we kill all the running tasks
+            #
+            if not success and self.mode == FAILFAST and running:
+                stopTime = time.time()
+                for future in running:
+                    future.cancel()
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+                self._reportCancellation(failedResult, time.time() - stopTime)
+                for task in running.values():
+                    self._taskFinished(task, STATUS_SKIP)
+                running = {}
+
+        # If a task failed, the tasks which were not started yet are skipped
+        #
+        for task in pendingTasks if halted else []:
+            task["Strategy"] = ASYNC_STRATEGY
+            driver = TaskDriverFactory.createTaskDriver(task, self.mode)
+            self._recordTaskMetrics(driver.skip(), task)
+
+        return success
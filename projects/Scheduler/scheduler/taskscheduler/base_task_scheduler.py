@@ -1,7 +1,9 @@
 import os
+import time
 from ..common.constants import *
-from ..common.helper import ConsoleLogger
+from ..common.helper import ConsoleLogger, Global
 from ..common.metrics import Metrics
+from ..common.failure_log import FailureLog
 
 
 class BaseTaskScheduler(object):
@@ -9,37 +11,172 @@ class BaseTaskScheduler(object):
     Basic class for ParallelScheduler and SequentialScheduler
     """
 
-    def __init__(self, mode: str, metrics: Metrics):
+    def __init__(self, mode: str, metrics: Metrics, executor, maxParallel: int = None):
         """
-        Initilize mode property (failfast/waitcurrent or None)
+        Initilize mode property (failfast/waitcurrent or None),
+        the executor running the tasks and the maximum number of slots the tasks can use at once
         """
 
         self.mode = mode
         self.metrics = metrics
+        self.executor = executor
+        self.maxParallel = maxParallel
+
+    def _recordTaskMetrics(self, result: dict, task: dict = None):
+        """
+        Record the metrics of a finished task
+        """
+
+        self.metrics.addTaskMetrics(
+            result["name"],
+            result["taskDuration"],
+            result["status"],
+            result["cleanupDuration"],
+            task,
+            result.get("resources"),
+            result.get("timedOut", False),
+        )
+
+        if task:
+            self._taskFinished(task, result["status"])
+            if Global.TRACE:
+                Global.TRACE.taskRecorded(task, result)
+
+    def _recordResult(self, task: dict, result: dict):
+        """
+        Record the result of a finished task and keep track of the failed ones
+        """
+
+        task["result"] = result
+
+        # Only record the duration if the test wasn't skipped
+        #
+        self._recordTaskMetrics(result, task)
+
+        if result["status"] in PASSING_STATUSES:
+            ConsoleLogger.logSuccess(result["message"])
+        elif result["status"] == STATUS_FAIL:
+            self.failedTaskLog.append(
+                [task["logfile"], task["id"], task["Name"], result["message"]]
+            )
+
+    def _retry(self, task: dict, result: dict):
+        """
+        Prepare a failed task to run again if it has retries left, return whether it does.
+        The failed attempt is recorded and its log is kept next to the log of the task.
+        """
+
+        attempt = task.get("attempt", 1)
+        retries = task.get("Retries", 0)
+
+        if result["status"] != STATUS_FAIL or attempt > retries:
+            return False
+
+        self.metrics.addTaskAttempt(
+            result["name"], result["taskDuration"], result["status"], task, result.get("timedOut", False)
+        )
+        if Global.TRACE:
+            Global.TRACE.taskRecorded(task, result)
+
+        attemptLog = "%s.attempt%d" % (task["logfile"], attempt)
+        if os.path.exists(task["logfile"]):
+            os.replace(task["logfile"], attemptLog)
+
+        ConsoleLogger.logInfo(
+            "%s failed: %s, running it again (attempt %d of %d), log of the failed attempt: %s"
+            % (result["name"], result["message"], attempt + 1, retries + 1, attemptLog)
+        )
+        task["attempt"] = attempt + 1
+
+        return True
+
+    def _stopRunningTasks(self, result: dict):
+        """
+        Stop the tasks running on the executor after the failure of the task of result
+        """
+
+        self._reportCancellation(result, self.executor.terminate())
+
+    def _reportCancellation(self, result: dict, stopSeconds: float):
+        """
+        Report how long it took until the processes of the running tasks were gone,
+        from the failure of the task of result
+        """
+
+        if stopSeconds is None:
+            return
+
+        failedAt = result.get("timing", {}).get("processEnd", time.time())
+        sinceFailure = time.time() - failedAt
+
+        ConsoleLogger.logInfo(
+            "Running tasks stopped in %.1f sec, %.1f sec after the failure." % (stopSeconds, sinceFailure)
+        )
+        self.metrics.recordCancellation(sinceFailure)
+
+    def _taskStarted(self, task: dict):
+        """
+        Tell the run monitor and the trace a task is handed over to run
+        """
+
+        if Global.RUN_MONITOR:
+            Global.RUN_MONITOR.taskStarted(task)
+        if Global.TRACE:
+            Global.TRACE.taskQueued(task)
+
+    def _taskFinished(self, task: dict, status: str):
+        """
+        Tell the run monitor a task is done, skipped or cancelled
+        """
+
+        if Global.RUN_MONITOR:
+            Global.RUN_MONITOR.taskFinished(task, status)
+
+    def _openLogStream(self, task: dict):
+        """
+        Stream the output of a task which is about to start, if streaming is enabled
+        """
+
+        if Global.LOG_STREAMER:
+            Global.LOG_STREAMER.open(task)
+
+    def _closeLogStream(self, task: dict):
+        """
+        Wait for the streamed output of a finished task
+        """
+
+        if Global.LOG_STREAMER:
+            Global.LOG_STREAMER.close(task)
+
+    def _longestFirst(self, tasks: list):
+        """
+        Order the tasks by expected duration, longest first, so the slowest task does not start last
+        """
+
+        expected = self.metrics.expectedDurations(tasks)
+        order = sorted(range(len(tasks)), key=lambda index: -expected[index])
+
+        return [tasks[index] for index in order]
 
     def _printFailedTaskLog(self):
         """
-        Print logs from failed tasks
+        Print logs from failed tasks.
+        Only the lines matching the error patterns and the end of each log are shown, the whole log is referenced by its path.
         """
 
+        failureLog = Global.FAILURE_LOG or FailureLog()
+
         for item in self.failedTaskLog:
             logfile = item[0]
             taskId = item[1]
             taskname = item[2]
             errMsg = item[3]
 
-            ConsoleLogger.logFailure(
+            lines = [
                 "######################### Failure log for %s ########################"
                 % taskname
-            )
-
-            if os.path.isfile(logfile):
-                # Print contents of log files to console
-                #
-                with open(logfile, "r") as reader:
-                    lines = reader.readlines()
-
-                    for line in lines:
-                        ConsoleLogger.logFailure(line.strip())
+            ]
+            lines.extend(failureLog.report(logfile))
+            lines.append("[%d] %s failed: %s" % (taskId, taskname, errMsg))
 
-            ConsoleLogger.logFailure("[%d] %s failed: %s" % (taskId, taskname, errMsg))
+            ConsoleLogger.logFailureLines(lines)
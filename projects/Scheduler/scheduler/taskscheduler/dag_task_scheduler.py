@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+import collections
+import functools
+import queue
+
+from ..common.helper import ConsoleLogger
+from ..common.constants import *
+from ..common.exceptions import DependencyCycleError
+from ..common.metrics import Metrics
+
+from ..taskscheduler.base_task_scheduler import BaseTaskScheduler
+from ..taskscheduler.admission_control import AdmissionControl
+from scheduler.taskdriver.task_driver_factory import TaskDriverFactory
+
+
+class DagNode(object):
+    """
+    A node of the dependency graph, either a task or the end of a group
+    """
+
+    def __init__(self, index: int, name: str, task: dict = None, mode: str = None):
+        self.index = index
+        self.name = name
+        self.task = task
+        self.mode = mode
+
+        # Hard dependencies must pass, ordering dependencies only need to finish
+        #
+        self.hardPredecessors = []
+        self.successors = []
+        self.unfinishedPredecessors = 0
+
+        self.status = None
+
+        # Expected time from the start of this node until the end of the run,
+        # nodes on the longest path are started first
+        #
+        self.priority = 0
+
+    @property
+    def isTask(self):
+        return self.task is not None
+
+
+class DagScheduler(BaseTaskScheduler):
+    """
+    Schedule all tasks of all groups as one dependency graph.
+
+    A task is released as soon as everything it depends on is done:
+      - the tasks listed in its DependsOn, which must pass,
+      - the groups its group depends on (DependsOn on the group, the previous group by default),
+      - the previous task of the same group if the group strategy is sequential.
+    """
+
+    def __init__(self, mode: str, metrics: Metrics, executor):
+        """
+        Initilize the scheduler with the run level mode
+        """
+
+        super().__init__(mode, metrics, executor)
+
+        self.nodes = []
+        self.failedTaskLog = []
+
+    def _addNode(self, name: str, task: dict = None, mode: str = None):
+        """
+        Create a new node in the graph
+        """
+
+        node = DagNode(len(self.nodes), name, task, mode)
+        self.nodes.append(node)
+        return node
+
+    def _addEdge(self, predecessor: DagNode, successor: DagNode, hard: bool = False):
+        """
+        Make successor wait for predecessor
+        """
+
+        predecessor.successors.append(successor)
+        successor.unfinishedPredecessors += 1
+        if hard:
+            successor.hardPredecessors.append(predecessor)
+
+    def _buildGraph(self, groups: dict, groupOrder: list):
+        """
+        Build the dependency graph for the given groups.
+        Each group gets a virtual end node, so group dependencies cost one edge per task.
+        """
+
+        groupEnds = {}
+        groupTasks = {}
+        tasksByName = collections.defaultdict(list)
+
+        for group in groupOrder:
+            taskGroup = groups[group]
+            mode = taskGroup.get("Mode", self.mode)
+
+            groupEnd = self._addNode(group)
+            groupEnds[group] = groupEnd
+            groupTasks[group] = []
+
+            previous = None
+            for task in taskGroup["Tasks"]:
+                node = self._addNode(task["Name"], task, mode)
+                groupTasks[group].append(node)
+                tasksByName[task["Name"]].append(node)
+                self._addEdge(node, groupEnd)
+
+                if taskGroup["Strategy"] == SEQUENTIAL_STRATEGY and previous:
+                    self._addEdge(previous, node)
+                previous = node
+
+        for position, group in enumerate(groupOrder):
+            taskGroup = groups[group]
+
+            # Groups without DependsOn keep the order of the yaml file
+            #
+            if "DependsOn" in taskGroup:
+                dependencies = taskGroup["DependsOn"]
+            else:
+                dependencies = groupOrder[position - 1:position]
+
+            for dependency in dependencies:
+                self._addEdge(groupEnds[dependency], groupEnds[group])
+                for node in groupTasks[group]:
+                    self._addEdge(groupEnds[dependency], node)
+
+        for node in self.nodes:
+            if not node.isTask:
+                continue
+
+            # Dependencies on tasks which were not selected are ignored
+            #
+            for dependency in node.task.get("DependsOn", []):
+                for predecessor in tasksByName.get(dependency, []):
+                    self._addEdge(predecessor, node, hard=True)
+
+        self._checkForCycles()
+
+    def _checkForCycles(self):
+        """
+        Make sure every node can eventually be released
+        """
+
+        remaining = [node.unfinishedPredecessors for node in self.nodes]
+        released = [node for node in self.nodes if remaining[node.index] == 0]
+        self.topologicalOrder = []
+
+        while released:
+            node = released.pop()
+            self.topologicalOrder.append(node)
+            for successor in node.successors:
+                remaining[successor.index] -= 1
+                if remaining[successor.index] == 0:
+                    released.append(successor)
+
+        if len(self.topologicalOrder) != len(self.nodes):
+            names = [node.name for node in self.nodes if remaining[node.index] > 0]
+            error = DependencyCycleError(names)
+            ConsoleLogger.logFailure(error)
+            raise error
+
+    def _computePriorities(self):
+        """
+        Compute the expected time from the start of each node until the end of the run
+        """
+
+        taskNodes = [node for node in self.nodes if node.isTask]
+        expected = self.metrics.expectedDurations([node.task for node in taskNodes])
+        durations = {node.index: duration for node, duration in zip(taskNodes, expected)}
+
+        for node in reversed(self.topologicalOrder):
+            node.priority = durations.get(node.index, 0) + max(
+                (successor.priority for successor in node.successors), default=0
+            )
+
+    def _taskCallback(self, node: DagNode, generation: int, result: dict):
+        """
+        Callback function for finished tasks, hand the result over to the scheduling loop
+        """
+
+        self.finishedTasks.put((node, generation, result))
+
+    def _finish(self, node: DagNode, status: str):
+        """
+        Mark the node as finished and return the successors which are now ready
+        """
+
+        node.status = status
+        ready = []
+        for successor in node.successors:
+            successor.unfinishedPredecessors -= 1
+            if successor.unfinishedPredecessors == 0:
+                ready.append(successor)
+        return ready
+
+    def _skip(self, node: DagNode, reason: str):
+        """
+        Skip a task without running it
+        """
+
+        # The skipped task gets an id, its metrics are keyed like the ones of the tasks which ran
+        #
+        task = node.task
+        task["Strategy"] = PARALLEL_STRATEGY
+        driver = TaskDriverFactory.createTaskDriver(task, node.mode)
+
+        ConsoleLogger.logInfo("[%d] %s skipped: %s." % (task["id"], node.name, reason))
+        self._recordTaskMetrics(driver.skip(), task)
+        return self._finish(node, STATUS_SKIP)
+
+    def _dispatch(self, node: DagNode):
+        """
+        Hand a task over to the executor
+        """
+
+        # Every task runs in a worker, the order of a sequential group is kept by the edges of the graph
+        #
+        task = node.task
+        task["Strategy"] = PARALLEL_STRATEGY
+        driver = TaskDriverFactory.createTaskDriver(task, node.mode)
+        self.admission.admit(task)
+        self.running[node.index] = node
+        self._openLogStream(task)
+        self._taskStarted(task)
+        self.executor.submit(
+            driver, functools.partial(self._taskCallback, node, self.generation)
+        )
+
+    def _cancelRunningTasks(self, result: dict):
+        """
+        Stop the running tasks on failfast after the failure of the task of result,
+        tasks which always run are started again
+        """
+
+        # Results of the terminated workers which are still in flight are ignored
+        #
+        self._stopRunningTasks(result)
+        self.generation += 1
+
+        for node in list(self.running.values()):
+            del self.running[node.index]
+            self.admission.release(node.task)
+            self._closeLogStream(node.task)
+            if node.mode == RUNALWAYS:
+                self.waiting.insert(0, node)
+            else:
+                ConsoleLogger.logFailure("%s cancelled." % node.name)
+                self._taskFinished(node.task, STATUS_SKIP)
+                self.released.extend(self._finish(node, STATUS_SKIP))
+
+    def _skipReason(self, node: DagNode):
+        """
+        Return why a task which is ready must not run, None if it can run
+        """
+
+        if node.mode == RUNALWAYS:
+            return None
+
+        if self.halted:
+            return "a previous task failed"
+
+        failed = [
+            predecessor.name
+            for predecessor in node.hardPredecessors
+            if predecessor.status not in PASSING_STATUSES
+        ]
+        if failed:
+            return "dependency %s did not pass" % ",".join(failed)
+
+        return None
+
+    def _releaseNodes(self):
+        """
+        Decide about the nodes whose dependencies are done.
+        Group ends and skipped tasks finish right away, the other tasks wait for free slots.
+        """
+
+        while self.released:
+            node = self.released.popleft()
+
+            if not node.isTask:
+                self.released.extend(self._finish(node, STATUS_PASS))
+                continue
+
+            reason = self._skipReason(node)
+            if reason:
+                self.released.extend(self._skip(node, reason))
+            else:
+                self.waiting.append(node)
+
+    def _handleResult(self, node: DagNode, result: dict):
+        """
+        Record the result of a finished task and release its successors
+        """
+
+        del self.running[node.index]
+        self.admission.release(node.task)
+        self._closeLogStream(node.task)
+
+        if not self.halted and self._retry(node.task, result):
+            self.waiting.append(node)
+            return
+
+        self._recordResult(node.task, result)
+
+        if result["status"] not in PASSING_STATUSES:
+            self.executionPassed = False
+
+            if node.mode != WAITALL and not self.halted:
+                self.halted = True
+
+                # The tasks waiting for slots are decided again, only the ones which always run are kept
+                #
+                self.released.extend(self.waiting)
+                self.waiting = []
+
+        self.released.extend(self._finish(node, result["status"]))
+
+        if result["status"] == STATUS_FAIL and node.mode == FAILFAST:
+            self._cancelRunningTasks(result)
+
+    def __call__(self, groups: dict, groupOrder: list):
+        """
+        Running all tasks of the given groups following their dependencies
+        """
+
+        self._buildGraph(groups, groupOrder)
+        self._computePriorities()
+
+        self.admission = AdmissionControl(
+            self.executor.numProcess,
+            {group: groups[group].get("MaxParallel") for group in groupOrder},
+        )
+        self.finishedTasks = queue.Queue()
+        self.running = {}
+        self.generation = 0
+        self.halted = False
+        self.executionPassed = True
+
+        # Nodes whose dependencies are done, and tasks waiting for free slots
+        #
+        self.released = collections.deque(
+            node for node in self.nodes if node.unfinishedPredecessors == 0
+        )
+        self.waiting = []
+
+        while self.released or self.waiting or self.running:
+            self._releaseNodes()
+            self.waiting.sort(key=lambda node: -node.priority)
+
+            while self.waiting:
+                index = self.admission.pick([node.task for node in self.waiting])
+                if index is None:
+                    break
+                self._dispatch(self.waiting.pop(index))
+
+            if self.running:
+                node, generation, result = self.finishedTasks.get()
+                if generation == self.generation:
+                    self._handleResult(node, result)
+
+        if self.failedTaskLog:
+            ConsoleLogger.logFailure("Logs from the failed task(s) are as follows:")
+            self._printFailedTaskLog()
+
+        return self.executionPassed
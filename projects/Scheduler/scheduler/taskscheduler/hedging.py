@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import time
+from ..common.constants import *
+from ..common.metrics import Metrics
+
+
+class HedgePolicy(object):
+    """
+    Decide when a running task is a straggler which gets a second copy.
+
+    Only tasks marked Idempotent are hedged, since both copies run at once. A task is a straggler
+    once it has been running for multiple times the p95 of its previous passing durations, tasks
+    without enough history are never hedged. Each task is hedged at most once.
+    """
+
+    def __init__(self, metrics: Metrics, multiple: float = DEFAULT_HEDGE_MULTIPLE):
+        """
+        Hedge the tasks running for longer than multiple times their p95 duration, 0 to not hedge
+        """
+
+        self.metrics = metrics
+        self.multiple = multiple
+
+        # Time each running task becomes a straggler, with its task, by id of the task
+        #
+        self.deadlines = {}
+
+    def thresholdOf(self, task: dict):
+        """
+        Seconds after which the task is a straggler, None if it is never hedged
+        """
+
+        if not self.multiple or not task.get("Idempotent") or task.get("hedge"):
+            return None
+
+        percentile = self.metrics.durationPercentile(task, HEDGE_PERCENTILE)
+        if percentile is None:
+            return None
+
+        return percentile * self.multiple
+
+    def taskStarted(self, task: dict, delay: float = 0):
+        """
+        Start watching a task handed over to the executor, which waits delay seconds before it runs
+        """
+
+        threshold = self.thresholdOf(task)
+        if threshold is not None:
+            self.deadlines[id(task)] = (task, time.time() + delay + threshold)
+
+    def taskFinished(self, task: dict):
+        """
+        Stop watching a task, it finished, was cancelled or got its copy
+        """
+
+        self.deadlines.pop(id(task), None)
+
+    def stragglers(self, now: float = None):
+        """
+        The watched tasks running for longer than their threshold, the longest overdue first
+        """
+
+        now = now or time.time()
+        overdue = [entry for entry in self.deadlines.values() if entry[1] <= now]
+
+        return [task for task, _ in sorted(overdue, key=lambda entry: entry[1])]
+
+    def waitSeconds(self, now: float = None):
+        """
+        Seconds until the next watched task becomes a straggler, None if no task will
+        """
+
+        now = now or time.time()
+        upcoming = [deadline - now for _, deadline in self.deadlines.values() if deadline > now]
+
+        return min(upcoming, default=None)
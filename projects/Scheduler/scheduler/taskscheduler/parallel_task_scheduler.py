@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 # coding=utf-8
 
-import multiprocessing
+import functools
+import queue
 
-from ..common.helper import ConsoleLogger
+from ..common.helper import ConsoleLogger, Global
 from ..common.constants import *
 
 from ..taskscheduler.task_scheduler_factory import *
 from ..taskscheduler.base_task_scheduler import BaseTaskScheduler
+from ..taskscheduler.admission_control import AdmissionControl
+from ..taskscheduler.hedging import HedgePolicy
 from scheduler.taskdriver.task_driver_factory import TaskDriverFactory
 
 
@@ -16,66 +19,228 @@ class ParallelScheduler(BaseTaskScheduler):
     Schedule tasks in parallel with given mode
     """
 
-    def _taskCallback(self, result):
+    def _taskCallback(self, task: dict, result: dict):
         """
-        Callback function for succeeded tasks
+        Callback function for finished tasks, hand the result over to the scheduler
         """
 
-        # Only record the duration if the test wasn't skipped
+        self.finishedTasks.put((task, result))
+
+    def _handleResult(self, task: dict, result: dict):
+        """
+        Record the result of a finished task.
+        Return False if the remaining tasks must not be waited for.
+        """
+
+        self._recordResult(task, result)
+
+        # if failfast was set, we just kill all the process within the same process group
+        #
+        if result["status"] == STATUS_FAIL and self.mode == FAILFAST:
+            self._stopRunningTasks(result)
+            return False
+
+        return True
+
+    def _submit(self, task: dict):
+        """
+        Hand a task over to the executor
+        """
+
+        driver = TaskDriverFactory.createTaskDriver(task, self.mode)
+        driver.setSyncVariable()
+
+        # The driver gives the task its id and logfile, the copy of a straggler is not streamed
         #
-        self.metrics.addTaskMetrics(
-            result["name"],
-            result["taskDuration"],
-            result["status"],
-            result["cleanupDuration"],
+        if not task.get("hedge"):
+            self._openLogStream(task)
+            self._taskStarted(task)
+
+        self.drivers[id(task)] = driver
+        self.admission.admit(task)
+        self.hedging.taskStarted(task, driver.retryDelay())
+        self.executor.submit(driver, functools.partial(self._taskCallback, task))
+
+    def _hedge(self, task: dict):
+        """
+        Start a second copy of a straggler, return the copy
+        """
+
+        # The copy is not a retry, it starts at once and its result is reported with the attempt of the task
+        #
+        copy = {key: value for key, value in task.items() if key not in ["result", "logfile", "LogFifo", "attempt"]}
+        copy["hedge"] = True
+
+        ConsoleLogger.logInfo(
+            "[%d] %s runs for more than %.1f sec, %s times its p%d duration, starting a second copy."
+            % (task["id"], task["Name"], self.hedging.thresholdOf(task), self.hedging.multiple, HEDGE_PERCENTILE)
         )
 
-        if result["status"] == STATUS_PASS:
-            ConsoleLogger.logSuccess(result["message"])
-        elif result["status"] == STATUS_FAIL:
-            # if failfast was set, we just kill all the process within the same process group
-            #
-            if self.mode == FAILFAST:
-                self.processPool.terminate()
+        self.hedging.taskFinished(task)
+        self._submit(copy)
+        self.copies[id(task)] = copy
+        self.copies[id(copy)] = task
+
+        return copy
+
+    def _settleHedge(self, task: dict, result: dict, running: list):
+        """
+        The first copy of a hedged task to pass wins, the other one is cancelled. A copy which failed
+        while the other one still runs is dropped, the result of the other one is reported.
+        Return the original task with the result reported as its own, None if the other copy is waited for.
+        """
+
+        other = self.copies.pop(id(task))
+        del self.copies[id(other)]
+        original = other if task.get("hedge") else task
+
+        if other in running:
+            if result["status"] != STATUS_PASS:
+                ConsoleLogger.logInfo(
+                    "[%d] A copy of %s failed, waiting for the other copy." % (original["id"], original["Name"])
+                )
+                self.lastCopies[id(other)] = original
+                return None
+
+            self.hedging.taskFinished(other)
+            self.executor.cancel(self.drivers[id(other)])
+            self.losers.add(id(other))
+
+        return self._reportAsOriginal(task, original, result)
+
+    def _reportAsOriginal(self, task: dict, original: dict, result: dict):
+        """
+        Report the result of one of the copies of a hedged task as the result of the original task
+        """
+
+        if task is original:
+            return original
+
+        ConsoleLogger.logInfo("[%d] The result of %s is the one of its second copy." % (original["id"], original["Name"]))
+        original["logfile"] = task["logfile"]
+        result["name"] = "[%d] %s" % (original["id"], original["Name"])
+        result["attempt"] = original.get("attempt", 1)
+
+        return original
 
     def __call__(self, tasks: dict):
         """
         Running multiple tasks in parallel
         """
 
-        numProcess = max(1, multiprocessing.cpu_count() // 2)
+        self.executor.resetFailure()
+        self.finishedTasks = queue.Queue()
 
-        self.processPool = multiprocessing.Pool(numProcess)
-        processManager = multiprocessing.Manager()
+        # Failed task's log file, gathered from the results of the tasks
+        #
+        self.failedTaskLog = []
 
-        # When a task failed, the process will set this event and other process will know
-        # a failure happened and won't schedule new tasks
+        # The conflict tasks cannot parallelly run with some existed tasks and would be saved to sequentially schedule at the end.
         #
-        self.failedTaskEvent = processManager.Event()
+        conflictTasks = []
 
-        # Shared variable between processes to get the failed task's log file
+        # Tasks are started by the scheduler once they fit in the free slots of the run and the group
+        #
+        capacity = min(self.executor.numProcess, self.maxParallel or self.executor.numProcess)
+        self.admission = admission = AdmissionControl(capacity)
+        pendingTasks = self._longestFirst(tasks)
+        running = []
+        halted = False
+
+        # Stragglers get a second copy on the slots left idle once every task started,
+        # the two copies of a task refer to each other
         #
-        self.failedTaskLog = processManager.list()
+        self.hedging = HedgePolicy(self.metrics, Global.HEDGE_MULTIPLE)
+        self.drivers = {}
+        self.copies = {}
+        self.losers = set()
 
-        # The conflict tasks cannot parallelly run with some existed tasks and would be saved to sequentially schedule at the end.
+        # The last copy running of a hedged task whose other copy failed, with the original task
         #
-        conflictTasks = []
+        self.lastCopies = {}
+
+        while pendingTasks or running:
+            while pendingTasks and not halted:
+                index = admission.pick(pendingTasks)
+                if index is None:
+                    break
+
+                task = pendingTasks.pop(index)
+                task["Strategy"] = PARALLEL_STRATEGY
+                self._submit(task)
+                running.append(task)
+
+            if not pendingTasks and not halted:
+                for task in self.hedging.stragglers():
+                    if admission.canAdmit(task):
+                        running.append(self._hedge(task))
+
+            if not running:
+                break
+
+            try:
+                task, result = self.finishedTasks.get(timeout=self.hedging.waitSeconds())
+            except queue.Empty:
+                continue
+
+            running.remove(task)
+            admission.release(task)
+            self.hedging.taskFinished(task)
+            if not task.get("hedge"):
+                self._closeLogStream(task)
+
+            # The copy of a hedged task which lost is done
+            #
+            if id(task) in self.losers:
+                self.losers.discard(id(task))
+                continue
+
+            if id(task) in self.copies:
+                task = self._settleHedge(task, result, running)
+                if task is None:
+                    continue
+            elif id(task) in self.lastCopies:
+                task = self._reportAsOriginal(task, self.lastCopies.pop(id(task)), result)
+
+            # A failed task with retries left takes the next free slot
+            #
+            if not halted and self._retry(task, result):
+                pendingTasks.insert(0, task)
+                continue
 
-        for task in tasks:
+            cancelled = not self._handleResult(task, result)
+
+            if result["status"] == STATUS_FAIL and self.mode != WAITALL:
+                halted = True
+
+            if cancelled:
+                break
+
+        # The tasks killed on failfast do not write anymore
+        #
+        for task in running:
+            if task.get("hedge"):
+                if id(task) not in self.lastCopies:
+                    continue
+                task = self.lastCopies.pop(id(task))
+            self._closeLogStream(task)
+            self._taskFinished(task, STATUS_SKIP)
+
+        # If a task failed, the tasks which were not started yet are skipped
+        #
+        for task in pendingTasks if halted else []:
             task["Strategy"] = PARALLEL_STRATEGY
             driver = TaskDriverFactory.createTaskDriver(task, self.mode)
-            driver.setSyncVariable(self.failedTaskEvent, self.failedTaskLog)
-            self.processPool.apply_async(driver, args=(), callback=self._taskCallback)
-
-        self.processPool.close()
-        self.processPool.join()
+            self._recordTaskMetrics(driver.skip(), task)
 
         if not self.failedTaskLog:
             # Sequentially running conflicting tasks if parallel tasks passed.
             #
             if conflictTasks:
                 ConsoleLogger.logInfo("Scheduling the remaining tasks sequentially.")
-                scheduler = TaskSchedulerFactory.createTaskScheduler("sequential", None)
+                scheduler = TaskSchedulerFactory.createTaskScheduler(
+                    "sequential", None, self.metrics, self.executor
+                )
                 return scheduler(conflictTasks)
 
             return True
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+import base64
+import collections
+import hmac
+import itertools
+import os
+import socket
+import sys
+import threading
+import time
+
+from ..common.constants import *
+from ..common.exceptions import ProtocolError, UnsafeListenAddressError
+from ..common.helper import ConsoleLogger, Global
+from ..common.protocol import Connection
+from scheduler.taskdriver.task_driver import TaskDriver
+
+
+class RemoteJob(object):
+    """
+    Task handed over to the workers, with the callback waiting for its result
+    """
+
+    def __init__(self, jobId: int, driver: TaskDriver, callback):
+        self.jobId = jobId
+        self.driver = driver
+        self.callback = callback
+        self.reschedules = 0
+
+
+class RemoteWorker(object):
+    """
+    Worker connected to the coordinator
+    """
+
+    def __init__(self, connection: Connection, name: str):
+        self.connection = connection
+        self.name = name
+
+        # Number of tasks the worker asked for and did not get yet
+        #
+        self.credits = 0
+        self.jobs = {}
+        self.lastSeen = time.time()
+
+
+class RemoteExecutor(object):
+    """
+    Executor handing the tasks over to worker daemons connected over a TCP or Unix socket.
+
+    The coordinator keeps the configuration and the scheduling state, the workers pull tasks,
+    run them with a TaskDriver and stream back their log and result. A worker which closes its
+    connection or stops sending heartbeats is lost, its running tasks are queued again.
+    Workers can join at any time, the tasks stay queued until a worker asks for them.
+
+    A worker gets the commands and the environment of the tasks and reports their results, so only
+    the workers giving the shared token in their hello are served. A tcp address needs a token, and
+    only listens on the loopback interface unless remote workers are allowed.
+    """
+
+    def __init__(self, address: str, numProcess: int = None, token: str = None, allowRemote: bool = False):
+        """
+        Start listening for workers on address, tcp://HOST:PORT or unix://PATH
+        """
+
+        self.address = address
+        self.numProcess = numProcess or DEFAULT_REMOTE_MAX_PARALLEL
+        self.token = token or None
+
+        family, target = Connection.parseAddress(address)
+        if family != socket.AF_UNIX:
+            if not self.token:
+                self._failAndExitOnUnsafeAddress("a tcp address needs a worker token, set %s" % WORKER_TOKEN_VARIABLE)
+            if not allowRemote and not Connection.isLoopback(target[0]):
+                self._failAndExitOnUnsafeAddress(
+                    "%s is reachable from other hosts, use --allow-remote-workers to accept them" % target[0]
+                )
+
+        # Set when a task following the failure signal failed, the queued tasks following it are skipped
+        #
+        self.failedTaskEvent = threading.Event()
+
+        self.lock = threading.Lock()
+        self.queue = collections.deque()
+        self.workers = []
+        self.jobIds = itertools.count()
+        self.lastWorkerSeen = time.time()
+
+        self.stopped = threading.Event()
+        self.server = Connection.listen(address)
+
+        ConsoleLogger.logInfo("Waiting for workers on %s..." % address)
+
+        for target in [self._acceptWorkers, self._monitorWorkers]:
+            threading.Thread(target=target, daemon=True).start()
+
+    def __enter__(self):
+        return self
+
+    def _failAndExitOnUnsafeAddress(self, reason: str):
+        """
+        Declare failure due to an address open to untrusted workers and exit
+        """
+
+        error = UnsafeListenAddressError(self.address, reason)
+        ConsoleLogger.logFailure(error)
+        raise error
+
+    def _authenticated(self, hello: dict):
+        """
+        Whether the worker gave the token of the coordinator
+        """
+
+        if self.token is None:
+            return True
+
+        token = hello.get("token")
+        return isinstance(token, str) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def __exit__(self, exceptionType, exceptionValue, exceptionTraceback):
+        self.shutdown()
+
+    def resetFailure(self):
+        """
+        Clear the failure signal before scheduling a new set of tasks
+        """
+
+        self.failedTaskEvent.clear()
+
+    def submit(self, driver: TaskDriver, callback):
+        """
+        Queue the driver for the next free worker, callback is called with the task result once it is done
+        """
+
+        with self.lock:
+            self.queue.append(RemoteJob(next(self.jobIds), driver, callback))
+
+        self._dispatch()
+
+    def cancel(self, driver: TaskDriver):
+        """
+        Stop a queued or running task, its callback is called right away and its result is never reported
+        """
+
+        cancelled = None
+        messages = []
+
+        with self.lock:
+            for job in self.queue:
+                if job.driver is driver:
+                    self.queue.remove(job)
+                    cancelled = job
+                    break
+
+            for worker in self.workers if cancelled is None else []:
+                for jobId, job in list(worker.jobs.items()):
+                    if job.driver is driver:
+                        messages.append((worker, {"type": "cancel", "job": jobId}))
+                        del worker.jobs[jobId]
+                        cancelled = job
+
+        # A worker receiving the cancel before the task does not start it
+        #
+        for worker, message in messages:
+            self._send(worker, message)
+
+        if cancelled:
+            result = dict(driver.task["result"])
+            result["message"] = "[%d] %s cancelled." % (driver.taskId, driver.name)
+            result["status"] = STATUS_SKIP
+            cancelled.callback(result)
+
+    def run(self, driver: TaskDriver):
+        """
+        Run the driver on a worker and wait for the task result
+        """
+
+        done = threading.Event()
+        results = []
+
+        def callback(result: dict):
+            results.append(result)
+            done.set()
+
+        self.submit(driver, callback)
+        done.wait()
+
+        return results[0]
+
+    def terminate(self):
+        """
+        Drop the queued tasks and stop the running ones, their results are never reported.
+        The workers stop the tasks in the background, so return None as the time it takes is not known here.
+        """
+
+        messages = []
+
+        with self.lock:
+            self.queue.clear()
+
+            for worker in self.workers:
+                for jobId in list(worker.jobs):
+                    messages.append((worker, {"type": "cancel", "job": jobId}))
+                worker.jobs.clear()
+
+        for worker, message in messages:
+            self._send(worker, message)
+
+        return None
+
+    def shutdown(self):
+        """
+        Stop listening and tell the workers to exit
+        """
+
+        self.stopped.set()
+        self.server.close()
+
+        with self.lock:
+            workers, self.workers = self.workers, []
+
+        for worker in workers:
+            self._send(worker, {"type": "shutdown"})
+            worker.connection.close()
+
+        family, target = Connection.parseAddress(self.address)
+        if not isinstance(target, tuple) and os.path.exists(target):
+            os.unlink(target)
+
+    def _send(self, worker: RemoteWorker, message: dict):
+        """
+        Send a message to a worker, a worker which cannot be reached is found by its reader thread
+        """
+
+        try:
+            worker.connection.send(message)
+            return True
+        except OSError:
+            worker.connection.close()
+            return False
+
+    def _dispatch(self):
+        """
+        Hand the queued tasks over to the workers which asked for tasks.
+        The jobs are assigned under the lock and sent once it is released, a slow worker does not hold up the others.
+        """
+
+        skipped = []
+        assigned = []
+
+        with self.lock:
+            for worker in self.workers:
+                while worker.credits and self.queue:
+                    job = self.queue.popleft()
+                    driver = job.driver
+
+                    # The same check the local workers do before starting a task
+                    #
+                    if (
+                        driver.syncOnFailure
+                        and driver.mode != WAITALL
+                        and self.failedTaskEvent.is_set()
+                    ):
+                        skipped.append(job)
+                        continue
+
+                    worker.credits -= 1
+                    worker.jobs[job.jobId] = job
+                    assigned.append((worker, job))
+
+        unsent = []
+
+        for worker, job in assigned:
+            driver = job.driver
+            task = {
+                key: value
+                for key, value in driver.task.items()
+                if key not in ["result", "logfile"]
+            }
+
+            # The log of the task is streamed back from the start
+            #
+            open(driver.logfile, "wb").close()
+
+            # The worker gives the processes of the task the grace period of this run
+            #
+            message = {
+                "type": "task",
+                "job": job.jobId,
+                "task": task,
+                "termWaitTimeInMins": Global.TERM_WAIT_TIME_IN_MINUTES,
+            }
+            if not self._send(worker, message):
+                unsent.append((worker, job))
+                continue
+
+            ConsoleLogger.logInfo(
+                "[%d]" % driver.taskId, "Executing %s on %s..." % (driver.name, worker.name)
+            )
+
+        # A job which never reached its worker is queued again without counting as a lost run,
+        # unless the worker was already found lost and queued it
+        #
+        if unsent:
+            with self.lock:
+                for worker, job in reversed(unsent):
+                    worker.credits = 0
+                    if worker.jobs.pop(job.jobId, None) is job:
+                        self.queue.appendleft(job)
+
+            self._dispatch()
+
+        for job in skipped:
+            job.callback(job.driver.skip())
+
+    def _acceptWorkers(self):
+        """
+        Accept the connections of the workers, each worker is served by its own thread
+        """
+
+        while not self.stopped.is_set():
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+
+            threading.Thread(
+                target=self._serveWorker, args=(Connection(sock),), daemon=True
+            ).start()
+
+    def _serveWorker(self, connection: Connection):
+        """
+        Handle the messages of a worker until it is lost
+        """
+
+        worker = None
+
+        try:
+            hello = connection.receive()
+            if not hello or hello.get("type") != "hello":
+                raise ProtocolError("expected hello from the worker")
+            if not self._authenticated(hello):
+                raise ProtocolError("worker %s did not give the worker token" % hello.get("name", "worker"))
+
+            worker = RemoteWorker(connection, hello.get("name", "worker"))
+            with self.lock:
+                if self.stopped.is_set():
+                    return
+                self.workers.append(worker)
+            ConsoleLogger.logInfo("Worker %s connected." % worker.name)
+
+            while True:
+                message = connection.receive()
+                if message is None:
+                    break
+
+                worker.lastSeen = time.time()
+                self._handleMessage(worker, message)
+
+        except (OSError, ProtocolError, ValueError, KeyError) as e:
+            ConsoleLogger.logFailure("Connection error with worker: %s" % e)
+
+        finally:
+            connection.close()
+            if worker:
+                self._workerLost(worker)
+
+    def _handleMessage(self, worker: RemoteWorker, message: dict):
+        """
+        Handle a message of a worker
+        """
+
+        if message["type"] == "pull":
+            with self.lock:
+                worker.credits += int(message["count"])
+            self._dispatch()
+
+        elif message["type"] == "log":
+            with self.lock:
+                job = worker.jobs.get(message["job"])
+            if job:
+                self._appendLog(job, base64.b64decode(message["data"]))
+
+        elif message["type"] == "result":
+            with self.lock:
+                job = worker.jobs.pop(message["job"], None)
+            if job:
+                result = message["result"]
+                if result["status"] == STATUS_FAIL and job.driver.syncOnFailure:
+                    self.failedTaskEvent.set()
+                job.driver.task["result"] = result
+                job.callback(result)
+
+    def _appendLog(self, job: RemoteJob, data: bytes):
+        """
+        Add the streamed output of a task to its log, sequential tasks are also shown on the console
+        """
+
+        with open(job.driver.logfile, "ab") as log:
+            log.write(data)
+
+        if job.driver.strategy == SEQUENTIAL_STRATEGY:
+            sys.stdout.write(data.decode(errors="replace"))
+            sys.stdout.flush()
+
+    def _workerLost(self, worker: RemoteWorker):
+        """
+        Queue again the running tasks of a lost worker, a task losing its worker too often fails
+        """
+
+        failed = []
+
+        with self.lock:
+            if worker not in self.workers:
+                return
+            self.workers.remove(worker)
+
+            lostJobs = sorted(worker.jobs.values(), key=lambda job: job.jobId, reverse=True)
+            worker.jobs.clear()
+
+            for job in lostJobs:
+                job.reschedules += 1
+                if job.reschedules > MAX_TASK_RESCHEDULES:
+                    failed.append(job)
+                else:
+                    self.queue.appendleft(job)
+
+            if not self.workers:
+                self.lastWorkerSeen = time.time()
+
+        if not self.stopped.is_set():
+            ConsoleLogger.logFailure(
+                "Lost worker %s, %d task(s) rescheduled." % (worker.name, len(lostJobs) - len(failed))
+            )
+
+        for job in failed:
+            self._failJob(job, "%s lost its worker %d times." % (job.driver.name, job.reschedules))
+
+        self._dispatch()
+
+    def _failJob(self, job: RemoteJob, message: str):
+        """
+        Report a task which could not run as failed
+        """
+
+        result = dict(job.driver.task["result"])
+        result["message"] = message
+        result["status"] = STATUS_FAIL
+        if job.driver.syncOnFailure:
+            self.failedTaskEvent.set()
+        job.callback(result)
+
+    def _monitorWorkers(self):
+        """
+        Drop the workers which stopped sending heartbeats and fail the tasks when no worker shows up
+        """
+
+        while not self.stopped.wait(WORKER_HEARTBEAT_INTERVAL_SECONDS):
+            now = time.time()
+            expired = []
+
+            with self.lock:
+                for worker in self.workers:
+                    if now - worker.lastSeen > WORKER_HEARTBEAT_TIMEOUT_SECONDS:
+                        ConsoleLogger.logFailure("Worker %s stopped sending heartbeats." % worker.name)
+                        worker.connection.close()
+
+                if self.workers or not self.queue:
+                    self.lastWorkerSeen = now
+                elif now - self.lastWorkerSeen > WORKER_WAIT_TIMEOUT_SECONDS:
+                    expired = list(self.queue)
+                    self.queue.clear()
+
+            for job in expired:
+                self._failJob(job, "No worker connected to %s to run %s." % (self.address, job.driver.name))
@@ -21,17 +21,18 @@ class SequentialScheduler(BaseTaskScheduler):
 
         for task in tasks:
             task["Strategy"] = SEQUENTIAL_STRATEGY
-            driver = TaskDriverFactory.createTaskDriver(task, self.mode)
 
-            result = driver()
+            while True:
+                driver = TaskDriverFactory.createTaskDriver(task, self.mode)
+                self._taskStarted(task)
+                result = self.executor.run(driver)
+                if not self._retry(task, result):
+                    break
 
-            self.metrics.addTaskMetrics(
-                result["name"],
-                result["taskDuration"],
-                result["status"],
-                result["cleanupDuration"],
-            )
-            if result["status"] == STATUS_PASS:
+            task["result"] = result
+
+            self._recordTaskMetrics(result, task)
+            if result["status"] in PASSING_STATUSES:
                 ConsoleLogger.logSuccess(result["message"])
             elif result["status"] == STATUS_FAIL:
                 self.failedTaskLog = [
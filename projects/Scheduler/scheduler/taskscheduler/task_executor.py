@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+import multiprocessing
+
+from ..common.constants import *
+from ..common.process_tree import ProcessTree
+from scheduler.taskdriver.task_driver import TaskDriver
+
+
+class TaskExecutor(object):
+    """
+    Long lived process pool shared by all the task schedulers of a run.
+    The worker processes are started once and reused by every group.
+    """
+
+    def __init__(self, numProcess: int = None):
+        """
+        Initialize the executor, the worker processes are started on first use
+        """
+
+        self.numProcess = numProcess or max(1, multiprocessing.cpu_count() // 2)
+
+        # When a task failed, the worker will set this event and the other workers will know
+        # a failure happened and won't start new tasks. It is handed over to the workers when
+        # they are started, so no manager process is needed.
+        #
+        self.failedTaskEvent = multiprocessing.Event()
+
+        # Dispatch ids of the last submissions cancelled while they run, the workers check them while
+        # waiting for the processes of the tasks. Handed over the same way as the failure signal.
+        #
+        self.cancelledTasks = multiprocessing.Array("l", [-1] * CANCELLED_TASKS_SIZE)
+        self.cancelledCount = 0
+
+        self.processPool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, exceptionTraceback):
+        self.shutdown()
+
+    def _ensurePool(self):
+        """
+        Start the worker processes if they are not running
+        """
+
+        if self.processPool is None:
+            self.processPool = multiprocessing.Pool(
+                self.numProcess,
+                initializer=TaskDriver.initWorker,
+                initargs=(self.failedTaskEvent, self.cancelledTasks),
+            )
+
+        return self.processPool
+
+    def resetFailure(self):
+        """
+        Clear the failure signal before scheduling a new set of tasks
+        """
+
+        self.failedTaskEvent.clear()
+
+    def submit(self, driver: TaskDriver, callback):
+        """
+        Run the driver on a worker, callback is called with the task result once it is done
+        """
+
+        def errorCallback(error: BaseException):
+            result = dict(driver.task["result"])
+            result["message"] = str(error)
+            callback(result)
+
+        self._ensurePool().apply_async(
+            driver, args=(), callback=callback, error_callback=errorCallback
+        )
+
+    def cancel(self, driver: TaskDriver):
+        """
+        Stop a task submitted to the workers, only cancellable tasks are stopped.
+        Its callback is still called once its processes are gone.
+        """
+
+        with self.cancelledTasks.get_lock():
+            self.cancelledTasks[self.cancelledCount % CANCELLED_TASKS_SIZE] = driver.dispatchId
+            self.cancelledCount += 1
+
+    def run(self, driver: TaskDriver):
+        """
+        Run the driver on a worker and wait for the task result
+        """
+
+        try:
+            return self._ensurePool().apply(driver)
+        except Exception as e:
+            result = dict(driver.task["result"])
+            result["message"] = str(e)
+            return result
+
+    def terminate(self):
+        """
+        Kill the worker processes and stop the tasks they are running.
+        Return the number of seconds until the processes of the tasks were gone.
+        New workers are started on the next submit.
+        """
+
+        if self.processPool is None:
+            return 0
+
+        # The tasks run in their own sessions and outlive their worker, they are listed before the
+        # workers are killed so none of them can start anything new. Only the workers of this pool
+        # are looked at, the other children of the process are not ours to stop.
+        #
+        tasks = [
+            process
+            for worker in self.processPool._pool
+            for process in ProcessTree.collect(worker.pid, includeRoot=False)
+        ]
+
+        self.processPool.terminate()
+        self.processPool.join()
+        self.processPool = None
+
+        return ProcessTree.terminate(tasks, ProcessTree.graceSeconds())
+
+    def shutdown(self):
+        """
+        Stop the worker processes once the queued tasks are done
+        """
+
+        if self.processPool is not None:
+            self.processPool.close()
+            self.processPool.join()
+            self.processPool = None
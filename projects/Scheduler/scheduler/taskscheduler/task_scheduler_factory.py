@@ -1,5 +1,6 @@
 from ..taskscheduler.sequential_task_scheduler import SequentialScheduler
 from ..taskscheduler.parallel_task_scheduler import ParallelScheduler
+from ..taskscheduler.async_task_scheduler import AsyncScheduler
 
 from ..common.constants import *
 from ..common.metrics import Metrics
@@ -11,14 +12,18 @@ class TaskSchedulerFactory(object):
     """
 
     @staticmethod
-    def createTaskScheduler(strategy: str, mode: str, metrics: Metrics):
+    def createTaskScheduler(
+        strategy: str, mode: str, metrics: Metrics, executor, maxParallel: int = None
+    ):
         """
         Create a task scheduler for the given strategy
         """
 
         if strategy == SEQUENTIAL_STRATEGY:
-            return SequentialScheduler(mode, metrics)
+            return SequentialScheduler(mode, metrics, executor, maxParallel)
         elif strategy == PARALLEL_STRATEGY:
-            return ParallelScheduler(mode, metrics)
+            return ParallelScheduler(mode, metrics, executor, maxParallel)
+        elif strategy == ASYNC_STRATEGY:
+            return AsyncScheduler(mode, metrics, executor, maxParallel)
         else:
             raise ValueError("Unknown strategy: " + strategy)
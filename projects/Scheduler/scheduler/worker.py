@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import argparse
+import base64
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+import psutil
+from scheduler.common.helper import ConsoleLogger, Global
+from scheduler.common.constants import *
+from scheduler.common.exceptions import ProtocolError
+from scheduler.common.protocol import Connection
+from scheduler.taskdriver.task_driver import TaskDriver
+
+
+def parseArguments():
+    """
+    Parse program arguments
+    """
+
+    choiceDescription = """
+        coordinator: Address the coordinator listens on, tcp://HOST:PORT or unix://PATH.
+
+        slots: Number of tasks run at once by this worker.
+
+        workdir: Directory the tasks run in.
+
+        connect-timeout: Seconds to keep trying to reach the coordinator.
+
+        token: Secret the coordinator expects from its workers, %s by default.
+    """ % WORKER_TOKEN_VARIABLE
+
+    argParser = argparse.ArgumentParser(
+        formatter_class=argparse.RawTextHelpFormatter, epilog=choiceDescription
+    )
+
+    argParser.add_argument(
+        "--coordinator",
+        type=str,
+        required=True,
+        help="address of the coordinator",
+    )
+
+    argParser.add_argument(
+        "--slots",
+        type=int,
+        default=max(1, (psutil.cpu_count() or 2) // 2),
+        help="number of tasks run at once",
+    )
+
+    argParser.add_argument(
+        "--workdir",
+        type=str,
+        default=os.getcwd(),
+        help="directory the tasks run in",
+    )
+
+    argParser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=DEFAULT_WORKER_CONNECT_TIMEOUT_SECONDS,
+        help="seconds to keep trying to reach the coordinator",
+    )
+
+    argParser.add_argument(
+        "--token",
+        type=str,
+        default=os.environ.get(WORKER_TOKEN_VARIABLE),
+        help="secret the coordinator expects from its workers",
+    )
+
+    return argParser.parse_args()
+
+
+class Worker(object):
+    """
+    Worker daemon running the tasks of a coordinator.
+
+    The worker asks for as many tasks as it has slots and for one more each time a task is done.
+    A single thread streams the new output of the running tasks along with the heartbeat.
+    """
+
+    def __init__(self, connection: Connection, slots: int, token: str = None):
+        self.connection = connection
+        self.slots = slots
+        self.token = token
+        self.name = "%s:%d" % (socket.gethostname(), os.getpid())
+
+        # Running tasks by job id, with the offset of their log already streamed
+        # and the lock sending their log, the received tasks not running yet and the
+        # running or received tasks which were cancelled
+        #
+        self.running = {}
+        self.pending = set()
+        self.cancelled = set()
+        self.runningLock = threading.Lock()
+
+        self.stopped = threading.Event()
+
+    def serve(self):
+        """
+        Run the tasks of the coordinator until it closes the connection or asks the worker to exit
+        """
+
+        self.connection.send({"type": "hello", "name": self.name, "slots": self.slots, "token": self.token})
+        self.connection.send({"type": "pull", "count": self.slots})
+
+        threading.Thread(target=self._streamLogs, daemon=True).start()
+
+        try:
+            while True:
+                message = self.connection.receive()
+                if message is None or message["type"] == "shutdown":
+                    break
+
+                if message["type"] == "task":
+                    # The processes of the tasks get the grace period of the run of the coordinator
+                    #
+                    Global.TERM_WAIT_TIME_IN_MINUTES = message.get("termWaitTimeInMins")
+                    with self.runningLock:
+                        self.pending.add(message["job"])
+                    threading.Thread(
+                        target=self._runTask, args=(message["job"], message["task"]), daemon=True
+                    ).start()
+                elif message["type"] == "cancel":
+                    self._cancelTask(message["job"])
+
+        except (OSError, ProtocolError) as e:
+            ConsoleLogger.logFailure("Connection error with the coordinator: %s" % e)
+
+        finally:
+            self.stopped.set()
+            with self.runningLock:
+                jobIds = list(self.running)
+            for jobId in jobIds:
+                self._cancelTask(jobId)
+            self.connection.close()
+
+    def _runTask(self, jobId: int, task: dict):
+        """
+        Run a task and send its log and result back to the coordinator
+        """
+
+        # The output is always captured so it can be streamed back
+        #
+        task["Strategy"] = PARALLEL_STRATEGY
+        task.pop("LogFifo", None)
+        driver = TaskDriver(task)
+
+        with self.runningLock:
+            self.pending.discard(jobId)
+            cancelled = jobId in self.cancelled
+            if cancelled:
+                self.cancelled.discard(jobId)
+            else:
+                self.running[jobId] = [driver, 0, threading.Lock()]
+
+        # The slot of a task cancelled before it started is free again
+        #
+        if cancelled:
+            try:
+                self.connection.send({"type": "pull", "count": 1})
+            except OSError:
+                pass
+            return
+
+        result = driver()
+
+        try:
+            self._sendLog(jobId)
+            self.connection.send({"type": "result", "job": jobId, "result": result})
+            self.connection.send({"type": "pull", "count": 1})
+        except OSError:
+            pass
+        finally:
+            with self.runningLock:
+                self.running.pop(jobId, None)
+                self.cancelled.discard(jobId)
+
+    def _cancelTask(self, jobId: int):
+        """
+        Stop the process group of a task, a task which did not start yet will not start
+        """
+
+        # A task which is already done is not running nor pending anymore and is not kept
+        #
+        with self.runningLock:
+            entry = self.running.get(jobId)
+            if entry is None and jobId not in self.pending:
+                return
+            self.cancelled.add(jobId)
+
+        driver = entry[0] if entry else None
+        if getattr(driver, "process", None) is None:
+            return
+
+        # The grace period of the task must not hold up the messages of the coordinator
+        #
+        threading.Thread(target=driver.terminateProcess, daemon=True).start()
+
+    def _sendLog(self, jobId: int):
+        """
+        Send the output the task wrote since the last call
+        """
+
+        with self.runningLock:
+            entry = self.running.get(jobId)
+        if entry is None:
+            return
+
+        driver, _, logLock = entry
+
+        with logLock:
+            if not os.path.isfile(driver.logfile):
+                return
+
+            with open(driver.logfile, "rb") as log:
+                log.seek(entry[1])
+                for chunk in iter(lambda: log.read(LOG_CHUNK_SIZE), b""):
+                    self.connection.send(
+                        {"type": "log", "job": jobId, "data": base64.b64encode(chunk).decode()}
+                    )
+                    entry[1] += len(chunk)
+
+    def _streamLogs(self):
+        """
+        Send the heartbeat and the new output of the running tasks
+        """
+
+        while not self.stopped.wait(WORKER_HEARTBEAT_INTERVAL_SECONDS):
+            with self.runningLock:
+                jobIds = list(self.running)
+                cancelled = [jobId for jobId in jobIds if jobId in self.cancelled]
+
+            # A task cancelled while its process was starting is killed now
+            #
+            for jobId in cancelled:
+                self._cancelTask(jobId)
+
+            try:
+                for jobId in jobIds:
+                    self._sendLog(jobId)
+                self.connection.send({"type": "heartbeat"})
+            except OSError:
+                return
+
+
+def connect(address: str, timeout: float):
+    """
+    Connect to the coordinator, it may not listen yet when the worker starts
+    """
+
+    deadline = time.time() + timeout
+
+    while True:
+        try:
+            return Connection.connect(address, timeout=WORKER_HEARTBEAT_TIMEOUT_SECONDS)
+        except OSError:
+            if time.time() > deadline:
+                ConsoleLogger.logFailure("Cannot reach the coordinator on %s." % address)
+                raise
+            time.sleep(1)
+
+
+def run(
+    coordinator: str,
+    slots: int,
+    workdir: str,
+    connectTimeout: float = DEFAULT_WORKER_CONNECT_TIMEOUT_SECONDS,
+    token: str = None,
+):
+    """
+    Main function of a worker, runs the tasks of the coordinator until the run is over
+    """
+
+    os.chdir(workdir)
+
+    # Each worker has its own log directory, several workers can share a working directory
+    #
+    Global.WORKING_DIR = workdir
+    Global.LOG_DIR = os.path.join(workdir, ".validate_worker_log", str(os.getpid())) + "/"
+    os.makedirs(Global.LOG_DIR, exist_ok=True)
+
+    try:
+        connection = connect(coordinator, connectTimeout)
+        Worker(connection, slots, token).serve()
+    finally:
+        # The logs were streamed to the coordinator, the shared parent is removed once no worker uses it
+        #
+        shutil.rmtree(Global.LOG_DIR, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(os.path.dirname(Global.LOG_DIR)))
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    args = parseArguments()
+
+    run(args.coordinator, args.slots, args.workdir, args.connect_timeout, args.token)
@@ -0,0 +1,92 @@
+from scheduler.common.constants import MAX_TASK_BYPASSES
+from scheduler.taskscheduler.admission_control import AdmissionControl
+
+
+class TestAdmissionControl:
+    """
+    Test the slot accounting of the parallel schedulers
+    """
+
+    def test_admission_control_limits(self):
+        """
+        Test the run, group and task level limits
+        """
+
+        admission = AdmissionControl(3, {"Group 1": 2, "Group 2": None})
+
+        task1 = {"Name": "Task 1", "Group": "Group 1"}
+        task2 = {"Name": "Task 2", "Group": "Group 1"}
+        task3 = {"Name": "Task 3", "Group": "Group 1"}
+        task4 = {"Name": "Task 4", "Group": "Group 2", "Slots": 2}
+        task5 = {"Name": "Task 5", "Group": "Group 2", "Slots": 8}
+
+        # Case 1: the group limit is reached before the run limit
+        #
+        admission.admit(task1)
+        admission.admit(task2)
+
+        assert admission.canAdmit(task3) is False
+        assert admission.pick([task3, task4]) is None
+        assert admission.pick([task3, {"Name": "Task 6", "Group": "Group 2"}]) == 1
+
+        # Case 2: a task uses the slots of its weight
+        #
+        admission.release(task1)
+        admission.release(task2)
+
+        assert admission.pick([task4]) == 0
+        admission.admit(task4)
+        assert admission.canAdmit(task1) is True
+        assert admission.canAdmit(task4) is False
+
+        # Case 3: a task never asks for more slots than the run has
+        #
+        admission.release(task4)
+
+        assert admission.slotsOf(task5) == 3
+        assert admission.canAdmit(task5) is True
+
+    def test_admission_control_resources(self):
+        """
+        Test the packing against CPUs and memory and that large tasks are not starved
+        """
+
+        admission = AdmissionControl(16, cpus=8, memoryMB=1024)
+
+        build = {"Name": "Build", "Group": "Group 1", "Cpus": 8}
+        checks = [
+            {"Name": "Check %d" % index, "Group": "Group 1", "Cpus": 1}
+            for index in range(8)
+        ]
+        large = {"Name": "Large", "Group": "Group 1", "MemoryMB": 4096}
+
+        # Case 1: tasks are packed against the CPUs of the machine
+        #
+        admission.admit(checks[0])
+        assert admission.canAdmit(build) is False
+        assert admission.canAdmit(checks[1]) is True
+
+        # Case 2: a task asking for more than the machine has can still run alone
+        #
+        assert admission.memoryOf(large) == 1024
+        assert admission.canAdmit(large) is True
+
+        # Case 3: the build is overtaken a few times, then the CPUs are kept for it
+        #
+        waiting = [build] + checks[1:]
+        started = []
+        while True:
+            index = admission.pick(waiting)
+            if index is None:
+                break
+            started.append(waiting.pop(index))
+            admission.admit(started[-1])
+
+        assert build in waiting
+        assert len(started) == MAX_TASK_BYPASSES
+
+        admission.release(checks[0])
+        for task in started:
+            admission.release(task)
+
+        assert admission.pick(waiting) == 0
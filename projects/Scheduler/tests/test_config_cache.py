@@ -0,0 +1,41 @@
+import os
+
+from scheduler.common.config_cache import ConfigCache
+
+
+class TestConfigCache:
+    """
+    Test the cache of the parsed config files
+    """
+
+    def test_config_cache_reparse(self, tmp_path):
+        """
+        Test a config file is parsed again only when its content changes
+        """
+
+        path = tmp_path / "tasks.yml"
+        path.write_text("mode: failfast\n")
+        cache = ConfigCache(str(tmp_path / "cache"))
+        parsed = []
+
+        def parse(content):
+            parsed.append(content)
+            return {"content": content.decode()}
+
+        # Case 1: parsed once, then read from the cache
+        #
+        assert cache.load(str(path), parse) == {"content": "mode: failfast\n"}
+        assert cache.load(str(path), parse) == {"content": "mode: failfast\n"}
+        assert len(parsed) == 1
+
+        # Case 2: a new modification time with the same content is not parsed again
+        #
+        os.utime(str(path), ns=(0, 10 ** 9))
+        assert cache.load(str(path), parse) == {"content": "mode: failfast\n"}
+        assert len(parsed) == 1
+
+        # Case 3: a changed content is parsed again
+        #
+        path.write_text("mode: waitall\n")
+        assert cache.load(str(path), parse) == {"content": "mode: waitall\n"}
+        assert len(parsed) == 2
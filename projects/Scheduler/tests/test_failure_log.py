@@ -0,0 +1,51 @@
+from scheduler.common.failure_log import FailureLog
+
+
+class TestFailureLog:
+    """
+    Test the report of the log of a failed task
+    """
+
+    def test_failure_log_report(self, tmp_path):
+        """
+        Test the tail and the error lines of the report
+        """
+
+        logfile = tmp_path / "Task_1_log"
+        logfile.write_text(
+            "".join("line %d\n" % index for index in range(1, 1001))
+            + "ERROR: first\nmore output\nBuild FAILED\nlast line\n"
+        )
+
+        # Case 1: the last lines and the last matching lines, with their line number
+        #
+        report = FailureLog(tailLines=2, maxMatches=1).report(str(logfile))
+
+        assert report[0].startswith("Full log: %s" % logfile)
+        assert report[1:] == [
+            "--- Last 1 line(s) matching the error patterns ---",
+            "   1003: Build FAILED",
+            "--- Last 2 line(s) ---",
+            "Build FAILED",
+            "last line",
+        ]
+
+        # Case 2: the tail is cut at tailBytes and custom patterns replace the default ones
+        #
+        report = FailureLog(tailLines=10, tailBytes=12, patterns=[r"^line 99\d$"]).report(str(logfile))
+
+        assert report[-2:] == ["ED", "last line"]
+        assert "    999: line 999" in report
+        assert "   1001: ERROR: first" not in report
+
+        # Case 3: the lines are numbered from the start of the searched part, the log before it is not read
+        #
+        report = FailureLog(tailLines=1, searchBytes=58).report(str(logfile))
+        searchStart = logfile.stat().st_size - 58
+
+        assert report[1:5] == [
+            "--- Last 2 line(s) matching the error patterns, numbered from byte %d ---" % searchStart,
+            "      2: ERROR: first",
+            "      4: Build FAILED",
+            "--- Last 1 line(s) ---",
+        ]
@@ -0,0 +1,60 @@
+from scheduler.common.constants import STATUS_PASS
+from scheduler.common.history import DurationHistory
+from scheduler.common.metrics import Metrics
+from scheduler.taskscheduler.hedging import HedgePolicy
+
+
+class TestHedging:
+    """
+    Test the detection of the stragglers which get a second copy
+    """
+
+    def test_hedging_stragglers(self, tmp_path):
+        """
+        Test a task is a straggler once it runs for multiple times its p95 duration
+        """
+
+        history = DurationHistory(str(tmp_path / "history.db"))
+        metrics = Metrics(history)
+        hedging = HedgePolicy(metrics, 2)
+
+        task = {"Name": "Task 1", "Command": "echo 1", "Idempotent": True}
+        other = {"Name": "Task 2", "Command": "echo 2"}
+
+        # Case 1: not enough history, the task is never hedged
+        #
+        for index, duration in enumerate([10, 12, 11, 30]):
+            metrics.addTaskMetrics("[%d] Task 1" % index, duration, STATUS_PASS, task=task)
+            metrics.addTaskMetrics("[%d] Task 2" % index, duration, STATUS_PASS, task=other)
+
+        assert hedging.thresholdOf(task) is None
+
+        # Case 2: the p95 is the nearest rank of the last passing durations
+        #
+        metrics.addTaskMetrics("[4] Task 1", 13, STATUS_PASS, task=task)
+        metrics.addTaskMetrics("[4] Task 2", 13, STATUS_PASS, task=other)
+
+        assert history.durationPercentile("Task 1", "echo 1", 95) == 30
+        assert hedging.thresholdOf(task) == 60
+
+        # Case 3: only idempotent tasks which are not a copy already are hedged
+        #
+        assert hedging.thresholdOf(other) is None
+        assert hedging.thresholdOf(dict(task, hedge=True)) is None
+        assert HedgePolicy(metrics, 0).thresholdOf(task) is None
+
+        # Case 4: the task is a straggler once its deadline passed
+        #
+        hedging.taskStarted(task)
+        hedging.taskStarted(other)
+        startTime = hedging.deadlines[id(task)][1] - 60
+
+        assert hedging.stragglers(startTime + 59) == []
+        assert round(hedging.waitSeconds(startTime + 59)) == 1
+        assert hedging.stragglers(startTime + 61) == [task]
+        assert hedging.waitSeconds(startTime + 61) is None
+
+        hedging.taskFinished(task)
+        assert hedging.stragglers(startTime + 61) == []
+
+        history.close()
@@ -0,0 +1,97 @@
+from scheduler.common.constants import STATUS_PASS, STATUS_FAIL, DEFAULT_EXPECTED_DURATION_SECONDS
+from scheduler.common import history as history_module
+from scheduler.common.history import DurationHistory
+from scheduler.common.metrics import Metrics
+
+
+class TestHistory:
+    """
+    Test the duration history store
+    """
+
+    def test_history_expected_durations(self, tmp_path):
+        """
+        Test the expected durations computed from the previous runs
+        """
+
+        history = DurationHistory(str(tmp_path / "history.db"))
+        metrics = Metrics(history)
+
+        task1 = {"Name": "Task 1", "Command": "echo 1"}
+        task2 = {"Name": "Task 2", "Command": "echo 2"}
+        task3 = {"Name": "Task 3", "Command": "echo 3"}
+
+        # Case 1: no history, every task gets the default estimate
+        #
+        assert metrics.expectedDurations([task1, task2]) == [
+            DEFAULT_EXPECTED_DURATION_SECONDS,
+            DEFAULT_EXPECTED_DURATION_SECONDS,
+        ]
+
+        # Case 2: only passing runs are used, tasks without history get the median
+        #
+        metrics.addTaskMetrics("[0] Task 1", 10, STATUS_PASS, task=task1)
+        metrics.addTaskMetrics("[1] Task 1", 20, STATUS_PASS, task=task1)
+        metrics.addTaskMetrics("[2] Task 1", 1, STATUS_FAIL, task=task1)
+        metrics.addTaskMetrics("[3] Task 2", 40, STATUS_PASS, task=task2)
+
+        assert metrics.expectedDurations([task1, task2, task3]) == [15, 40, 27.5]
+
+        # Case 3: the command is part of the key
+        #
+        assert history.expectedDuration("Task 1", "echo changed") is None
+
+        history.close()
+
+    def test_history_flaky_tasks(self, tmp_path):
+        """
+        Test the tasks which passed only after a retry are found in the history
+        """
+
+        history = DurationHistory(str(tmp_path / "history.db"))
+        metrics = Metrics(history)
+
+        task1 = {"Name": "Task 1", "Command": "echo 1"}
+        task2 = {"Name": "Task 2", "Command": "echo 2"}
+
+        # Case 1: a failed attempt followed by a pass makes the task flaky
+        #
+        metrics.addTaskAttempt("[0] Task 1", 1, STATUS_FAIL, task=task1)
+        metrics.addTaskMetrics("[0] Task 1", 2, STATUS_PASS, task=task1)
+
+        info = metrics.results()[0]
+        assert info["flaky"]
+        assert [attempt["status"] for attempt in info["attempts"]] == [STATUS_FAIL, STATUS_PASS]
+
+        # Case 2: failing every attempt or passing at once is not flaky
+        #
+        metrics.addTaskMetrics("[1] Task 1", 2, STATUS_PASS, task=task1)
+        metrics.addTaskAttempt("[2] Task 2", 1, STATUS_FAIL, task=task2)
+        metrics.addTaskMetrics("[2] Task 2", 1, STATUS_FAIL, task=task2)
+
+        assert not metrics.results()[2]["flaky"]
+        assert history.flakiness("Task 1") == (2, 1)
+        assert history.flakyTasks() == [("Task 1", 2, 1)]
+
+        history.close()
+
+    def test_history_retention(self, tmp_path, monkeypatch):
+        """
+        Test only the last runs of each task are kept
+        """
+
+        monkeypatch.setattr(history_module, "HISTORY_RETENTION_SIZE", 3)
+        history = DurationHistory(str(tmp_path / "history.db"))
+
+        for duration in range(1, 6):
+            history.record("Task 1", "echo 1", duration, STATUS_PASS)
+            history.recordAttempts("Task 1", "echo 1", 1, STATUS_PASS)
+        history.record("Task 2", "echo 2", 7, STATUS_FAIL)
+
+        # Case 1: the oldest runs of a task are dropped, the other tasks keep theirs
+        #
+        assert history.durations("Task 1", "echo 1") == [5, 4, 3]
+        assert history.flakiness("Task 1") == (3, 0)
+        assert history.connection.execute("SELECT COUNT(*) FROM task_runs").fetchone()[0] == 4
+
+        history.close()
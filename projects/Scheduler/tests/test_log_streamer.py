@@ -0,0 +1,35 @@
+import subprocess
+
+from scheduler.common.log_streamer import LogStreamer
+
+
+class TestLogStreamer:
+    """
+    Test the live streaming of the task output
+    """
+
+    def test_log_streamer(self, tmp_path, capsys):
+        """
+        Test that the output goes to the logfile and, within the rate limit, to the console
+        """
+
+        streamer = LogStreamer(maxLinesPerSecond=5)
+        task = {"id": 7, "Name": "Task 1", "logfile": str(tmp_path / "Task_1_log")}
+
+        streamer.open(task)
+        with open(task["LogFifo"], "w") as log:
+            subprocess.run("seq 1 20; printf end", shell=True, stdout=log, check=True)
+        streamer.close(task)
+        streamer.stop()
+
+        # Case 1: the logfile gets the whole output
+        #
+        with open(task["logfile"]) as log:
+            assert log.read().split() == [str(line) for line in range(1, 21)] + ["end"]
+
+        # Case 2: the console gets the first lines within the rate limit and the number of hidden lines
+        #
+        console = capsys.readouterr().out.splitlines()
+        assert console[:5] == ["[7] Task 1 | %d" % line for line in range(1, 6)]
+        assert console[-1].startswith("[7] Task 1 | ") and "line(s) not shown" in console[-1]
+        assert "LogFifo" not in task
@@ -0,0 +1,46 @@
+import time
+
+import psutil
+
+from scheduler.common.process_tree import ProcessTree
+
+
+class TestProcessTree:
+    """
+    Test stopping the process group of a task
+    """
+
+    def test_process_tree_terminate(self):
+        """
+        Test SIGTERM stops a polite tree, and SIGKILL the processes ignoring it after the grace period
+        """
+
+        # Case 1: the tree exits on SIGTERM, long before the grace period is over
+        #
+        process = psutil.Popen("sleep 100 & sleep 100; wait", shell=True, start_new_session=True)
+        time.sleep(0.2)
+        processes = ProcessTree.collect(process.pid)
+        assert len(processes) == 3
+        assert ProcessTree.terminate(processes, 30) < 5
+        assert not [p for p in processes if p.is_running() and p.status() != psutil.STATUS_ZOMBIE]
+        process.wait()
+
+        # Case 2: a background process ignoring SIGTERM is killed once the grace period is over,
+        # even though it was started after the tree was listed
+        #
+        process = psutil.Popen(
+            "trap '' TERM; sleep 0.5; sleep 100 & wait", shell=True, start_new_session=True
+        )
+
+        # The shell ignores SIGTERM once it started its first sleep
+        #
+        deadline = time.time() + 5
+        while not any(child.name() == "sleep" for child in process.children()) and time.time() < deadline:
+            time.sleep(0.01)
+        seconds = ProcessTree.terminate(ProcessTree.collect(process.pid), 1, [process.pid])
+        assert 1 <= seconds < 5
+        process.wait(timeout=5)
+        time.sleep(0.1)
+        assert not [
+            p for p in psutil.process_iter(["cmdline"]) if p.info["cmdline"] == ["sleep", "100"]
+        ]
@@ -0,0 +1,40 @@
+import os
+import time
+
+import psutil
+
+from scheduler.common.resource_usage import ResourceSampler
+
+
+class TestResourceUsage:
+    """
+    Test the sampling of the resource usage of a process tree
+    """
+
+    def test_resource_usage_of_tree(self):
+        """
+        Test the CPU time of the children is accounted to the tree once they exited
+        """
+
+        process = psutil.Popen("sleep 0.3; python3 -c 'sum(range(10 ** 7))'", shell=True)
+        sampler = ResourceSampler(process.pid)
+
+        # Case 1: only the sleeping child is alive at the sample
+        #
+        time.sleep(0.1)
+        sampler.sample()
+        assert sampler.usage()["childProcesses"] == 1
+        assert sampler.usage()["peakRssBytes"] > 0
+
+        # Case 2: the exited shell is not reaped yet and accounts for all its children
+        #
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        sampler.sample()
+        usage = sampler.usage()
+        assert usage["cpuUser"] + usage["cpuSystem"] > 0.05
+
+        # Case 3: the reaped shell cannot be sampled anymore, the usage is kept
+        #
+        process.wait()
+        sampler.sample()
+        assert sampler.usage() == usage
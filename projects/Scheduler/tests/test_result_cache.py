@@ -0,0 +1,56 @@
+import os
+import time
+
+from scheduler.common.result_cache import ResultCache
+
+
+class TestResultCache:
+    """
+    Test the content addressed result cache
+    """
+
+    def test_result_cache_key_and_eviction(self, tmp_path):
+        """
+        Test the keys of the cache and the removal of old entries
+        """
+
+        (tmp_path / "input.txt").write_text("v1")
+        logfile = tmp_path / "task_log"
+        logfile.write_text("output")
+
+        cache = ResultCache(str(tmp_path / "cache"), str(tmp_path), ["CACHE_TEST_VARIABLE"])
+        task = {"Name": "Task 1", "Command": "cat input.txt", "Inputs": ["*.txt"]}
+
+        # Case 1: a stored result is found under the same key and its log is replayed
+        #
+        key = cache.keyOf(task)
+        assert cache.lookup(key) is None
+
+        cache.store(key, task, str(logfile), 1.5)
+        meta = cache.lookup(key)
+        assert meta["taskDuration"] == 1.5
+
+        replayed = tmp_path / "replayed_log"
+        cache.replayLog(meta, str(replayed))
+        assert replayed.read_text() == "output"
+
+        # Case 2: the inputs, the command and the environment are part of the key
+        #
+        (tmp_path / "input.txt").write_text("v2")
+        assert cache.keyOf(task) != key
+
+        assert cache.keyOf(dict(task, Command="cat input.txt && true")) != cache.keyOf(task)
+
+        currentKey = cache.keyOf(task)
+        os.environ["CACHE_TEST_VARIABLE"] = "1"
+        try:
+            assert cache.keyOf(task) != currentKey
+        finally:
+            del os.environ["CACHE_TEST_VARIABLE"]
+
+        # Case 3: entries not used for longer than maxAgeDays are removed
+        #
+        oldTime = time.time() - 2 * cache.maxAgeDays * 24 * 3600
+        os.utime(os.path.join(cache.directory, key), (oldTime, oldTime))
+        cache.evict()
+        assert cache.lookup(key) is None
@@ -0,0 +1,49 @@
+import json
+import xml.etree.ElementTree as ElementTree
+
+from scheduler.common.constants import STATUS_PASS, STATUS_FAIL, STATUS_SKIP
+from scheduler.common.metrics import Metrics
+from scheduler.common.results import ResultsReporter
+
+
+class TestResults:
+    """
+    Test the results files written while the run goes on
+    """
+
+    def test_results_reporter(self, tmp_path):
+        """
+        Test the JSON, JUnit and Prometheus files follow the finished tasks
+        """
+
+        paths = {
+            "json": str(tmp_path / "results.json"),
+            "junit": str(tmp_path / "junit.xml"),
+            "prometheus": str(tmp_path / "scheduler.prom"),
+        }
+        metrics = Metrics()
+        metrics.reporter = ResultsReporter(metrics, paths, intervalSeconds=0)
+        task = {"Name": 'Task "1"', "Group": "Group", "Command": "true"}
+
+        # Case 1: the files are written as soon as a task finished
+        #
+        metrics.addTaskMetrics("[0] Task 0", 1.5, STATUS_PASS, task=dict(task, Name="Task 0"))
+        with open(paths["json"]) as reader:
+            assert json.load(reader)["passed"] is None
+        with open(paths["prometheus"]) as reader:
+            assert "scheduler_run_finished 0" in reader.read()
+
+        # Case 2: the final files
+        #
+        metrics.addTaskMetrics("[1] Task 1", 2, STATUS_FAIL, task=task, timedOut=True)
+        metrics.addTaskMetrics("[2] Task 2", 0, STATUS_SKIP, task=dict(task, Name="Task 2"))
+        metrics.reporter.finish(False)
+
+        suite = ElementTree.parse(paths["junit"]).getroot().find("testsuite")
+        assert (suite.get("tests"), suite.get("failures"), suite.get("skipped")) == ("3", "1", "1")
+        assert suite.findall("testcase")[1].find("failure").get("type") == "timeout"
+
+        with open(paths["prometheus"]) as reader:
+            prometheus = reader.read()
+        assert 'scheduler_task_timed_out{task="Task \\"1\\"",group="Group"} 1' in prometheus
+        assert "scheduler_run_passed 0" in prometheus
@@ -0,0 +1,76 @@
+import pytest
+
+from scheduler.common.constants import STATUS_PASS, STATUS_FAIL
+from scheduler.common.exceptions import InvalidIntervalError
+from scheduler.common.run_monitor import RunMonitor
+from scheduler.configuration import Configuration
+
+
+class TestRunMonitor:
+    """
+    Test the progress reported by the run monitor
+    """
+
+    def test_run_monitor_progress(self, capsys):
+        """
+        Test the counts and the expected time left reported from the task events
+        """
+
+        tasks = [{"id": index, "Name": "Task %d" % index} for index in range(4)]
+        monitor = RunMonitor(tasks, [100, 40, 20, 20], capacity=2, heartbeatSeconds=60)
+        startTime = monitor.startTime
+
+        # Case 1: nothing started, the work is spread over the 2 slots
+        #
+        assert monitor.estimate(startTime) == 90
+
+        # Case 2: the longest running task bounds the time left
+        #
+        monitor.taskStarted(tasks[0])
+        monitor.taskStarted(tasks[1])
+        monitor.running[id(tasks[0])] = (tasks[0], startTime)
+        monitor.running[id(tasks[1])] = (tasks[1], startTime)
+        monitor.taskFinished(tasks[1], STATUS_PASS)
+        monitor.taskFinished(tasks[2], STATUS_FAIL)
+
+        assert monitor.estimate(startTime + 50) == 50
+
+        # Case 3: the report shows the counts and the running tasks, the monitor stops once the run is over
+        #
+        monitor.report()
+        monitor.runFinished()
+        monitor.wait()
+
+        output = capsys.readouterr().out
+        assert "1 running, 1 queued, 2/4 finished (1 failed)" in output
+        assert "[0] Task 0" in output
+
+    def test_run_monitor_heartbeat_config(self, tmp_path):
+        """
+        Test the heartbeat of the config is a number of seconds more than 0
+        """
+
+        def load(heartbeat):
+            configFile = tmp_path / "config-heartbeat.yaml"
+            configFile.write_text(
+                "mode: waitall\n"
+                "heartbeatSeconds: %s\n"
+                "groups:\n"
+                "  - Group: Group 1\n"
+                "    Strategy: sequential\n"
+                "tasks:\n"
+                "  - Command: 'true'\n"
+                "    Name: Task 1\n"
+                "    Group: Group 1\n" % heartbeat
+            )
+            return Configuration(str(configFile), "all")
+
+        # Case 1: a fraction of a second is accepted, as it is on the command line
+        #
+        assert load(0.5).heartbeatSeconds == 0.5
+
+        # Case 2: 0 and negative intervals are rejected
+        #
+        for heartbeat in [0, -1]:
+            with pytest.raises(InvalidIntervalError, match="more than 0"):
+                load(heartbeat)
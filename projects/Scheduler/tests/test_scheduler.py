@@ -1,11 +1,26 @@
+import multiprocessing
 import os
+import psutil
 import pytest
 import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
 from scheduler import app
 from scheduler.common.helper import Global
-from scheduler.common.constants import STATUS_PASS, STATUS_FAIL
+from scheduler.common.constants import PARALLEL_STRATEGY, STATUS_PASS, STATUS_FAIL, STATUS_SKIP
+from scheduler.common.exceptions import UnsafeListenAddressError, UnsupportedStrategyError
+from scheduler.common.history import DurationHistory
+from scheduler.common.log_streamer import LogStreamer
 from scheduler.common.metrics import Metrics
 from scheduler.configuration import Configuration
+from scheduler.common.protocol import Connection
+from scheduler.taskscheduler.remote_executor import RemoteExecutor
+from scheduler.taskscheduler.task_executor import TaskExecutor
+from scheduler.taskdriver.task_driver_factory import TaskDriverFactory
+from scheduler.worker import Worker
 
 
 class TestScheduler:
@@ -151,3 +166,514 @@ class TestScheduler:
         assert 'result' in config.groups[group1]["Tasks"][0]
         assert 'result' in config.groups[group1]["Tasks"][1]
         assert 'result' not in config.groups[group2]["Tasks"][0]
+
+    def test_scheduler_dag(self, setup_dirs, tmp_path, logger):
+        """
+        Test the dag scheduler
+        """
+
+        # Constants
+        #
+        configFile = "config/config-scheduler-dag.yaml"
+        group1 = "Group 1"
+        group2 = "Group 2"
+        group3 = "Group 3"
+
+        # Case 1: success tasks
+        #
+        logger.info("Running the success case for dag scheduling")
+
+        metrics = Metrics()
+        config = Configuration(configFile, "all")
+        result = app.execGraph(config, metrics)
+
+        assert result is True
+        assert config.groups[group1]["Tasks"][0]["result"]["status"] == STATUS_PASS
+        assert config.groups[group2]["Tasks"][1]["result"]["status"] == STATUS_PASS
+        assert config.groups[group3]["Tasks"][0]["result"]["status"] == STATUS_PASS
+
+        # Case 2: failed dependency with "waitall" mode
+        #
+        logger.info(
+            "Running the failure case for dag scheduling with waitall mode")
+
+        config = Configuration(configFile, "all")
+        config.groups[group1]["Tasks"][1]['Command'] = 'exit 1'
+        result = app.execGraph(config, metrics)
+
+        assert result is False
+        assert config.groups[group1]["Tasks"][1]["result"]["status"] == STATUS_FAIL
+        assert config.groups[group2]["Tasks"][0]["result"]["status"] == STATUS_PASS
+        assert config.groups[group3]["Tasks"][0]["result"]["status"] == STATUS_PASS
+
+        # The skipped task is recorded under its id like the tasks which ran
+        #
+        skipped = config.groups[group2]["Tasks"][1]
+        assert skipped["result"]["status"] == STATUS_SKIP
+        assert metrics.taskMetrics["[%d] %s" % (skipped["id"], skipped["Name"])]["status"] == STATUS_SKIP
+
+        # Case 3: failed tasks with "failfast" mode
+        #
+        logger.info(
+            "Running the failure case for dag scheduling with failfast mode")
+
+        config = Configuration(configFile, "all")
+        config.mode = "failfast"
+        config.groups[group1]["Tasks"][0]['Command'] = 'exit 1'
+        result = app.execGraph(config, metrics)
+
+        assert result is False
+        assert config.groups[group1]["Tasks"][0]["result"]["status"] == STATUS_FAIL
+        assert config.groups[group3]["Tasks"][0]["result"]["status"] == STATUS_SKIP
+
+        # Case 4: an async group is rejected, the dag scheduler runs every task in a worker
+        #
+        asyncConfigFile = tmp_path / "config-scheduler-dag-async.yaml"
+        with open(configFile) as f:
+            asyncConfigFile.write_text(f.read().replace(
+                "  - Group: Group 3\n    Strategy: parallel", "  - Group: Group 3\n    Strategy: async"))
+
+        with pytest.raises(UnsupportedStrategyError):
+            Configuration(str(asyncConfigFile), "all")
+
+    def test_scheduler_executor_terminate(self, setup_dirs, tmp_path, logger):
+        """
+        Test the groups share the process pool and terminate only stops the tasks of the pool
+        """
+
+        configFile = tmp_path / "config-executor.yaml"
+        configFile.write_text(
+            "mode: waitall\n"
+            "groups:\n"
+            "  - Group: Group 1\n"
+            "    Strategy: parallel\n"
+            "  - Group: Group 2\n"
+            "    Strategy: parallel\n"
+            "tasks:\n"
+            "  - Command: echo first\n"
+            "    Name: Task 1\n"
+            "    Group: Group 1\n"
+            "  - Command: echo second\n"
+            "    Name: Task 2\n"
+            "    Group: Group 2\n"
+        )
+
+        def running(command: list):
+            return [p for p in psutil.process_iter(["cmdline"]) if p.info["cmdline"] == command]
+
+        termWait = Global.TERM_WAIT_TIME_IN_MINUTES
+        Global.TERM_WAIT_TIME_IN_MINUTES = 0.05
+
+        # Another child of the process, with a process of its own in its own session
+        #
+        other = multiprocessing.Process(
+            target=subprocess.call, args=(["sleep", "101"],), kwargs={"start_new_session": True}
+        )
+
+        try:
+            with TaskExecutor(2) as executor:
+                # Case 1: the tasks of both groups run on the workers of a single pool
+                #
+                logger.info("Running two groups on one executor")
+
+                config = Configuration(str(configFile), "all")
+                assert app.execGroups(config, Metrics(), executor) is True
+
+                pool = executor.processPool
+                workers = {worker.pid for worker in pool._pool}
+                tasks = config.groups["Group 1"]["Tasks"] + config.groups["Group 2"]["Tasks"]
+                assert {task["result"]["worker"]["pid"] for task in tasks} <= workers
+
+                # Case 2: terminate stops the task running on the pool and not the other child
+                #
+                logger.info("Terminating the executor next to another child process")
+
+                other.start()
+                task = {"Command": "sleep 102", "Name": "Task 3", "Strategy": PARALLEL_STRATEGY}
+                executor.submit(TaskDriverFactory.createTaskDriver(task, "waitall"), lambda result: None)
+                assert executor.processPool is pool
+
+                deadline = time.time() + 30
+                while not (running(["sleep", "101"]) and running(["sleep", "102"])) and time.time() < deadline:
+                    time.sleep(0.05)
+                assert running(["sleep", "101"]) and running(["sleep", "102"])
+
+                executor.terminate()
+
+                assert not running(["sleep", "102"])
+                assert running(["sleep", "101"])
+                assert other.is_alive()
+        finally:
+            Global.TERM_WAIT_TIME_IN_MINUTES = termWait
+            for process in running(["sleep", "101"]):
+                process.kill()
+            if other.pid:
+                other.join(timeout=30)
+
+    def test_scheduler_async(self, setup_dirs, logger):
+        """
+        Test the async scheduler
+        """
+
+        # Constants
+        #
+        configFile = "config/config-scheduler-async.yaml"
+        group1 = "Group 1"
+        group2 = "Group 2"
+
+        # Case 1: success tasks
+        #
+        logger.info("Running the success case for async strategy")
+
+        metrics = Metrics()
+        config = Configuration(configFile, "all")
+        result = app.execGroups(config, metrics)
+
+        assert result is True
+        assert config.groups[group1]["Tasks"][0]["result"]["status"] == STATUS_PASS
+        assert config.groups[group1]["Tasks"][1]["result"]["status"] == STATUS_PASS
+        assert config.groups[group2]["Tasks"][0]["result"]["status"] == STATUS_PASS
+
+        # Case 2: timed out tasks with "waitall" mode
+        #
+        logger.info(
+            "Running the timeout case for async strategy with waitall mode")
+
+        config = Configuration(configFile, "all")
+        config.groups[group1]["Tasks"][0]['Command'] = 'sleep 30'
+        config.groups[group1]["Tasks"][0]['TimeoutInMinutes'] = 0.01
+        result = app.execGroups(config, metrics)
+
+        assert result is False
+        assert config.groups[group1]["Tasks"][0]["result"]["status"] == STATUS_FAIL
+        assert config.groups[group1]["Tasks"][1]["result"]["status"] == STATUS_PASS
+        assert config.groups[group2]["Tasks"][0]["result"]["status"] == STATUS_PASS
+
+        # Case 3: failed tasks with "failfast" mode
+        #
+        logger.info(
+            "Running the failure case for async strategy with failfast mode")
+
+        config = Configuration(configFile, "all")
+        config.mode = "failfast"
+        config.groups[group1]["Tasks"][0]['Command'] = 'exit 1'
+        result = app.execGroups(config, metrics)
+
+        assert result is False
+        assert config.groups[group1]["Tasks"][0]["result"]["status"] == STATUS_FAIL
+        assert 'result' not in config.groups[group2]["Tasks"][0]
+
+    def test_scheduler_distributed(self, setup_dirs, tmp_path, logger):
+        """
+        Test the coordinator with workers connected over a Unix socket
+        """
+
+        # Constants
+        #
+        configFile = "config/config-scheduler-dag.yaml"
+        group1 = "Group 1"
+        group3 = "Group 3"
+        address = "unix://" + str(tmp_path / "coordinator.sock")
+        environment = dict(os.environ, PYTHONPATH=os.path.dirname(Global.CURRENT_PATH))
+
+        # Case 1: a worker is lost while running a task, the task runs on the next worker
+        #
+        logger.info("Running the worker loss case for distributed execution")
+
+        metrics = Metrics()
+        config = Configuration(configFile, "all")
+
+        with RemoteExecutor(address) as executor:
+            lostWorker = Connection.connect(address)
+            lostWorker.send({"type": "hello", "name": "lost worker"})
+            lostWorker.send({"type": "pull", "count": 1})
+
+            run_thread = threading.Thread(target=app.execGraph, args=(config, metrics, executor))
+            run_thread.start()
+
+            assert lostWorker.receive()["type"] == "task"
+            lostWorker.close()
+
+            worker = subprocess.Popen(
+                [sys.executable, "-m", "scheduler.worker", "--coordinator", address,
+                 "--slots", "2", "--workdir", str(tmp_path)],
+                env=environment,
+            )
+            run_thread.join(timeout=120)
+
+        assert worker.wait(timeout=30) == 0
+        assert run_thread.executionPassed is True
+        assert config.groups[group1]["Tasks"][0]["result"]["status"] == STATUS_PASS
+        assert config.groups[group3]["Tasks"][0]["result"]["status"] == STATUS_PASS
+
+        # The worker removes its log directory once it exits
+        #
+        assert not (tmp_path / ".validate_worker_log").exists()
+
+    def test_scheduler_worker_token(self, setup_dirs, logger):
+        """
+        Test the coordinator only serves the workers giving its token
+        """
+
+        # Case 1: tcp needs a token, and a loopback address unless remote workers are allowed
+        #
+        with pytest.raises(UnsafeListenAddressError):
+            RemoteExecutor("tcp://127.0.0.1:0")
+
+        with pytest.raises(UnsafeListenAddressError):
+            RemoteExecutor("tcp://0.0.0.0:0", token="secret")
+
+        # Case 2: a hello without the token or with another token is rejected
+        #
+        with RemoteExecutor("tcp://0", token="secret") as executor:
+            address = "tcp://127.0.0.1:%d" % executor.server.getsockname()[1]
+
+            for hello in [{"type": "hello", "name": "intruder"}, {"type": "hello", "name": "intruder", "token": "guess"}]:
+                intruder = Connection.connect(address)
+                intruder.send(hello)
+                intruder.send({"type": "pull", "count": 1})
+                assert intruder.receive() is None
+                intruder.close()
+
+            assert executor.workers == []
+
+            # Case 3: a worker giving the token is served
+            #
+            worker = Connection.connect(address)
+            worker.send({"type": "hello", "name": "worker", "token": "secret"})
+
+            deadline = time.time() + 30
+            while not executor.workers and time.time() < deadline:
+                time.sleep(0.05)
+            assert [remote.name for remote in executor.workers] == ["worker"]
+            worker.close()
+
+    def test_scheduler_worker_cancel(self, setup_dirs, logger):
+        """
+        Test the worker only keeps the cancellations of its running or received tasks
+        """
+
+        coordinatorSocket, workerSocket = socket.socketpair()
+        coordinator = Connection(coordinatorSocket)
+        worker = Worker(Connection(workerSocket), 1)
+        termWait = Global.TERM_WAIT_TIME_IN_MINUTES
+        task = {"Command": "true", "Name": "Task 1", "id": 1, "dispatchId": 1, "Mode": "waitall"}
+
+        serving = threading.Thread(target=worker.serve, daemon=True)
+        serving.start()
+
+        try:
+            assert coordinator.receive()["type"] == "hello"
+            assert coordinator.receive() == {"type": "pull", "count": 1}
+
+            # Case 1: a cancel of a task which is done is dropped, the task gets the grace period of the run
+            #
+            logger.info("Running a task on the worker after a cancel of a finished task")
+
+            coordinator.send({"type": "cancel", "job": 7})
+            coordinator.send({"type": "task", "job": 1, "task": dict(task), "termWaitTimeInMins": 0.25})
+
+            messages = []
+            while not messages or messages[-1]["type"] != "pull":
+                message = coordinator.receive()
+                if message["type"] != "heartbeat":
+                    messages.append(message)
+
+            result = next(message for message in messages if message["type"] == "result")
+            assert result["job"] == 1
+            assert result["result"]["status"] == STATUS_PASS
+            assert Global.TERM_WAIT_TIME_IN_MINUTES == 0.25
+            assert worker.cancelled == set()
+
+            # Case 2: a task cancelled before it started does not run and is not kept
+            #
+            logger.info("Cancelling a task received by the worker before it started")
+
+            with worker.runningLock:
+                worker.pending.add(2)
+            worker._cancelTask(2)
+            assert worker.cancelled == {2}
+
+            worker._runTask(2, dict(task))
+            assert worker.cancelled == set()
+            assert worker.pending == set()
+            assert worker.running == {}
+        finally:
+            coordinator.close()
+            serving.join(timeout=30)
+            Global.TERM_WAIT_TIME_IN_MINUTES = termWait
+
+    def test_scheduler_parallel_stream_logs(self, setup_dirs, tmp_path, logger):
+        """
+        Test the parallel scheduler while the output of the tasks is streamed
+        """
+
+        configFile = tmp_path / "config-stream-logs.yaml"
+        configFile.write_text(
+            "mode: waitall\n"
+            "groups:\n"
+            "  - Group: Group 1\n"
+            "    Strategy: parallel\n"
+            "tasks:\n"
+            "  - Command: echo first\n"
+            "    Name: Task 1\n"
+            "    Group: Group 1\n"
+            "  - Command: echo second\n"
+            "    Name: Task 2\n"
+            "    Group: Group 1\n"
+        )
+
+        logger.info("Running a parallel group with streamed logs")
+
+        Global.LOG_STREAMER = LogStreamer()
+        try:
+            config = Configuration(str(configFile), "all")
+            result = app.execGroups(config, Metrics())
+        finally:
+            Global.LOG_STREAMER.stop()
+            Global.LOG_STREAMER = None
+
+        assert result is True
+        for task, output in zip(config.groups["Group 1"]["Tasks"], ["first", "second"]):
+            assert task["result"]["status"] == STATUS_PASS
+            assert "LogFifo" not in task
+            with open(task["logfile"]) as log:
+                assert output in log.read()
+
+    def test_scheduler_hedge_fails_first(self, setup_dirs, tmp_path, logger):
+        """
+        Test a hedged task whose second copy fails while the first copy still runs
+        """
+
+        # The first run of the command is slow, the next ones fail at once except the third one
+        #
+        runs = tmp_path / "runs"
+        runs.mkdir()
+        command = (
+            "if mkdir %(runs)s/1 2>/dev/null; then sleep 2; exit $FIRST;"
+            " elif mkdir %(runs)s/2 2>/dev/null; then exit 1; else exit 0; fi" % {"runs": runs}
+        )
+        configFile = tmp_path / "config-hedge.yaml"
+        configFile.write_text(
+            "mode: waitall\n"
+            "groups:\n"
+            "  - Group: Group 1\n"
+            "    Strategy: parallel\n"
+            "tasks:\n"
+            "  - Command: %s\n"
+            "    Name: Task 1\n"
+            "    Group: Group 1\n"
+            "    Idempotent: true\n"
+            "    Retries: 1\n"
+            "    RetryDelaySeconds: 0\n" % command
+        )
+
+        hedgeMultiple = Global.HEDGE_MULTIPLE
+        Global.HEDGE_MULTIPLE = 2
+
+        def run(first):
+            for path in runs.iterdir():
+                path.rmdir()
+            os.environ["FIRST"] = str(first)
+            config = Configuration(str(configFile), "all")
+            task = config.groups["Group 1"]["Tasks"][0]
+
+            # A history of fast runs, the slow first run is a straggler
+            #
+            history = DurationHistory(str(tmp_path / ("history-%d.db" % first)))
+            metrics = Metrics(history)
+            for index in range(5):
+                metrics.addTaskMetrics("[%d] Task 1" % index, 0.2, STATUS_PASS, task=task)
+
+            try:
+                with TaskExecutor(2) as executor:
+                    result = app.execGroups(config, metrics, executor)
+            finally:
+                history.close()
+            return result, task
+
+        try:
+            # Case 1: the second copy fails first, the first copy is waited for and passes
+            #
+            logger.info("Running a hedged task whose second copy fails first")
+
+            result, task = run(0)
+            assert result is True
+            assert task["result"]["status"] == STATUS_PASS
+            assert task.get("attempt", 1) == 1
+            assert sorted(path.name for path in runs.iterdir()) == ["1", "2"]
+
+            # Case 2: both copies fail, the retry is not taken for a cancelled copy and passes
+            #
+            logger.info("Running a hedged task whose copies both fail")
+
+            result, task = run(1)
+            assert result is True
+            assert task["result"]["status"] == STATUS_PASS
+            assert task["attempt"] == 2
+        finally:
+            Global.HEDGE_MULTIPLE = hedgeMultiple
+            os.environ.pop("FIRST", None)
+
+    def test_scheduler_hedge_retried_task(self, setup_dirs, tmp_path, logger):
+        """
+        Test the second copy of a straggler which runs again after a failed attempt
+        """
+
+        # The first run fails, the second one is a straggler and the third one passes at once,
+        # each run writes the time it started at
+        #
+        runs = tmp_path / "runs"
+        runs.mkdir()
+        command = (
+            "for run in 1 2 3; do mkdir %(runs)s/$run 2>/dev/null && break; done;"
+            " date +%%s.%%N > %(runs)s/$run/start;"
+            " if [ $run = 1 ]; then exit 1; elif [ $run = 2 ]; then sleep 10; fi" % {"runs": runs}
+        )
+        configFile = tmp_path / "config-hedge-retry.yaml"
+        configFile.write_text(
+            "mode: waitall\n"
+            "groups:\n"
+            "  - Group: Group 1\n"
+            "    Strategy: parallel\n"
+            "tasks:\n"
+            "  - Command: %s\n"
+            "    Name: Task 1\n"
+            "    Group: Group 1\n"
+            "    Idempotent: true\n"
+            "    Retries: 1\n"
+            "    RetryDelaySeconds: 3\n" % command
+        )
+
+        hedgeMultiple = Global.HEDGE_MULTIPLE
+        Global.HEDGE_MULTIPLE = 2
+
+        config = Configuration(str(configFile), "all")
+        task = config.groups["Group 1"]["Tasks"][0]
+        history = DurationHistory(str(tmp_path / "history.db"))
+        metrics = Metrics(history)
+        for index in range(5):
+            metrics.addTaskMetrics("[%d] Task 1" % index, 0.2, STATUS_PASS, task=task)
+
+        try:
+            logger.info("Running a hedged task on its second attempt")
+
+            with TaskExecutor(2) as executor:
+                result = app.execGroups(config, metrics, executor)
+        finally:
+            Global.HEDGE_MULTIPLE = hedgeMultiple
+            history.close()
+
+        # The copy starts without waiting for the delay of the retry and is reported as the second attempt
+        #
+        def started(run):
+            return float((runs / run / "start").read_text())
+
+        assert result is True
+        assert sorted(path.name for path in runs.iterdir()) == ["1", "2", "3"]
+        assert started("2") - started("1") >= 3
+        assert started("3") - started("2") < 3
+        assert task["attempt"] == 2
+        assert task["result"]["status"] == STATUS_PASS
+        assert task["result"]["attempt"] == 2
+        assert task["result"]["name"] == "[%d] Task 1" % task["id"]
@@ -0,0 +1,134 @@
+import types
+
+from scheduler import app
+from scheduler.common.constants import STATUS_PASS, STATUS_FAIL
+from scheduler.common.history import DurationHistory
+from scheduler.common.metrics import Metrics
+from scheduler.common.results import ResultsFile
+from scheduler.common.sharding import Shard
+
+
+class TestSharding:
+    """
+    Test the split of a run into shards and the merge of their results
+    """
+
+    def _groups(self):
+        groups = {
+            "Build": {"Strategy": "sequential", "Tasks": []},
+            "Test": {"Strategy": "parallel", "Tasks": []},
+        }
+        for name in ["build 1", "build 2"]:
+            groups["Build"]["Tasks"].append({"Name": name, "Command": name, "Group": "Build"})
+        for index in range(6):
+            groups["Test"]["Tasks"].append(
+                {"Name": "test %d" % index, "Command": "test %d" % index, "Group": "Test"}
+            )
+        groups["Test"]["Tasks"][5]["DependsOn"] = ["test 0"]
+
+        return groups, ["Build", "Test"]
+
+    def test_sharding_split(self):
+        """
+        Test that every task runs in exactly one shard and that linked tasks stay together
+        """
+
+        metrics = Metrics()
+        selected = {}
+
+        for index in range(1, 4):
+            groups, groupOrder = self._groups()
+            shard = Shard.parse("%d/3" % index)
+            shard.select(groups, groupOrder, metrics)
+
+            for group in groupOrder:
+                for task in groups[group]["Tasks"]:
+                    assert task["Name"] not in selected
+                    selected[task["Name"]] = index
+
+        assert len(selected) == 8
+
+        # Sequential groups and DependsOn keep their tasks in the same shard
+        #
+        assert selected["build 1"] == selected["build 2"]
+        assert selected["test 0"] == selected["test 5"]
+
+        # Without history every task is expected to take as long, the shards get 3, 3 and 2 tasks
+        #
+        assert sorted(list(selected.values()).count(index) for index in range(1, 4)) == [2, 3, 3]
+
+    def _split(self, count: int, shardHistory: str = None, weights: dict = None):
+        """
+        Shard of each task when the run is split in count shards
+        """
+
+        selected = {}
+        for index in range(1, count + 1):
+            groups, groupOrder = self._groups()
+            for task in groups["Test"]["Tasks"]:
+                if weights and task["Name"] in weights:
+                    task["Weight"] = weights[task["Name"]]
+
+            app.selectShard(types.SimpleNamespace(groups=groups, groupOrder=groupOrder), Shard(index, count), shardHistory)
+            selected.update({task["Name"]: index for group in groupOrder for task in groups[group]["Tasks"]})
+
+        return selected
+
+    def test_sharding_independent_agents(self, tmp_path):
+        """
+        Test that agents with different local histories compute the same split
+        """
+
+        # Each agent recorded other durations in its own history
+        #
+        for agent, durations in [("agent1", [100, 1, 1, 1, 1, 1]), ("agent2", [1, 100, 1, 1, 1, 1])]:
+            history = DurationHistory(str(tmp_path / ("%s.db" % agent)))
+            for index, duration in enumerate(durations):
+                history.record("test %d" % index, "test %d" % index, duration, STATUS_PASS)
+            history.close()
+
+        # Case 1: by default the split only depends on the config, the agents get the same assignment,
+        # while balancing each agent on its own history would not
+        #
+        assert self._split(3) == self._split(3)
+        assert self._split(3, str(tmp_path / "agent1.db")) != self._split(3, str(tmp_path / "agent2.db"))
+
+        # Case 2: the Weight of the tasks balances the shards
+        #
+        selected = self._split(2, weights={"test 1": 7})
+        assert selected["test 1"] != selected["build 1"]
+        assert [task for task, index in selected.items() if index == selected["test 1"]] == ["test 1"]
+
+        # Case 3: a history given to every shard balances them on its durations
+        #
+        shared = str(tmp_path / "agent1.db")
+        assert self._split(3, shared) == self._split(3, shared)
+        assert list(self._split(3, shared).values()).count(self._split(3, shared)["test 0"]) == 2
+
+    def test_sharding_merge(self, tmp_path):
+        """
+        Test the merge of the results files of the shards
+        """
+
+        paths = []
+        for index, status in [(1, STATUS_PASS), (2, STATUS_FAIL)]:
+            groups, groupOrder = self._groups()
+            shard = Shard(index, 3)
+            shard.select(groups, groupOrder, Metrics())
+
+            metrics = Metrics()
+            metrics.addTaskMetrics("[0] task %d" % index, 1, status, task={"Name": "task %d" % index})
+
+            path = str(tmp_path / ("shard-%d.json" % index))
+            ResultsFile.write(path, metrics, status == STATUS_PASS, shard)
+            paths.append(path)
+
+        merged = ResultsFile.merge(paths, str(tmp_path / "merged.json"))
+
+        assert not merged["passed"]
+        assert merged["missingShards"] == [3]
+        assert not merged["planMismatch"]
+        assert [task["name"] for task in ResultsFile.read(str(tmp_path / "merged.json"))["tasks"]] == [
+            "task 1",
+            "task 2",
+        ]
@@ -0,0 +1,57 @@
+import pytest
+
+from scheduler.common.exceptions import InvalidMatrixError
+from scheduler.common.task_matrix import TaskMatrix
+
+
+class TestTaskMatrix:
+    """
+    Test the expansion of the tasks declaring a Matrix
+    """
+
+    def test_task_matrix_expansion(self):
+        """
+        Test the concrete tasks generated for each combination of the values
+        """
+
+        task = {
+            "Name": "test-{python}-{shard}",
+            "Command": "tox -e py{python} -- --shard {shard} | awk '{print $1}'",
+            "DependsOn": "build-{python}",
+            "Group": "Tests",
+            "Matrix": {"python": ["3.9", "3.10"], "shard": "1..2"},
+        }
+
+        # Case 1: one task per combination, in the order of the axes
+        #
+        tasks = list(TaskMatrix.expandAll([task, {"Name": "lint", "Command": "flake8"}]))
+
+        assert [concrete["Name"] for concrete in tasks] == [
+            "test-3.9-1", "test-3.9-2", "test-3.10-1", "test-3.10-2", "lint"
+        ]
+        assert tasks[3]["Command"] == "tox -e py3.10 -- --shard 2 | awk '{print $1}'"
+        assert tasks[3]["DependsOn"] == ["build-3.10"]
+        assert tasks[3]["Group"] == "Tests"
+        assert "Matrix" not in tasks[3]
+
+        # Case 2: the tasks are generated one at a time
+        #
+        generator = TaskMatrix.expand(dict(task, Matrix={"python": ["3.9"], "shard": "1..1000000"}))
+        assert next(generator)["Name"] == "test-3.9-1"
+
+        # Case 3: the Name must tell the tasks apart
+        #
+        with pytest.raises(InvalidMatrixError):
+            list(TaskMatrix.expand(dict(task, Name="test-{python}")))
+
+        with pytest.raises(InvalidMatrixError):
+            list(TaskMatrix.expand(dict(task, Matrix={"python": [], "shard": 1})))
+
+        # Case 4: an unquoted decimal is rejected, YAML would have read 3.10 as 3.1
+        #
+        with pytest.raises(InvalidMatrixError):
+            list(TaskMatrix.expand(dict(task, Matrix={"python": [3.9, 3.1], "shard": 1})))
+
+        assert [concrete["Name"] for concrete in TaskMatrix.expand(dict(task, Matrix={"python": "3.10", "shard": 1}))] == [
+            "test-3.10-1"
+        ]
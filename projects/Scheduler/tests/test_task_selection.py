@@ -0,0 +1,47 @@
+import re
+
+import pytest
+
+from scheduler.common.task_selection import TaskSelector
+
+
+class TestTaskSelection:
+    """
+    Test the selection of the tasks of a run
+    """
+
+    def test_task_selection_patterns(self):
+        """
+        Test the tasks selected by names, commands, regular expressions and tags
+        """
+
+        unit = {"Name": "unit", "Command": "pytest tests/unit", "Tags": ["fast"]}
+        lint = {"Name": "lint", "Command": "flake8", "Tags": ["fast", "style"]}
+        build = {"Name": "build", "Command": "make build"}
+        tasks = [unit, lint, build]
+
+        def selected(patterns, tags=None):
+            selector = TaskSelector(patterns, tags)
+            return [task["Name"] for task in tasks if selector.matches(task)]
+
+        # Case 1: all, exact names and exact commands
+        #
+        assert selected(["all"]) == ["unit", "lint", "build"]
+        assert selected(["lint", "make build"]) == ["lint", "build"]
+
+        # Case 2: regular expressions fully match the command, not the name
+        #
+        assert selected(["pytest.*", "make"]) == ["unit"]
+        assert selected(["unit|lint"]) == []
+        assert selected(["(?P<tool>flake8)", "(?P<tool>make) build"]) == ["lint", "build"]
+
+        # Case 3: tags restrict the selection
+        #
+        assert selected(["all"], ["style"]) == ["lint"]
+        assert selected(["unit", "build"], ["fast"]) == ["unit"]
+
+        # Case 4: the pattern which cannot be compiled is reported
+        #
+        with pytest.raises(re.error) as error:
+            TaskSelector(["unit", "pytest.*", "make (build"])
+        assert error.value.pattern == "make (build"
@@ -0,0 +1,56 @@
+from scheduler.common.trace_recorder import TraceRecorder
+
+
+class TestTraceRecorder:
+    """
+    Test the trace events of the timeline of a run
+    """
+
+    def _record(self, trace: TraceRecorder, taskId: int, pid: int, start: float, end: float):
+        """
+        Record a task which ran from start to end on the worker process pid
+        """
+
+        task = {"id": taskId, "Name": "Task %d" % taskId, "Group": "Group"}
+        trace.taskQueued(task)
+        trace.handedOver[id(task)] = trace.startTime + start - 1
+        result = {
+            "name": "[%d] %s" % (taskId, task["Name"]),
+            "status": "Pass",
+            "timing": {
+                "slotStart": trace.startTime + start,
+                "processStart": trace.startTime + start + 1,
+                "processEnd": trace.startTime + end - 1,
+                "slotEnd": trace.startTime + end,
+            },
+            "worker": {"host": "host", "pid": pid},
+        }
+        trace.taskRecorded(task, result)
+
+    def test_trace_recorder_slots(self):
+        """
+        Test the tasks overlapping on one worker process get their own row
+        """
+
+        trace = TraceRecorder()
+        self._record(trace, 0, 100, 10, 20)
+        self._record(trace, 1, 100, 15, 30)
+        self._record(trace, 2, 100, 25, 40)
+        self._record(trace, 3, 200, 10, 20)
+
+        # Tasks skipped by the scheduler are not in the trace
+        #
+        trace.taskRecorded({"id": 4}, {"name": "[4] Task 4", "status": "Skip"})
+
+        events = trace.events()
+        commands = {event["name"]: event for event in events if event["name"].startswith("[")}
+
+        assert len(commands) == 4
+        assert commands["[0] Task 0"]["tid"] == commands["[2] Task 2"]["tid"]
+        assert commands["[1] Task 1"]["tid"] != commands["[0] Task 0"]["tid"]
+        assert commands["[3] Task 3"]["tid"] not in (commands["[0] Task 0"]["tid"], commands["[1] Task 1"]["tid"])
+        assert commands["[0] Task 0"]["ts"] == 11e6 and commands["[0] Task 0"]["dur"] == 8e6
+
+        group = [event for event in events if event["name"] == "Group"][0]
+        assert group["ts"] == 9e6
+        assert [event["ph"] for event in events if event["name"] == "queue wait [0] Task 0"] == ["b", "e"]
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sys
+
+import pytest
+
+try:
+    from _pytest.mark import KeywordMatcher
+    from _pytest.mark.expression import Expression
+except ImportError:
+    KeywordMatcher = None
+    Expression = None
+
+# Cache file of a suite, in the pytest cache folder of the suite which is not part of the sources
+CACHE_FILE_PATH = os.path.join(".pytest_cache", "arcee-collection.json")
+
+# Files outside the suite folder which change what pytest collects in it
+CONFIG_FILE_NAMES = ("conftest.py", "pytest.ini", ".pytest.ini", "pyproject.toml", "tox.ini", "setup.cfg")
+
+# Version of the cache file, an entry with another version is collected again
+CACHE_VERSION = 1
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_files(test_folder_path):
+    """The python files of the suite and the pytest config files above it, which decide what is collected."""
+    paths = []
+    for directory, folders, files in os.walk(test_folder_path):
+        folders[:] = sorted(folder for folder in folders if not folder.startswith('.') and folder != "__pycache__")
+        paths.extend(os.path.join(directory, name) for name in sorted(files) if name.endswith(".py"))
+
+    directory = os.path.dirname(test_folder_path)
+    while True:
+        paths.extend(os.path.join(directory, name) for name in CONFIG_FILE_NAMES
+                     if os.path.isfile(os.path.join(directory, name)))
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+
+    return paths
+
+
+def config_key(collect_args):
+    """The pytest configuration the collection depends on, besides the config files."""
+    return {
+        "pytest": pytest.__version__,
+        "python": sys.version,
+        "args": list(collect_args),
+        "addopts": os.environ.get("PYTEST_ADDOPTS", ""),
+    }
+
+
+class CollectionCache:
+    """
+    Test IDs and keywords of a suite from its last collection, valid while its sources and the pytest
+    configuration do not change. A file is only hashed again when its mtime or size changed.
+    """
+
+    def __init__(self, test_folder_path, collect_args=()):
+        self.test_folder_path = os.path.abspath(test_folder_path)
+        self.cache_file_path = os.path.join(self.test_folder_path, CACHE_FILE_PATH)
+        self.config = config_key(collect_args)
+
+    def fingerprint(self):
+        """The mtime, size and hash of every source file, taken before a collection."""
+        files = {}
+        for path in source_files(self.test_folder_path):
+            stat = os.stat(path)
+            files[path] = [stat.st_mtime_ns, stat.st_size, file_hash(path)]
+        return files
+
+    def load(self):
+        """The cached tests as (test ID, keywords) pairs, None if the suite changed since they were cached."""
+        try:
+            with open(self.cache_file_path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != CACHE_VERSION or entry.get("config") != self.config:
+            return None
+
+        files = entry["files"]
+        current = source_files(self.test_folder_path)
+        if sorted(current) != sorted(files):
+            return None
+
+        touched = False
+        for path in current:
+            mtime, size, digest = files[path]
+            stat = os.stat(path)
+            if (stat.st_mtime_ns, stat.st_size) == (mtime, size):
+                continue
+            if stat.st_size != size or file_hash(path) != digest:
+                return None
+            files[path] = [stat.st_mtime_ns, size, digest]
+            touched = True
+
+        if touched:
+            self.write(entry)
+
+        return entry["tests"]
+
+    def save(self, files, tests):
+        self.write({"version": CACHE_VERSION, "config": self.config, "files": files, "tests": tests})
+
+    def write(self, entry):
+        # A cache which cannot be written only means the next run collects again
+        try:
+            os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+            temporary_path = f"{self.cache_file_path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temporary_path, self.cache_file_path)
+        except OSError as ex:
+            print(f"Could not write the collection cache {self.cache_file_path} - {ex}")
+
+    def test_ids(self, test_filter=None):
+        """The test IDs selected by the -k filter from the cache, None if they have to be collected."""
+        if test_filter is not None and Expression is None:
+            return None
+
+        tests = self.load()
+        if tests is None:
+            return None
+
+        return select(tests, test_filter)
+
+
+def select(tests, test_filter=None):
+    """The IDs of the tests matched by the -k filter, the same way pytest matches it."""
+    if not test_filter or not test_filter.strip():
+        return [test_id for test_id, _ in tests]
+
+    expression = Expression.compile(test_filter.strip())
+    selected = []
+    for test_id, keywords in tests:
+        names = [keyword.lower() for keyword in keywords]
+        if expression.evaluate(lambda subname, **kwargs: any(subname.lower() in name for name in names)):
+            selected.append(test_id)
+
+    return selected
+
+
+def item_keywords(item):
+    """The names a -k filter is matched against for a collected test."""
+    if KeywordMatcher is not None:
+        return sorted(KeywordMatcher.from_item(item)._names)
+
+    return sorted(node.name for node in item.listchain() if not isinstance(node, pytest.Session))
+
+
+class CollectionRecorder:
+    """Pytest plugin keeping the tests of a collection, before the -k filter deselects any, for the cache."""
+
+    def __init__(self):
+        self.tests = None
+        self.failed = False
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.failed = True
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(self, items):
+        self.tests = [[item.nodeid, item_keywords(item)] for item in items]
+
+    def save(self, cache, files):
+        if self.tests is not None and not self.failed:
+            cache.save(files, self.tests)
@@ -0,0 +1,101 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+
+
+def append_result(result, results_file_path=None):
+    """
+    Append one result to the JSON Lines results file, JSONL_FILE_PATH by default. The line is written with
+    a single write on a file opened for appending, so results of concurrent tests and worker processes
+    never interleave and no lock is needed.
+    """
+    results_file_path = results_file_path or os.environ["JSONL_FILE_PATH"]
+    line = (json.dumps(result, separators=(',', ':')) + "\n").encode()
+
+    fd = os.open(results_file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        written = os.write(fd, line)
+    finally:
+        os.close(fd)
+
+    if written != len(line):
+        raise OSError(f"Only {written} of {len(line)} bytes of the result were appended to {results_file_path}")
+
+
+def read_results(results_file_path):
+    """
+    Stream the results of a JSON Lines results file one at a time. A last line without its newline is
+    still being written and is skipped, as are lines which are not valid JSON. A line holding a JSON
+    array, as written by older tests, gives each of its results.
+    """
+    if not os.path.exists(results_file_path):
+        return
+
+    with open(results_file_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n") or not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+
+            if isinstance(result, list):
+                yield from result
+            else:
+                yield result
+
+
+def read_array(json_file_path):
+    """The results of a JSON array file written by tests which still rewrite JSON_FILE_PATH themselves."""
+    try:
+        with open(json_file_path) as f:
+            results = json.load(f)
+    except FileNotFoundError:
+        return []
+    except ValueError as ex:
+        print(f"Ignoring the results of {json_file_path} - {ex}")
+        return []
+
+    return results if isinstance(results, list) else [results]
+
+
+def compact(results_file_path, json_file_path, array_file_paths=()):
+    """
+    Write the results of the JSON Lines file as one JSON array to json_file_path, the format read by the
+    existing consumers, after the results of the JSON arrays in array_file_paths. The lines are streamed,
+    and the array replaces json_file_path only once complete. Return the number of results.
+    """
+    results = []
+    for array_file_path in array_file_paths:
+        results.extend(read_array(array_file_path))
+
+    temporary_path = f"{json_file_path}.{os.getpid()}.tmp"
+    count = 0
+    with open(temporary_path, 'w') as f:
+        f.write("[")
+        for result in itertools.chain(results, read_results(results_file_path)):
+            if count:
+                f.write(", ")
+            json.dump(result, f)
+            count += 1
+        f.write("]")
+
+    os.replace(temporary_path, json_file_path)
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compact a JSON Lines results file into a JSON array.")
+    parser.add_argument("results_file_path", help="Path of the JSON Lines results file.")
+    parser.add_argument("json_file_path", nargs='?', help="Path of the JSON array, next to the results file by default.")
+    parser.add_argument("--keep-existing", action="store_true",
+                        help="Keep the results already in the JSON array, written there by older tests.")
+
+    args = parser.parse_args()
+    json_file_path = args.json_file_path or os.path.splitext(args.results_file_path)[0] + ".json"
+    array_file_paths = [json_file_path] if args.keep_existing else []
+    print(f"Compacted {compact(args.results_file_path, json_file_path, array_file_paths)} results into {json_file_path}")
+    sys.exit(0)
@@ -1,48 +1,109 @@
-import sys
-import yaml
-import os
-import argparse
-from scheduler import app
-
-
-def load_config(config_file):
-    with open(config_file, 'r') as f:
-        return yaml.safe_load(f)
-
-
-def main():
-    parser = argparse.ArgumentParser(description='Test Runner')
-    parser.add_argument('--config', '-c',
-                        default='config.yaml',
-                        help='Path to config file (default: config.yaml)')
-
-    args = parser.parse_args()
-
-    try:
-        print(f"Loading config from '{args.config}'")
-        config = load_config(args.config)
-
-        print("Setting environment variables...")
-        # Set environment variables
-        for key, value in config.get('environment', {}).items():
-            os.environ[key] = str(value)
-
-        # Call Scheduler to run tests
-        print("Starting test execution via Scheduler...")
-        yaml_filename = "test_scheduling.yaml"
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        yaml_filepath = os.path.join(script_dir, yaml_filename)
-        print(f"Using scheduling file at '{yaml_filepath}'")
-        try:
-            app.run(yaml_filepath)
-        except Exception as ex:
-            print(f"Failure occurred during scheduler run - {ex}")
-            sys.exit(1)
-
-    except FileNotFoundError:
-        print(f"Config file '{args.config}' not found!")
-        sys.exit(1)
-
-
-if __name__ == "__main__":
-    main()
+import sys
+import yaml
+import os
+import argparse
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from scheduler import app
+
+# Seconds to wait for the pytest daemon to listen on its socket
+PYTEST_DAEMON_START_TIMEOUT_SECONDS = 60
+
+
+def load_config(config_file):
+    with open(config_file, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def start_pytest_daemon(daemon_config, script_dir):
+    if not daemon_config.get('enabled', False):
+        return None
+
+    if not hasattr(os, 'fork'):
+        print("pytest daemon needs fork, running the suites without it")
+        return None
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix='pytest-daemon-'), 'daemon.sock')
+    python = 'python' if getattr(sys, 'frozen', False) else sys.executable
+    command = [python, os.path.join(script_dir, 'pytest_daemon.py'), '--socket', socket_path]
+    preload = daemon_config.get('preload', [])
+    if preload:
+        command += ['--preload'] + [str(module) for module in preload]
+
+    print(f"Starting pytest daemon on '{socket_path}'")
+    process = subprocess.Popen(command, cwd=script_dir)
+
+    deadline = time.time() + PYTEST_DAEMON_START_TIMEOUT_SECONDS
+    while time.time() < deadline and process.poll() is None:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(socket_path)
+            os.environ['PYTEST_DAEMON_SOCKET'] = socket_path
+            return process
+        except OSError:
+            time.sleep(0.1)
+
+    print("pytest daemon did not start, running the suites without it")
+    os.environ['PYTEST_DAEMON_SOCKET'] = socket_path
+    stop_pytest_daemon(process)
+    return None
+
+
+def stop_pytest_daemon(process):
+    if process is None:
+        return
+
+    socket_path = os.environ.pop('PYTEST_DAEMON_SOCKET', None)
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+    if socket_path:
+        shutil.rmtree(os.path.dirname(socket_path), ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test Runner')
+    parser.add_argument('--config', '-c',
+                        default='config.yaml',
+                        help='Path to config file (default: config.yaml)')
+
+    args = parser.parse_args()
+
+    try:
+        print(f"Loading config from '{args.config}'")
+        config = load_config(args.config)
+
+        print("Setting environment variables...")
+        # Set environment variables
+        for key, value in config.get('environment', {}).items():
+            os.environ[key] = str(value)
+
+        # Call Scheduler to run tests
+        print("Starting test execution via Scheduler...")
+        yaml_filename = "test_scheduling.yaml"
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        yaml_filepath = os.path.join(script_dir, yaml_filename)
+        print(f"Using scheduling file at '{yaml_filepath}'")
+        daemon = start_pytest_daemon(config.get('pytest_daemon', {}), script_dir)
+        try:
+            app.run(yaml_filepath)
+        except Exception as ex:
+            print(f"Failure occurred during scheduler run - {ex}")
+            sys.exit(1)
+        finally:
+            stop_pytest_daemon(daemon)
+
+    except FileNotFoundError:
+        print(f"Config file '{args.config}' not found!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+# Counters of a testsuite, in the order they are written
+TOTALS = ("tests", "failures", "errors", "skipped")
+
+# Folder next to the combined report keeping the merged suites of each junit xml between merges
+PARTS_SUFFIX = ".parts"
+
+
+def empty_totals():
+    return {"tests": 0, "failures": 0, "errors": 0, "skipped": 0, "time": 0.0}
+
+
+def add_totals(totals, other):
+    for key in totals:
+        totals[key] += other[key]
+
+
+def totals_attributes(totals):
+    attributes = " ".join(f"{key}=\"{totals[key]}\"" for key in TOTALS)
+    return f"{attributes} time=\"{totals['time']:.3f}\""
+
+
+def testcase_totals(testcase):
+    totals = empty_totals()
+    totals["tests"] = 1
+    for child in testcase:
+        if child.tag == "failure":
+            totals["failures"] = 1
+        elif child.tag == "error":
+            totals["errors"] = 1
+        elif child.tag == "skipped":
+            totals["skipped"] = 1
+    try:
+        totals["time"] = float(testcase.get("time", 0))
+    except ValueError:
+        pass
+    return totals
+
+
+def write_suite(part, name, attributes, body_path, totals):
+    """Write one testsuite to the part, its totals are the ones of the testcases streamed into body_path."""
+    other = "".join(f" {key}={quoteattr(value)}" for key, value in attributes.items()
+                    if key not in TOTALS and key not in ("name", "time"))
+    part.write(f"<testsuite name={quoteattr(name)} {totals_attributes(totals)}{other}>")
+    with open(body_path, encoding="utf-8") as body:
+        shutil.copyfileobj(body, part)
+    part.write("</testsuite>\n")
+
+
+def merge_file(xml_file_path, part_path):
+    """
+    Stream the testsuites of a junit xml into part_path, one element at a time, and return their totals.
+    Raise ET.ParseError if the file is incomplete, the part is then left as it was.
+    """
+    totals = empty_totals()
+    body_path = f"{part_path}.body"
+    temporary_path = f"{part_path}.tmp"
+    suite = None
+    body = None
+
+    try:
+        with open(temporary_path, 'w', encoding="utf-8") as part:
+            stack = []
+            for event, element in ET.iterparse(xml_file_path, events=("start", "end")):
+                if event == "start":
+                    stack.append(element)
+                    if element.tag == "testsuite" and suite is None:
+                        suite = element
+                        suite_depth = len(stack)
+                        suite_totals = empty_totals()
+                        body = open(body_path, 'w', encoding="utf-8")
+                    continue
+
+                stack.pop()
+                if suite is None:
+                    continue
+
+                if element is suite:
+                    body.close()
+                    write_suite(part, suite.get("name", os.path.basename(xml_file_path)), suite.attrib, body_path, suite_totals)
+                    add_totals(totals, suite_totals)
+                    suite = None
+                    element.clear()
+                    if stack:
+                        stack[-1].remove(element)
+                elif len(stack) == suite_depth:
+                    # A testcase, or the properties and output of the suite, written out and dropped
+                    if element.tag == "testcase":
+                        add_totals(suite_totals, testcase_totals(element))
+                    element.tail = None
+                    body.write(ET.tostring(element, encoding="unicode"))
+                    suite.remove(element)
+
+        os.replace(temporary_path, part_path)
+    finally:
+        if body is not None:
+            body.close()
+        for path in (body_path, temporary_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return totals
+
+
+def find_reports(paths, output_path):
+    """The junit xml files under the paths, without the combined report, its parts and the hidden folders of sharded runs."""
+    parts_path = os.path.abspath(output_path) + PARTS_SUFFIX
+    reports = []
+    for path in paths:
+        if os.path.isfile(path):
+            reports.append(os.path.abspath(path))
+            continue
+
+        for directory, folders, files in os.walk(path):
+            folders[:] = [folder for folder in folders
+                          if not folder.startswith('.') and os.path.abspath(os.path.join(directory, folder)) != parts_path]
+            reports.extend(os.path.abspath(os.path.join(directory, name)) for name in files if name.endswith(".xml"))
+
+    return sorted(report for report in set(reports) if report != os.path.abspath(output_path))
+
+
+class JunitMerger:
+    """
+    Merge junit xml files into one report in constant memory. The testsuites of each file are streamed
+    into a part kept next to the report, and a part is only merged again when its file changed, so the
+    merge can be repeated while the suites are still writing their reports.
+    """
+
+    def __init__(self, paths, output_path, suites_name="arcee_e2e"):
+        self.paths = paths
+        self.output_path = os.path.abspath(output_path)
+        self.suites_name = suites_name
+        self.parts_path = self.output_path + PARTS_SUFFIX
+        self.manifest_path = os.path.join(self.parts_path, "manifest.json")
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        temporary_path = f"{self.manifest_path}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(temporary_path, self.manifest_path)
+
+    def update_parts(self):
+        """Merge the files which changed since the last merge, return the number of files merged."""
+        os.makedirs(self.parts_path, exist_ok=True)
+        reports = find_reports(self.paths, self.output_path)
+        merged = 0
+
+        for report in set(self.manifest) - set(reports):
+            part_path = os.path.join(self.parts_path, self.manifest.pop(report)["part"])
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        for report in reports:
+            try:
+                stat = os.stat(report)
+            except OSError:
+                continue
+
+            entry = self.manifest.get(report)
+            if entry and (entry["mtime"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                continue
+
+            part = hashlib.sha1(report.encode()).hexdigest() + ".xml"
+            try:
+                totals = merge_file(report, os.path.join(self.parts_path, part))
+            except ET.ParseError:
+                # Still being written, merged once complete
+                continue
+
+            self.manifest[report] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "part": part, "totals": totals}
+            merged += 1
+
+        self.save_manifest()
+        return merged
+
+    def write_report(self):
+        """Write the combined report from the parts, it replaces the previous report once complete."""
+        totals = empty_totals()
+        for entry in self.manifest.values():
+            add_totals(totals, entry["totals"])
+
+        temporary_path = f"{self.output_path}.tmp"
+        with open(temporary_path, 'w', encoding="utf-8") as report:
+            report.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            report.write(f"<testsuites name={quoteattr(self.suites_name)} {totals_attributes(totals)}>\n")
+            for xml_file_path in sorted(self.manifest):
+                with open(os.path.join(self.parts_path, self.manifest[xml_file_path]["part"]), encoding="utf-8") as part:
+                    shutil.copyfileobj(part, report)
+            report.write("</testsuites>\n")
+
+        os.replace(temporary_path, self.output_path)
+        return totals
+
+    def merge(self):
+        merged = self.update_parts()
+        totals = self.write_report()
+        print(f"Merged {merged} changed of {len(self.manifest)} reports into {self.output_path} - "
+              f"{totals['tests']} tests, {totals['failures']} failures, {totals['errors']} errors, {totals['skipped']} skipped")
+        sys.stdout.flush()
+        return totals
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge junit xml reports into one report with per-suite totals.")
+    parser.add_argument("paths", nargs="+", help="Junit xml files, or folders searched for them.")
+    parser.add_argument("--output", "-o", required=True, help="Path of the combined report.")
+    parser.add_argument("--name", default="arcee_e2e", help="Name of the combined report.")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="Merge again every SECONDS until stopped, for reports still being written.")
+    parser.add_argument("--wait-pid", type=int, help="With --watch, stop once this process, such as the scheduler, exits.")
+
+    args = parser.parse_args()
+    merger = JunitMerger(args.paths, args.output, args.name)
+    merger.merge()
+
+    if args.watch:
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        try:
+            while not stopping and (args.wait_pid is None or process_exists(args.wait_pid)):
+                time.sleep(args.watch)
+                merger.merge()
+        except KeyboardInterrupt:
+            pass
+        # The reports written since the last merge
+        merger.merge()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
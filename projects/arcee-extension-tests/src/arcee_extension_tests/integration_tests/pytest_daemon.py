@@ -0,0 +1,217 @@
+import argparse
+import importlib
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import traceback
+
+import pytest
+
+from run_tests import run_tests
+
+# Seconds between two checks for finished suites while no request comes in
+REAP_INTERVAL_SECONDS = 1
+
+
+def preload_modules(modules):
+    """Import pytest plugins and the shared test dependencies once, every forked suite inherits them."""
+    try:
+        from importlib.metadata import entry_points
+        plugins = entry_points()
+        plugins = plugins.select(group="pytest11") if hasattr(plugins, "select") else plugins.get("pytest11", [])
+        for plugin in plugins:
+            try:
+                plugin.load()
+            except Exception as ex:
+                print(f"Could not preload pytest plugin {plugin.name} - {ex}")
+    except ImportError:
+        pass
+
+    for module in modules:
+        try:
+            importlib.import_module(module)
+            print(f"Preloaded {module}")
+        except Exception as ex:
+            print(f"Could not preload {module} - {ex}")
+
+
+def run_request(connection, request):
+    """Run one suite in the forked child, the same way run_tests.py does, and reply with its result."""
+    # The suite and everything it starts can be stopped together if its client goes away
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    result = 1
+    try:
+        os.environ.clear()
+        os.environ.update(request["environment"])
+        os.chdir(request["cwd"])
+        result = int(run_tests(request["test_folder_path"], request.get("test_filter"), request.get("workers", 1)))
+    except BaseException:
+        traceback.print_exc(file=sys.__stderr__)
+    finally:
+        # run_tests leaves sys.stdout on the log file of the suite, which it already closed
+        sys.__stdout__.flush()
+        sys.__stderr__.flush()
+        try:
+            connection.sendall((json.dumps({"returncode": result}) + "\n").encode())
+        except Exception:
+            pass
+        os._exit(result & 0xff)
+
+
+def serve(socket_path, modules):
+    """Serve suite requests on the Unix socket until SIGTERM or SIGINT, one forked child per request."""
+    preload_modules(modules)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(64)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+
+    # Forked children by the connection of their client
+    children = {}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"pytest daemon {os.getpid()} listening on {socket_path}")
+    sys.stdout.flush()
+
+    try:
+        while not stopping:
+            for key, _ in selector.select(timeout=REAP_INTERVAL_SECONDS):
+                if key.fileobj is server:
+                    accept_request(server, selector, children)
+                else:
+                    # The client only closes its connection, once it has the result or when it is stopped
+                    client_gone(key.fileobj, selector, children)
+
+            reap_children()
+    finally:
+        for connection, pid in children.items():
+            stop_child(pid)
+            connection.close()
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def accept_request(server, selector, children):
+    connection, _ = server.accept()
+    try:
+        line = read_line(connection)
+        if not line:
+            # Only checking the daemon is listening
+            connection.close()
+            return
+        request = json.loads(line)
+    except (OSError, ValueError) as ex:
+        print(f"Invalid request - {ex}")
+        connection.close()
+        return
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        # The suite only keeps the connection of its own client
+        selector.close()
+        server.close()
+        for other in children:
+            other.close()
+        run_request(connection, request)
+
+    # Also set in the parent, the group exists before the daemon may have to kill it
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+
+    print(f"Running {request['test_folder_path']} in child {pid}")
+    sys.stdout.flush()
+    children[connection] = pid
+    selector.register(connection, selectors.EVENT_READ)
+
+
+def client_gone(connection, selector, children):
+    selector.unregister(connection)
+    pid = children.pop(connection)
+    connection.close()
+    stop_child(pid)
+
+
+def stop_child(pid):
+    """Stop the process group of a suite whose client went away, nothing is left if the suite already finished."""
+    try:
+        if os.waitpid(pid, os.WNOHANG) == (0, 0):
+            os.killpg(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+    except (ChildProcessError, ProcessLookupError):
+        pass
+
+
+def reap_children():
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0] > 0:
+            pass
+    except ChildProcessError:
+        pass
+
+
+def read_line(connection):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode()
+
+
+def request_run(socket_path, test_folder_path, test_filter=None, workers=1):
+    """Run a suite in the daemon listening on socket_path and return its exit code, None if no daemon answers."""
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+    except OSError as ex:
+        print(f"pytest daemon not reachable on {socket_path} - {ex}")
+        return None
+
+    request = {
+        "test_folder_path": test_folder_path,
+        "test_filter": test_filter,
+        "workers": workers,
+        "cwd": os.getcwd(),
+        "environment": dict(os.environ),
+    }
+
+    with client:
+        client.sendall((json.dumps(request) + "\n").encode())
+        reply = read_line(client)
+
+    if not reply:
+        print("pytest daemon closed the connection without a result")
+        return 1
+
+    return json.loads(reply)["returncode"]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Preloaded pytest daemon forking a child per test suite.")
+    parser.add_argument("--socket", required=True, help="Path of the Unix socket to listen on.")
+    parser.add_argument("--preload", nargs="*", default=[], help="Modules to import once for all the suites.")
+
+    args = parser.parse_args()
+    serve(args.socket, args.preload)
@@ -1,75 +1,120 @@
-import json
-import sys
-import pytest
-import os
-import argparse
-
-def run_tests(test_folder_path: str, test_filter: str = None):
-    absolute_path = os.path.abspath(test_folder_path)
-    suite_name = os.path.basename(test_folder_path)
-    logging_name = f"test_{suite_name}"
-    
-    if test_filter is not None:
-        logging_name = f"{test_filter}"
-    
-    result_path = os.path.join(os.getcwd(), os.environ["TEST_RESULT_DIRECTORY"], "arcee_e2e", suite_name)
-    
-    log_file_path = os.path.join(result_path, f"{logging_name}.txt")
-    json_file_path = os.path.join(result_path, f"{logging_name}.json")
-    
-    print(f"result_path: {result_path}")
-    print(f"log_file_path: {log_file_path}")
-    print(f"result_path exists: {os.path.exists(result_path)}")
-    print(f"Current working directory: {os.getcwd()}")
-
-    # Create the file if it doesn't exist
-    os.makedirs(result_path, exist_ok=True)
-    
-    # Open the file in write mode to create it
-    with open(log_file_path, 'w') as f:
-        pass  # No content needed, just creating the file
-    
-    with open(json_file_path, 'w') as f:
-        json.dump([], f)
-    
-    pytest_args = [
-        '-rpP', 
-        '-v', 
-        f'--log-file={os.path.join(result_path, f"{logging_name}.log")}',
-        f'--junitxml={os.path.join(result_path, f"{logging_name}.xml")}',
-        '-o',
-        f'junit_suite_name={suite_name}',  
-        '-o',
-        f'junit_family=xunit1',
-        '--capture=no',
-    ]
-
-    if test_filter is not None:
-        pytest_args.append('-k')
-        pytest_args.append(f'{test_filter}')
-    
-    current_directory = os.getcwd()
-    os.environ["SUITENAME"] = suite_name
-    os.environ["JSON_FILE_PATH"] = json_file_path
-    os.chdir(absolute_path)
-
-    with open(log_file_path, 'w') as f:
-        sys.stdout = f
-        sys.stderr = f
-        
-        # Run pytest, now output will go to the file
-        result = pytest.main(pytest_args)
-    
-    os.chdir(current_directory)
-    # Checking the return code to determine the result of the test run
-    return result
-
-# Run the tests
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Run tests using pytest.")
-    parser.add_argument("--test-folder-path", required=True, help="Path to the folder containing the test files.")
-    parser.add_argument("--test-filter", required=False, help="Filter to run specific tests.")
-    
-    args = parser.parse_args()
-    result = run_tests(args.test_folder_path, args.test_filter)
-    sys.exit(result)
+import json
+import sys
+import pytest
+import os
+import argparse
+from collection_cache import CollectionCache, CollectionRecorder
+from json_results import compact
+from sharding import run_sharded
+
+def run_tests(test_folder_path: str, test_filter: str = None, workers: int = 1):
+    absolute_path = os.path.abspath(test_folder_path)
+    suite_name = os.path.basename(test_folder_path)
+    logging_name = f"test_{suite_name}"
+    
+    if test_filter is not None:
+        logging_name = f"{test_filter}"
+    
+    result_path = os.path.join(os.getcwd(), os.environ["TEST_RESULT_DIRECTORY"], "arcee_e2e", suite_name)
+    
+    log_file_path = os.path.join(result_path, f"{logging_name}.txt")
+    json_file_path = os.path.join(result_path, f"{logging_name}.json")
+    results_file_path = os.path.join(result_path, f"{logging_name}.jsonl")
+    
+    print(f"result_path: {result_path}")
+    print(f"log_file_path: {log_file_path}")
+    print(f"result_path exists: {os.path.exists(result_path)}")
+    print(f"Current working directory: {os.getcwd()}")
+
+    # Create the file if it doesn't exist
+    os.makedirs(result_path, exist_ok=True)
+    
+    # Open the file in write mode to create it
+    with open(log_file_path, 'w') as f:
+        pass  # No content needed, just creating the file
+    
+    with open(json_file_path, 'w') as f:
+        json.dump([], f)
+
+    # Tests append their results as JSON Lines, compacted into the json array once the suite finished
+    with open(results_file_path, 'w') as f:
+        pass
+    
+    pytest_args = [
+        '-rpP', 
+        '-v', 
+        f'--log-file={os.path.join(result_path, f"{logging_name}.log")}',
+        f'--junitxml={os.path.join(result_path, f"{logging_name}.xml")}',
+        '-o',
+        f'junit_suite_name={suite_name}',  
+        '-o',
+        f'junit_family=xunit1',
+        '--capture=no',
+    ]
+
+    filter_args = []
+    if test_filter is not None:
+        filter_args.append('-k')
+        filter_args.append(f'{test_filter}')
+    
+    current_directory = os.getcwd()
+    os.environ["SUITENAME"] = suite_name
+    os.environ["JSON_FILE_PATH"] = json_file_path
+    os.environ["JSONL_FILE_PATH"] = results_file_path
+
+    # Tests of the suite from its last collection, when its sources did not change since
+    cache = CollectionCache(absolute_path)
+    test_ids = cache.test_ids(test_filter)
+
+    # Split a large suite into chunks of tests run at the same time
+    if workers > 1:
+        result = run_sharded(absolute_path, result_path, logging_name, pytest_args, filter_args, workers, test_ids)
+        if result is not None:
+            compact(results_file_path, json_file_path, [json_file_path])
+            return result
+
+    recorder = CollectionRecorder()
+    files = None
+    if test_filter is not None and test_ids:
+        # Only the modules of the selected tests are imported
+        pytest_args.extend(test_ids)
+    else:
+        pytest_args.extend(filter_args)
+    if test_ids is None:
+        files = cache.fingerprint()
+    os.chdir(absolute_path)
+
+    with open(log_file_path, 'w') as f:
+        sys.stdout = f
+        sys.stderr = f
+        
+        # Run pytest, now output will go to the file
+        result = pytest.main(pytest_args, plugins=[recorder])
+    
+    os.chdir(current_directory)
+    if files is not None:
+        recorder.save(cache, files)
+    compact(results_file_path, json_file_path, [json_file_path])
+    # Checking the return code to determine the result of the test run
+    return result
+
+# Run the tests
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run tests using pytest.")
+    parser.add_argument("--test-folder-path", required=True, help="Path to the folder containing the test files.")
+    parser.add_argument("--test-filter", required=False, help="Filter to run specific tests.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("PYTEST_WORKERS", 1)),
+                        help="Number of worker processes running chunks of the suite at the same time.")
+    
+    args = parser.parse_args()
+
+    # Fork the suite from the warm pytest daemon when one is running, in this process otherwise
+    result = None
+    socket_path = os.environ.get("PYTEST_DAEMON_SOCKET")
+    if socket_path:
+        from pytest_daemon import request_run
+        result = request_run(socket_path, args.test_folder_path, args.test_filter, args.workers)
+
+    if result is None:
+        result = run_tests(args.test_folder_path, args.test_filter, args.workers)
+    sys.exit(result)
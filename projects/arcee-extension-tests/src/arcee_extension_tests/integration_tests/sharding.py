@@ -0,0 +1,252 @@
+import heapq
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from collection_cache import CollectionCache, CollectionRecorder
+
+# Seconds assumed for a test without a past timing when no test of the suite has one
+DEFAULT_TEST_DURATION_SECONDS = 1.0
+
+# Folder of the results of the chunks, under the result path of the suite
+CHUNKS_FOLDER = ".chunks"
+
+
+class TestIdCollector:
+    def __init__(self):
+        self.test_ids = []
+
+    def pytest_collection_finish(self, session):
+        self.test_ids = [item.nodeid for item in session.items]
+
+
+def collect_test_ids(test_folder_path, pytest_args, output_path, connection):
+    """Collect the test IDs of the suite in a worker process, the suite modules are not imported by run_tests."""
+    collector = TestIdCollector()
+    recorder = CollectionRecorder()
+    cache = CollectionCache(test_folder_path)
+    files = cache.fingerprint()
+    with open(output_path, 'a') as f:
+        sys.stdout = f
+        sys.stderr = f
+        os.chdir(test_folder_path)
+        result = pytest.main(pytest_args + ['--collect-only', '-q'], plugins=[collector, recorder])
+
+    recorder.save(cache, files)
+    connection.send((int(result), collector.test_ids))
+
+
+def junit_key(test_id):
+    """The classname and name pytest writes in the junit xml for a test ID."""
+    path, bracket, params = test_id.partition("[")
+    names = path.split("::")
+    names[0] = re.sub(r"\.py$", "", names[0].replace("/", "."))
+    names[-1] += bracket + params
+    return ".".join(names[:-1]), names[-1]
+
+
+def read_durations(xml_file_path):
+    """The durations of the tests in the junit xml of a previous run, by classname and name."""
+    durations = {}
+    if not os.path.exists(xml_file_path):
+        return durations
+
+    try:
+        for _, element in ET.iterparse(xml_file_path):
+            if element.tag == "testcase":
+                try:
+                    durations[(element.get("classname", ""), element.get("name", ""))] = float(element.get("time", 0))
+                except ValueError:
+                    pass
+                element.clear()
+    except ET.ParseError as ex:
+        print(f"Ignoring the timings of {xml_file_path} - {ex}")
+
+    return durations
+
+
+def split_test_ids(test_ids, durations, chunk_count):
+    """
+    Split the test IDs into chunk_count chunks of about the same total duration, the longest tests first
+    onto the least loaded chunk. Tests without a past timing count as the average test of the suite.
+    """
+    known = [durations[junit_key(test_id)] for test_id in test_ids if junit_key(test_id) in durations]
+    default_duration = sum(known) / len(known) if known else DEFAULT_TEST_DURATION_SECONDS
+
+    order = {test_id: index for index, test_id in enumerate(test_ids)}
+    by_duration = sorted(test_ids, key=lambda test_id: durations.get(junit_key(test_id), default_duration), reverse=True)
+
+    loads = [(0.0, index) for index in range(min(chunk_count, len(test_ids)))]
+    chunks = [[] for _ in loads]
+    for test_id in by_duration:
+        load, index = heapq.heappop(loads)
+        chunks[index].append(test_id)
+        heapq.heappush(loads, (load + durations.get(junit_key(test_id), default_duration), index))
+
+    # Keep the collection order inside a chunk, tests of a module keep sharing their fixtures
+    return [sorted(chunk, key=order.get) for chunk in chunks]
+
+
+def run_chunk(test_folder_path, pytest_args, test_ids, environment, output_path):
+    """Run a chunk of the suite in a worker process, its output goes to output_path."""
+    os.environ.update(environment)
+    with open(output_path, 'w') as f:
+        sys.stdout = f
+        sys.stderr = f
+        os.chdir(test_folder_path)
+        result = pytest.main(pytest_args + test_ids)
+
+    sys.exit(int(result))
+
+
+def merge_xml(chunk_xml_paths, xml_file_path, elapsed):
+    """Merge the junit xml of the chunks into one testsuite, the time of the suite is the time of the sharded run."""
+    merged_root = None
+    merged_suite = None
+    totals = {"tests": 0, "errors": 0, "failures": 0, "skipped": 0}
+
+    for chunk_xml_path in chunk_xml_paths:
+        if not os.path.exists(chunk_xml_path):
+            continue
+
+        root = ET.parse(chunk_xml_path).getroot()
+        suite = root if root.tag == "testsuite" else root.find("testsuite")
+        if suite is None:
+            continue
+
+        for key in totals:
+            totals[key] += int(suite.get(key, 0))
+
+        if merged_suite is None:
+            merged_root, merged_suite = root, suite
+        else:
+            merged_suite.extend(list(suite))
+
+    if merged_suite is None:
+        return
+
+    for key, value in totals.items():
+        merged_suite.set(key, str(value))
+    merged_suite.set("time", "%.3f" % elapsed)
+
+    ET.ElementTree(merged_root).write(xml_file_path, encoding="utf-8", xml_declaration=True)
+
+
+def merge_json(chunk_json_paths, json_file_path):
+    results = []
+    for chunk_json_path in chunk_json_paths:
+        try:
+            with open(chunk_json_path) as f:
+                results.extend(json.load(f))
+        except (OSError, ValueError) as ex:
+            print(f"Ignoring the results of {chunk_json_path} - {ex}")
+
+    with open(json_file_path, 'w') as f:
+        json.dump(results, f)
+
+
+def append_files(paths, target_path, mode='a', header=None):
+    with open(target_path, mode) as target:
+        for index, path in enumerate(paths):
+            if not os.path.exists(path):
+                continue
+            if header:
+                target.write(header.format(index=index))
+            with open(path) as source:
+                shutil.copyfileobj(source, target)
+
+
+def merge_results(chunk_results):
+    """The exit code of the suite from the exit codes of its chunks."""
+    # A chunk killed by a signal has a negative exit code
+    chunk_results = [result if result >= 0 else int(pytest.ExitCode.INTERNAL_ERROR) for result in chunk_results]
+
+    if any(result == pytest.ExitCode.TESTS_FAILED for result in chunk_results):
+        return int(pytest.ExitCode.TESTS_FAILED)
+
+    errors = [result for result in chunk_results if result not in (pytest.ExitCode.OK, pytest.ExitCode.NO_TESTS_COLLECTED)]
+    if errors:
+        return max(errors)
+
+    if all(result == pytest.ExitCode.NO_TESTS_COLLECTED for result in chunk_results):
+        return int(pytest.ExitCode.NO_TESTS_COLLECTED)
+
+    return int(pytest.ExitCode.OK)
+
+
+def run_sharded(test_folder_path, result_path, logging_name, pytest_args, filter_args, workers, test_ids=None):
+    """
+    Run the suite in up to workers concurrent chunks balanced on the timings of its previous run, and merge
+    their results into the files run_tests writes. The test IDs are collected unless they are given.
+    Return None when the suite is better run in one process.
+    """
+    log_file_path = os.path.join(result_path, f"{logging_name}.txt")
+    xml_file_path = os.path.join(result_path, f"{logging_name}.xml")
+    json_file_path = os.path.join(result_path, f"{logging_name}.json")
+
+    context = multiprocessing.get_context()
+    if test_ids is not None:
+        collect_result = pytest.ExitCode.OK
+        print(f"Using the cached collection of {len(test_ids)} tests")
+    else:
+        reader, writer = context.Pipe(duplex=False)
+        collector = context.Process(target=collect_test_ids, args=(test_folder_path, filter_args, log_file_path, writer))
+        collector.start()
+        writer.close()
+        try:
+            collect_result, test_ids = reader.recv()
+        except EOFError:
+            collect_result, test_ids = pytest.ExitCode.INTERNAL_ERROR, []
+        finally:
+            collector.join()
+
+    if collect_result != pytest.ExitCode.OK or len(test_ids) < 2:
+        return None
+
+    chunks = split_test_ids(test_ids, read_durations(xml_file_path), workers)
+    print(f"Running {len(test_ids)} tests in {len(chunks)} chunks")
+
+    chunks_path = os.path.join(result_path, CHUNKS_FOLDER)
+    shutil.rmtree(chunks_path, ignore_errors=True)
+
+    start = time.time()
+    processes = []
+    for index, chunk in enumerate(chunks):
+        chunk_path = os.path.join(chunks_path, str(index))
+        os.makedirs(chunk_path)
+        with open(os.path.join(chunk_path, f"{logging_name}.json"), 'w') as f:
+            json.dump([], f)
+
+        chunk_args = [
+            '--log-file=' + os.path.join(chunk_path, f"{logging_name}.log") if arg.startswith('--log-file=') else
+            '--junitxml=' + os.path.join(chunk_path, f"{logging_name}.xml") if arg.startswith('--junitxml=') else arg
+            for arg in pytest_args
+        ]
+        # The chunks append their results to the JSON Lines file of the suite in JSONL_FILE_PATH, tests
+        # rewriting the json array themselves get an array per chunk
+        environment = {"JSON_FILE_PATH": os.path.join(chunk_path, f"{logging_name}.json")}
+        process = context.Process(
+            target=run_chunk,
+            args=(test_folder_path, chunk_args, chunk, environment, os.path.join(chunk_path, f"{logging_name}.txt")))
+        process.start()
+        processes.append(process)
+
+    for process in processes:
+        process.join()
+    elapsed = time.time() - start
+
+    chunk_paths = [os.path.join(chunks_path, str(index), logging_name) for index in range(len(chunks))]
+    merge_xml([f"{path}.xml" for path in chunk_paths], xml_file_path, elapsed)
+    merge_json([f"{path}.json" for path in chunk_paths], json_file_path)
+    append_files([f"{path}.log" for path in chunk_paths], os.path.join(result_path, f"{logging_name}.log"), mode='w')
+    append_files([f"{path}.txt" for path in chunk_paths], log_file_path, header="\n===== chunk {index} =====\n")
+    shutil.rmtree(chunks_path, ignore_errors=True)
+
+    return merge_results([process.exitcode for process in processes])
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The integration test modules import each other by name, as they run as scripts from their folder
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(curr_dir, os.pardir, "src", "arcee_extension_tests", "integration_tests"))
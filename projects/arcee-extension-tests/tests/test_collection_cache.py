@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from collection_cache import CollectionCache, CollectionRecorder, select
+
+SUITE = '''
+import pytest
+
+
+class TestAlpha:
+    def test_one(self):
+        pass
+
+    @pytest.mark.slow
+    def test_two(self):
+        pass
+
+
+@pytest.mark.parametrize("value", ["x", "y"])
+def test_beta(value):
+    pass
+'''
+
+
+class Selection:
+    def __init__(self):
+        self.test_ids = []
+
+    def pytest_collection_finish(self, session):
+        self.test_ids = [item.nodeid for item in session.items]
+
+
+def collect(suite_path, *args, plugins=()):
+    """The test IDs pytest collects in the suite, the suite module is imported apart from the other runs."""
+    selection = Selection()
+    current_directory = os.getcwd()
+    os.chdir(suite_path)
+    try:
+        pytest.main(["--collect-only", "-q", "-p", "no:cacheprovider", "--import-mode=importlib", *args],
+                    plugins=[selection, *plugins])
+    finally:
+        os.chdir(current_directory)
+    return selection.test_ids
+
+
+@pytest.fixture
+def suite_path(tmp_path):
+    suite_path = tmp_path / "cached_suite"
+    suite_path.mkdir()
+    (suite_path / "test_cached_suite.py").write_text(SUITE)
+    return suite_path
+
+
+class TestCollectionCache:
+    """
+    Test the collected tests of a suite cached between runs
+    """
+
+    def test_collection_cache_invalidation(self, suite_path):
+        """
+        Test the cache is kept when a file is only touched and dropped when its content changes
+        """
+
+        cache = CollectionCache(str(suite_path))
+        test_file_path = suite_path / "test_cached_suite.py"
+        tests = [["test_cached_suite.py::test_a", ["test_a"]]]
+        cache.save(cache.fingerprint(), tests)
+
+        # Case 1: nothing changed
+        #
+        assert cache.load() == tests
+
+        # Case 2: a touched file is hashed again and the cache kept, with the new mtime
+        #
+        stat = os.stat(test_file_path)
+        os.utime(test_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert cache.load() == tests
+        assert CollectionCache(str(suite_path)).load() == tests
+
+        # Case 3: another pytest configuration
+        #
+        assert CollectionCache(str(suite_path), ["-m", "slow"]).load() is None
+
+        # Case 4: a change of content with the same size
+        #
+        test_file_path.write_text(SUITE.replace("test_one", "test_uno"))
+        assert cache.load() is None
+
+        # Case 5: a new file
+        #
+        cache.save(cache.fingerprint(), tests)
+        (suite_path / "conftest.py").write_text("")
+        assert cache.load() is None
+
+    @pytest.mark.parametrize("test_filter", ["", "alpha", "not alpha", "slow", "x", "Alpha and two", "beta or one", "TWO"])
+    def test_collection_cache_select(self, suite_path, test_filter):
+        """
+        Test the tests selected from the cache are the ones pytest -k selects
+        """
+
+        recorder = CollectionRecorder()
+        cache = CollectionCache(str(suite_path))
+        files = cache.fingerprint()
+        collect(suite_path, plugins=[recorder])
+        recorder.save(cache, files)
+
+        assert cache.test_ids(test_filter) == select(recorder.tests, test_filter)
+        assert select(recorder.tests, test_filter) == collect(suite_path, "-k", test_filter)
@@ -0,0 +1,76 @@
+import json
+import multiprocessing
+
+from json_results import append_result, compact, read_results
+
+
+def append_results(results_file_path, writer, count):
+    for index in range(count):
+        append_result({"writer": writer, "index": index, "output": "x" * 512}, results_file_path)
+
+
+class TestJsonResults:
+    """
+    Test the JSON Lines results file of a suite
+    """
+
+    def test_json_results_concurrent_writers(self, tmp_path):
+        """
+        Test the results appended by processes writing at the same time
+        """
+
+        results_file_path = str(tmp_path / "test_one.jsonl")
+        processes = [
+            multiprocessing.Process(target=append_results, args=(results_file_path, writer, 200))
+            for writer in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        # Case 1: every line is one complete result
+        #
+        results = list(read_results(results_file_path))
+        assert len(results) == 800
+        for writer in range(4):
+            assert [result["index"] for result in results if result["writer"] == writer] == list(range(200))
+
+        # Case 2: the compacted array holds the same results
+        #
+        json_file_path = str(tmp_path / "test_one.json")
+        assert compact(results_file_path, json_file_path) == 800
+        with open(json_file_path) as f:
+            assert json.load(f) == results
+
+    def test_json_results_truncated_line(self, tmp_path):
+        """
+        Test a results file whose last line is still being written
+        """
+
+        results_file_path = str(tmp_path / "test_one.jsonl")
+        json_file_path = str(tmp_path / "test_one.json")
+        append_result({"test": "a"}, results_file_path)
+        append_result({"test": "b"}, results_file_path)
+        with open(results_file_path, 'a') as f:
+            f.write('{"test": "c", "out')
+
+        # Case 1: the partial line is skipped
+        #
+        assert list(read_results(results_file_path)) == [{"test": "a"}, {"test": "b"}]
+
+        # Case 2: the results of older tests already in the json array come first
+        #
+        with open(json_file_path, 'w') as f:
+            json.dump([{"test": "legacy"}], f)
+
+        assert compact(results_file_path, json_file_path, [json_file_path]) == 3
+        with open(json_file_path) as f:
+            assert json.load(f) == [{"test": "legacy"}, {"test": "a"}, {"test": "b"}]
+
+        # Case 3: a missing results file compacts into an empty array
+        #
+        assert compact(str(tmp_path / "missing.jsonl"), json_file_path) == 0
+        with open(json_file_path) as f:
+            assert json.load(f) == []
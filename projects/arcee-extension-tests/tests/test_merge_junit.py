@@ -0,0 +1,86 @@
+import os
+import xml.etree.ElementTree as ET
+
+from merge_junit import JunitMerger, find_reports
+
+REPORT = '''<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="{name}" tests="99" failures="99" errors="99" skipped="99" time="99" hostname="agent">
+<properties><property name="suite" value="{name}"/></properties>
+<testcase classname="{name}" name="test_pass" time="1.5"/>
+<testcase classname="{name}" name="test_fail" time="2.0"><failure message="assert False">trace</failure></testcase>
+<testcase classname="{name}" name="test_error" time="0.5"><error message="fixture">trace</error></testcase>
+<testcase classname="{name}" name="test_skip" time="0"><skipped message="skip"/></testcase>
+</testsuite></testsuites>
+'''
+
+
+def suite_totals(suite):
+    return {key: suite.get(key) for key in ("tests", "failures", "errors", "skipped", "time")}
+
+
+class TestMergeJunit:
+    """
+    Test the junit xml reports merged into one report
+    """
+
+    def test_merge_junit_totals(self, tmp_path):
+        """
+        Test the totals of each suite and of the combined report are counted from the testcases
+        """
+
+        (tmp_path / "one").mkdir()
+        (tmp_path / "two" / ".chunks").mkdir(parents=True)
+        (tmp_path / "one" / "test_one.xml").write_text(REPORT.format(name="one"))
+        (tmp_path / "two" / "test_two.xml").write_text(REPORT.format(name="two").replace(
+            '<testcase classname="two" name="test_error" time="0.5"><error message="fixture">trace</error></testcase>', ""))
+        (tmp_path / "two" / ".chunks" / "test_two.xml").write_text(REPORT.format(name="chunk"))
+        output_path = str(tmp_path / "combined.xml")
+
+        # Case 1: per suite totals, the hidden chunk folders are skipped
+        #
+        totals = JunitMerger([str(tmp_path)], output_path).merge()
+
+        root = ET.parse(output_path).getroot()
+        suites = {suite.get("name"): suite for suite in root}
+        assert sorted(suites) == ["one", "two"]
+        assert suite_totals(suites["one"]) == {"tests": "4", "failures": "1", "errors": "1", "skipped": "1", "time": "4.000"}
+        assert suite_totals(suites["two"]) == {"tests": "3", "failures": "1", "errors": "0", "skipped": "1", "time": "3.500"}
+        assert suites["one"].get("hostname") == "agent"
+        assert suites["one"].find("properties") is not None
+        assert suite_totals(root) == {"tests": "7", "failures": "2", "errors": "1", "skipped": "2", "time": "7.500"}
+        assert totals["tests"] == 7
+
+        # Case 2: the combined report and its parts are not merged into themselves
+        #
+        assert find_reports([str(tmp_path)], output_path) == [
+            os.path.abspath(tmp_path / "one" / "test_one.xml"), os.path.abspath(tmp_path / "two" / "test_two.xml")
+        ]
+
+    def test_merge_junit_repeated_merge(self, tmp_path):
+        """
+        Test a merge repeated while the reports are still being written
+        """
+
+        output_path = str(tmp_path / "combined.xml")
+        (tmp_path / "test_one.xml").write_text(REPORT.format(name="one"))
+        (tmp_path / "test_two.xml").write_text(REPORT.format(name="two")[:200])
+
+        # Case 1: an incomplete report is left for a later merge
+        #
+        merger = JunitMerger([str(tmp_path)], output_path)
+        assert merger.update_parts() == 1
+        assert merger.write_report()["tests"] == 4
+
+        # Case 2: only the changed report is merged again, by a new merger reading the manifest
+        #
+        (tmp_path / "test_two.xml").write_text(REPORT.format(name="two"))
+        merger = JunitMerger([str(tmp_path)], output_path)
+        assert merger.update_parts() == 1
+        assert merger.write_report()["tests"] == 8
+
+        # Case 3: a removed report leaves the combined report
+        #
+        os.remove(tmp_path / "test_one.xml")
+        assert merger.update_parts() == 0
+        assert merger.write_report()["tests"] == 4
+        assert [suite.get("name") for suite in ET.parse(output_path).getroot()] == ["two"]
@@ -0,0 +1,131 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import pytest_daemon
+from pytest_daemon import request_run
+
+SUITE = '''
+import os
+import subprocess
+import time
+
+
+def test_pass():
+    assert True
+
+
+def test_hang():
+    worker = subprocess.Popen(["sleep", "60"])
+    with open(os.environ["PID_FILE_PATH"], 'w') as f:
+        f.write(f"{os.getpid()} {worker.pid}")
+    time.sleep(60)
+'''
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def accepting(socket_path):
+    """Whether the daemon accepts connections, the socket file exists before it listens."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+def process_alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rpartition(")")[2].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """A daemon serving on a socket in tmp_path, with a suite of two tests under tmp_path/suites/one."""
+    suite_path = tmp_path / "suites" / "one"
+    suite_path.mkdir(parents=True)
+    (suite_path / "test_one.py").write_text(SUITE)
+
+    socket_path = str(tmp_path / "daemon.sock")
+    process = subprocess.Popen(
+        [sys.executable, pytest_daemon.__file__, "--socket", socket_path],
+        cwd=os.path.dirname(pytest_daemon.__file__), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    assert wait_for(lambda: accepting(socket_path))
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TEST_RESULT_DIRECTORY", "results")
+    monkeypatch.setenv("PID_FILE_PATH", str(tmp_path / "pids"))
+    yield socket_path, str(suite_path)
+
+    process.terminate()
+    process.wait(timeout=30)
+
+
+class TestPytestDaemon:
+    """
+    Test the suites run by the pytest daemon
+    """
+
+    def test_pytest_daemon_round_trip(self, tmp_path, daemon):
+        """
+        Test a suite run in the daemon, with its results written as run_tests.py writes them
+        """
+
+        socket_path, suite_path = daemon
+
+        # Case 1: the exit code of the suite is returned to the client
+        #
+        assert request_run(socket_path, suite_path, "test_pass") == 0
+        with open(tmp_path / "results" / "arcee_e2e" / "one" / "test_pass.xml") as f:
+            assert 'tests="1"' in f.read()
+
+        # Case 2: no daemon listening
+        #
+        assert request_run(str(tmp_path / "missing.sock"), suite_path) is None
+
+    def test_pytest_daemon_client_gone(self, tmp_path, daemon):
+        """
+        Test the suite and the processes it started are killed when its client goes away
+        """
+
+        socket_path, suite_path = daemon
+        pid_file_path = tmp_path / "pids"
+        request = {
+            "test_folder_path": suite_path,
+            "test_filter": "test_hang",
+            "workers": 1,
+            "cwd": str(tmp_path),
+            "environment": dict(os.environ),
+        }
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + "\n").encode())
+        assert wait_for(lambda: pid_file_path.exists() and pid_file_path.read_text())
+        pids = [int(pid) for pid in pid_file_path.read_text().split()]
+        assert all(process_alive(pid) for pid in pids)
+
+        # Case 1: the suite, and the process it started, stop with the connection
+        #
+        client.close()
+        assert wait_for(lambda: not any(process_alive(pid) for pid in pids))
+
+        # Case 2: the daemon still serves the next client
+        #
+        assert request_run(socket_path, suite_path, "test_pass") == 0
@@ -0,0 +1,83 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from sharding import junit_key, merge_results, merge_xml, split_test_ids
+
+CHUNK_XML = '''<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="one" tests="{tests}" failures="{failures}" errors="0" skipped="{skipped}" time="9.0">{testcases}</testsuite></testsuites>
+'''
+
+
+def chunk_xml(path, names, failures=0, skipped=0):
+    testcases = "".join(f'<testcase classname="test_one" name="{name}" time="1.0"/>' for name in names)
+    path.write_text(CHUNK_XML.format(tests=len(names), failures=failures, skipped=skipped, testcases=testcases))
+    return str(path)
+
+
+class TestSharding:
+    """
+    Test the split of a suite into chunks and the merge of their results
+    """
+
+    def test_sharding_split_test_ids(self):
+        """
+        Test the chunks are balanced on the durations of the previous run
+        """
+
+        test_ids = [f"test_one.py::test_{index}" for index in range(6)]
+        durations = {junit_key(test_id): duration for test_id, duration in zip(test_ids, [10, 1, 1, 4, 3, 3])}
+
+        # Case 1: the longest tests go first onto the least loaded chunk, both chunks take 11 seconds
+        #
+        chunks = split_test_ids(test_ids, durations, 2)
+        assert chunks == [[test_ids[0], test_ids[1]], test_ids[2:]]
+
+        # Case 2: a test without a past timing counts as the average test, the collection order is kept
+        #
+        chunks = split_test_ids(test_ids + ["test_one.py::test_new"], durations, 3)
+        loads = [sum(durations.get(junit_key(test_id), 22 / 6) for test_id in chunk) for chunk in chunks]
+        assert sorted(test_id for chunk in chunks for test_id in chunk) == sorted(test_ids + ["test_one.py::test_new"])
+        assert max(loads) - min(loads) <= 4
+        assert all(chunk == sorted(chunk, key=(test_ids + ["test_one.py::test_new"]).index) for chunk in chunks)
+
+        # Case 3: no more chunks than tests
+        #
+        assert split_test_ids(test_ids[:2], {}, 4) == [[test_ids[0]], [test_ids[1]]]
+
+    def test_sharding_junit_key(self):
+        """
+        Test the junit classname and name of a test ID
+        """
+
+        assert junit_key("tests/test_one.py::TestOne::test_a[x::y]") == ("tests.test_one.TestOne", "test_a[x::y]")
+        assert junit_key("test_one.py::test_b") == ("test_one", "test_b")
+
+    def test_sharding_merge_results(self):
+        """
+        Test the exit code of a suite from the exit codes of its chunks
+        """
+
+        assert merge_results([0, 0]) == pytest.ExitCode.OK
+        assert merge_results([0, 5]) == pytest.ExitCode.OK
+        assert merge_results([5, 5]) == pytest.ExitCode.NO_TESTS_COLLECTED
+        assert merge_results([0, 1, 3]) == pytest.ExitCode.TESTS_FAILED
+        assert merge_results([0, 2]) == pytest.ExitCode.INTERRUPTED
+        assert merge_results([0, -9]) == pytest.ExitCode.INTERNAL_ERROR
+
+    def test_sharding_merge_xml(self, tmp_path):
+        """
+        Test the testsuite merged from the junit xml of the chunks
+        """
+
+        paths = [
+            chunk_xml(tmp_path / "0.xml", ["test_a", "test_b"], failures=1),
+            chunk_xml(tmp_path / "1.xml", ["test_c"], skipped=1),
+            str(tmp_path / "missing.xml"),
+        ]
+        xml_file_path = str(tmp_path / "test_one.xml")
+        merge_xml(paths, xml_file_path, 4.5)
+
+        suite = ET.parse(xml_file_path).getroot().find("testsuite")
+        assert [suite.get(key) for key in ("tests", "failures", "errors", "skipped", "time")] == ["3", "1", "0", "1", "4.500"]
+        assert [testcase.get("name") for testcase in suite] == ["test_a", "test_b", "test_c"]